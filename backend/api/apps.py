@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # Registers the attainment cache invalidation handlers
+        from . import signals  # noqa: F401
+        from django.core import checks
+        from .caching import check_shared_backend
+        checks.register(check_shared_backend, checks.Tags.caches)
@@ -0,0 +1,173 @@
+"""
+Per-course assessment plan for the CO engines.
+
+Everything the engines used to re-derive from Course.cos and
+Course.assessment_tools for every student (SEE tool, internal tools, each
+tool's coDistribution fallback, CO column indices, pass targets and the
+improvement-test name matching) is compiled once per course configuration.
+Plans are cached by a fingerprint of that configuration, so editing a
+course's COs or tools produces a new plan on the next calculation.
+"""
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from .calculation_services import (
+    SEE_RECORD_NAMES,
+    _course_co_list,
+    _course_type,
+    _normalize_name,
+    _split_assessment_tools,
+    _tool_co_distribution,
+)
+
+MAX_CACHED_PLANS = 512
+
+TOOL_PLAIN = 'plain'
+TOOL_LAB_IA = 'lab_ia' # Lab course IA: Test Marks + Continuous Eval scaled onto the COs
+TOOL_ACTIVITY = 'activity' # Activity/Laboratory: one Score copied to every course CO
+
+
+@dataclass(frozen=True, slots=True)
+class ToolPlan:
+    tool: dict
+    name: str
+    kind: str
+    co_dist: dict
+    cos: tuple # CO ids in coDistribution order
+    columns: tuple # their indices in AssessmentPlan.co_keys
+    max_values: tuple # float, or None when the max marks are not numeric
+
+
+@dataclass(frozen=True, slots=True)
+class AssessmentPlan:
+    co_list: list
+    course_type: str
+    co_keys: tuple # course COs, then distribution-only keys
+    n_course_cos: int # co_keys[:n_course_cos] are the course COs
+    see_tool: object
+    see_names: tuple # mark names accepted as the SEE record
+    see_columns: tuple # SEE-mapped COs counted for every student
+    see_late_columns: tuple # distribution-only SEE COs: the Python engine counts them from the second student on
+    tools: tuple
+    improvement_tools: dict # normalized tool name -> indices into tools
+    _targets: dict = field(default_factory=dict, compare=False, repr=False)
+
+    def output_keys(self, has_marks):
+        # Distribution-only keys only appear once a student has been processed
+        return self.co_keys if has_marks else self.co_keys[:self.n_course_cos]
+
+    def targets(self, pass_threshold):
+        """Per tool, the pass target of each CO (None when its max marks are not numeric)."""
+        targets = self._targets.get(pass_threshold)
+        if targets is None:
+            targets = tuple(
+                tuple(None if max_val is None else max_val * pass_threshold / 100.0 for max_val in tool.max_values)
+                for tool in self.tools
+            )
+            self._targets[pass_threshold] = targets
+        return targets
+
+    def see_target(self, pass_threshold):
+        return (float(self.see_tool.get('maxMarks', 100)) * pass_threshold) / 100.0
+
+
+def _float_or_none(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _cached_normalize(value):
+    return _normalize_name(value)
+
+
+def improvement_key(value):
+    """_normalize_name for improvement_test_for / _improvementTarget values, cached for strings."""
+    try:
+        return _cached_normalize(value)
+    except TypeError: # unhashable
+        return _normalize_name(value)
+
+
+def build_assessment_plan(course):
+    co_list = _course_co_list(course)
+    course_type = _course_type(course)
+    see_tool, internal_tools = _split_assessment_tools(course)
+
+    co_index = {}
+    for co in co_list:
+        co_index.setdefault(co, len(co_index))
+    n_course_cos = len(co_index)
+
+    tools = []
+    improvement_tools = {}
+    for i, tool in enumerate(internal_tools):
+        co_dist = _tool_co_distribution(tool, co_list)
+        for co in co_dist:
+            co_index.setdefault(co, len(co_index))
+        if course_type == 'Lab' and tool.get('type') == 'Internal Assessment':
+            kind = TOOL_LAB_IA
+        elif tool.get('type') in ['Activity', 'Laboratory']:
+            kind = TOOL_ACTIVITY
+        else:
+            kind = TOOL_PLAIN
+        tools.append(ToolPlan(
+            tool=tool,
+            name=tool.get('name'),
+            kind=kind,
+            co_dist=co_dist,
+            cos=tuple(co_dist),
+            columns=tuple(co_index[co] for co in co_dist),
+            max_values=tuple(_float_or_none(max_val) for max_val in co_dist.values()),
+        ))
+        improvement_tools.setdefault(_normalize_name(tool.get('name')), []).append(i)
+
+    see_columns, see_late_columns = [], []
+    if see_tool:
+        see_map = list(see_tool.get('coDistribution', {}).keys()) or co_list
+        for co in see_map:
+            if co in co_index:
+                (see_columns if co_index[co] < n_course_cos else see_late_columns).append(co_index[co])
+
+    return AssessmentPlan(
+        co_list=co_list,
+        course_type=course_type,
+        co_keys=tuple(co_index),
+        n_course_cos=n_course_cos,
+        see_tool=see_tool,
+        see_names=tuple([see_tool.get('name')] + SEE_RECORD_NAMES) if see_tool else (),
+        see_columns=tuple(see_columns),
+        see_late_columns=tuple(see_late_columns),
+        tools=tuple(tools),
+        improvement_tools={key: tuple(indices) for key, indices in improvement_tools.items()},
+    )
+
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def plan_key(course):
+    """The course configuration a plan is built from, as a string."""
+    return json.dumps([course.cos, course.assessment_tools, _course_type(course)], default=str)
+
+
+def get_assessment_plan(course):
+    """Cached build_assessment_plan, keyed by the course's CO/tool configuration."""
+    key = plan_key(course)
+    with _plans_lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _plans.move_to_end(key)
+            return plan
+    plan = build_assessment_plan(course)
+    with _plans_lock:
+        _plans[key] = plan
+        if len(_plans) > MAX_CACHED_PLANS:
+            _plans.popitem(last=False)
+    return plan
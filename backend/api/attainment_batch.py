@@ -0,0 +1,109 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+from .attainment_cache import store_course_attainments
+from .calculation_services import calculate_courses_attainment
+from .models import AttainmentResult, Course
+
+logger = logging.getLogger(__name__)
+
+# Courses per shard: large enough to batch the mark/matrix queries, small
+# enough to keep every worker busy until the end of the run
+DEFAULT_SHARD_SIZE = 50
+
+
+@dataclass
+class BatchStats:
+    courses: int = 0
+    stored: int = 0
+    skipped: int = 0 # invalidated while computing; the next read recomputes them
+    failed: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def courses_per_second(self):
+        return self.courses / self.elapsed if self.elapsed else 0.0
+
+    def add(self, other):
+        self.courses += other.courses
+        self.stored += other.stored
+        self.skipped += other.skipped
+        self.failed.extend(other.failed)
+
+
+def compute_course_shard(course_ids):
+    """
+    Recomputes and stores the reports of `course_ids` with one batched
+    calculation. Runs in the worker processes, each on its own connection.
+    """
+    # Rows exist before computing so a concurrent write can bump their version
+    existing = set(AttainmentResult.objects.filter(course_id__in=course_ids).values_list('course_id', flat=True))
+    AttainmentResult.objects.bulk_create(
+        [AttainmentResult(course_id=course_id) for course_id in course_ids if course_id not in existing],
+        ignore_conflicts=True,
+    )
+    versions = dict(AttainmentResult.objects.filter(course_id__in=course_ids).values_list('course_id', 'version'))
+
+    courses = Course.objects.filter(id__in=course_ids).select_related('scheme')
+    reports = calculate_courses_attainment(courses)
+    stored = store_course_attainments(reports, versions)
+    return BatchStats(
+        courses=len(reports),
+        stored=len(stored),
+        skipped=len(reports) - len(stored),
+    )
+
+
+def _init_worker():
+    # Forked workers must not share the parent's sockets; spawned ones need Django set up
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    django.setup()
+    connections.close_all()
+
+
+def _shards(course_ids, shard_size):
+    return [course_ids[i:i + shard_size] for i in range(0, len(course_ids), shard_size)]
+
+
+def compute_attainment(course_ids, workers=1, shard_size=DEFAULT_SHARD_SIZE, on_progress=None):
+    """
+    Recomputes the given courses, sharded across `workers` processes
+    (in-process when workers is 1). `on_progress(done_stats, total)` is called
+    after every shard. Returns the aggregated BatchStats.
+    """
+    course_ids = list(course_ids)
+    stats = BatchStats()
+    started = time.perf_counter()
+
+    shards = _shards(course_ids, max(1, shard_size))
+    if workers <= 1 or len(shards) <= 1:
+        for shard in shards:
+            try:
+                stats.add(compute_course_shard(shard))
+            except Exception:
+                logger.exception("Attainment shard failed: %s", shard)
+                stats.failed.extend(shard)
+            if on_progress:
+                on_progress(stats, len(course_ids))
+    else:
+        # Children open their own connections; close ours so none is inherited mid-use
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(compute_course_shard, shard): shard for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    stats.add(future.result())
+                except Exception:
+                    logger.exception("Attainment shard failed: %s", futures[future])
+                    stats.failed.extend(futures[future])
+                if on_progress:
+                    on_progress(stats, len(course_ids))
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
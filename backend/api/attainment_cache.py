@@ -0,0 +1,218 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import caching
+from .attainment_queue import async_recompute_enabled, enqueue_recompute
+from .calculation_services import calculate_course_attainment, calculate_courses_attainment, rollup_outcome_attainment
+from .conditional import make_etag
+from .models import AttainmentResult, Course
+
+# Lifetime of a recomputed report kept for the readers that waited on it
+REFRESH_RESULT_SECONDS = 10
+
+
+def _freshness(computed_at, stale):
+    return {"computed_at": computed_at.isoformat() if computed_at else None, "stale": stale}
+
+
+def get_course_attainment(course_id):
+    """
+    Cached calculate_course_attainment. A fresh result is a single-row lookup;
+    otherwise the report is recomputed and stored for the next read.
+    """
+    return get_course_attainment_with_freshness(course_id)[0]
+
+
+def get_course_attainment_with_freshness(course_id):
+    """
+    Returns (report, {"computed_at", "stale"}). With ATTAINMENT_ASYNC_RECOMPUTE
+    a stale report is served as-is while the worker recomputes it; only a
+    course that was never computed is calculated during the request.
+    Stored reports are read through the shared cache, keyed by their version.
+    """
+    row = AttainmentResult.objects.filter(course_id=course_id).values('version', 'is_stale', 'computed_at').first()
+    if row and row['computed_at'] is not None and (not row['is_stale'] or async_recompute_enabled()):
+        if row['is_stale']:
+            # Normally queued already by the invalidation; this only covers a lost job
+            enqueue_recompute([course_id], debounce=False)
+        report = caching.get_or_compute(
+            _report_key(course_id, row['version'], row['is_stale'], row['computed_at']),
+            lambda: _stored_report(course_id, row),
+            cache_if=lambda r: r is not None,
+        )
+        if report is not None:
+            return report, _freshness(row['computed_at'], row['is_stale'])
+
+    # Concurrent readers of the same version wait for a single recomputation
+    version = row['version'] if row else None
+    report = caching.get_or_compute(
+        f'attainment-refresh:{course_id}:{version}',
+        lambda: refresh_course_attainment(course_id, version=version),
+        timeout=REFRESH_RESULT_SECONDS, local_timeout=0, cache_if=lambda r: "error" not in r,
+    )
+    return report, _freshness(timezone.now(), False)
+
+
+def _report_key(course_id, version, is_stale, computed_at):
+    return f'attainment:{course_id}:{version}:{int(is_stale)}:{computed_at.timestamp()}'
+
+
+def _stored_report(course_id, row):
+    """The stored result of `row`, or None if the row changed since it was read."""
+    return AttainmentResult.objects.filter(
+        course_id=course_id, version=row['version'], is_stale=row['is_stale'], computed_at=row['computed_at']
+    ).values_list('result', flat=True).first()
+
+
+def course_attainment_validators(course_id):
+    """
+    (etag, last_modified) of the report get_course_attainment_with_freshness
+    would serve without computing, or (None, None) when it would compute.
+    """
+    row = AttainmentResult.objects.filter(course_id=course_id, result__isnull=False).values(
+        'version', 'is_stale', 'computed_at'
+    ).first()
+    if row is None or (row['is_stale'] and not async_recompute_enabled()):
+        return None, None
+    return make_etag('course-attainment', course_id, row['version'], row['computed_at'], row['is_stale']), row['computed_at']
+
+
+def refresh_course_attainment(course_id, version=None):
+    """
+    Computes a course's report and stores it, unless it was invalidated in the
+    meantime. `version` is the AttainmentResult version read before computing.
+    """
+    if version is None:
+        if not Course.objects.filter(id=course_id).exists():
+            return {"error": "Course not found"}
+        # Create the row before computing so a concurrent write can bump its version
+        AttainmentResult.objects.get_or_create(course_id=course_id)
+        version = AttainmentResult.objects.filter(course_id=course_id).values_list('version', flat=True).first() or 0
+
+    report = calculate_course_attainment(course_id)
+    if "error" not in report:
+        computed_at = store_course_attainment(course_id, report, version)
+        if computed_at:
+            caching.set(_report_key(course_id, version, False, computed_at), report)
+    return report
+
+
+def get_department_attainment(department_id, scheme_id=None, semester=None):
+    """
+    Reports for every course of a department plus PO/PSO roll-ups.
+    Cached reports are read in one query; the stale ones are recomputed
+    together with calculate_courses_attainment and stored back (with
+    ATTAINMENT_ASYNC_RECOMPUTE, stale reports are served and left to the worker).
+    Each course entry carries a "freshness" marker.
+    """
+    courses = Course.objects.filter(department_id=department_id).select_related('scheme').order_by('code')
+    if scheme_id:
+        courses = courses.filter(scheme_id=scheme_id)
+    if semester is not None:
+        courses = courses.filter(semester=semester)
+    courses = list(courses)
+    course_ids = [c.id for c in courses]
+
+    rows = {
+        row['course_id']: row
+        for row in AttainmentResult.objects.filter(course_id__in=course_ids).values(
+            'course_id', 'result', 'version', 'is_stale', 'computed_at'
+        )
+    }
+    serve_stale = async_recompute_enabled()
+    reports = {
+        course_id: row['result'] for course_id, row in rows.items()
+        if (serve_stale or not row['is_stale']) and row['result'] is not None
+    }
+    freshness = {course_id: _freshness(rows[course_id]['computed_at'], rows[course_id]['is_stale']) for course_id in reports}
+
+    missing = [course_id for course_id in course_ids if course_id not in rows]
+    if missing:
+        # Same as get_course_attainment: rows exist before computing so writes can bump them
+        AttainmentResult.objects.bulk_create([AttainmentResult(course_id=course_id) for course_id in missing], ignore_conflicts=True)
+        for course_id, version in AttainmentResult.objects.filter(course_id__in=missing).values_list('course_id', 'version'):
+            rows[course_id] = {'version': version}
+
+    computed = calculate_courses_attainment([c for c in courses if c.id not in reports])
+    store_course_attainments(computed, {course_id: rows[course_id]['version'] for course_id in computed})
+    now = timezone.now()
+    for course_id in computed:
+        freshness[course_id] = _freshness(now, False)
+    reports.update(computed)
+
+    po_rollup, pso_rollup = rollup_outcome_attainment(reports[c.id] for c in courses)
+    return {
+        "department_id": department_id,
+        "scheme": scheme_id,
+        "semester": semester,
+        "courses": [
+            {"code": c.code, "name": c.name, "semester": c.semester, **reports[c.id], "freshness": freshness[c.id]}
+            for c in courses
+        ],
+        "po_attainment": po_rollup,
+        "pso_attainment": pso_rollup
+    }
+
+
+def store_course_attainment(course_id, report, version):
+    """
+    Saves a computed report, unless the course was invalidated after `version`
+    was read (the report would already be out of date). Returns the stored
+    computed_at, or None.
+    """
+    now = timezone.now()
+    stored = AttainmentResult.objects.filter(course_id=course_id, version=version).update(
+        result=report, is_stale=False, computed_at=now
+    )
+    return now if stored else None
+
+
+def store_course_attainments(reports, versions):
+    """
+    Bulk store_course_attainment for {course_id: report}, with the versions
+    read before computing. The rows are locked while their versions are
+    compared, so all matching reports are written in one UPDATE.
+    Returns the ids of the courses stored.
+    """
+    if not reports:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        rows = [
+            row for row in AttainmentResult.objects.select_for_update().filter(course_id__in=list(reports)).only('course_id', 'version')
+            if row.version == versions.get(row.course_id)
+        ]
+        for row in rows:
+            row.result = reports[row.course_id]
+            row.is_stale = False
+            row.computed_at = now
+        AttainmentResult.objects.bulk_update(rows, ['result', 'is_stale', 'computed_at'])
+    return [row.course_id for row in rows]
+
+
+def invalidate_course_attainment(course_ids):
+    """Marks the cached reports of the given courses as stale (and queues them in async mode)."""
+    course_ids = list(course_ids)
+    if not course_ids:
+        return 0
+    if async_recompute_enabled():
+        enqueue_recompute(course_ids)
+    return AttainmentResult.objects.filter(course_id__in=course_ids).update(version=F('version') + 1, is_stale=True)
+
+
+def _invalidate_results(results):
+    if async_recompute_enabled():
+        enqueue_recompute(results.values_list('course_id', flat=True))
+    return results.update(version=F('version') + 1, is_stale=True)
+
+
+def invalidate_scheme_attainment(scheme_id):
+    return _invalidate_results(AttainmentResult.objects.filter(course__scheme_id=scheme_id))
+
+
+def invalidate_global_scheme_attainment():
+    # Courses without a scheme (or with an empty one) fall back to the global settings
+    return _invalidate_results(AttainmentResult.objects.filter(
+        Q(course__scheme__isnull=True) | Q(course__scheme__settings={})
+    ))
@@ -0,0 +1,93 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings as django_settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AttainmentRecomputeJob
+
+logger = logging.getLogger(__name__)
+
+# A failing course is retried this many times, backing off by RETRY_DELAY_SECONDS * attempt
+MAX_JOB_ATTEMPTS = 5
+RETRY_DELAY_SECONDS = 30
+
+
+def async_recompute_enabled():
+    return getattr(django_settings, 'ATTAINMENT_ASYNC_RECOMPUTE', False)
+
+
+def enqueue_recompute(course_ids, debounce=True):
+    """
+    Queues courses for `manage.py attainment_worker`. With `debounce`, a
+    course that is already queued has its not_before pushed back, so a burst
+    of mark saves is recomputed once (but never later than
+    ATTAINMENT_RECOMPUTE_MAX_DELAY_SECONDS after the first save).
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    if not course_ids:
+        return
+    now = timezone.now()
+    not_before = now + timedelta(seconds=getattr(django_settings, 'ATTAINMENT_RECOMPUTE_DEBOUNCE_SECONDS', 5))
+    jobs = [AttainmentRecomputeJob(course_id=course_id, enqueued_at=now, not_before=not_before) for course_id in course_ids]
+    if debounce:
+        AttainmentRecomputeJob.objects.bulk_create(
+            jobs, update_conflicts=True, unique_fields=['course_id'], update_fields=['not_before']
+        )
+    else:
+        AttainmentRecomputeJob.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+def claim_due_jobs(limit):
+    """
+    Removes up to `limit` due jobs from the queue and returns their
+    (course_id, attempts). SKIP LOCKED lets several workers claim side by side;
+    a mark saved while a job runs simply queues the course again.
+    """
+    now = timezone.now()
+    max_delay = timedelta(seconds=getattr(django_settings, 'ATTAINMENT_RECOMPUTE_MAX_DELAY_SECONDS', 60))
+    with transaction.atomic():
+        jobs = list(
+            AttainmentRecomputeJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(not_before__lte=now) | Q(enqueued_at__lte=now - max_delay))
+            .order_by('not_before')
+            .values_list('course_id', 'attempts')[:limit]
+        )
+        AttainmentRecomputeJob.objects.filter(course_id__in=[course_id for course_id, _ in jobs]).delete()
+    return jobs
+
+
+def _run_job(job, close_connection=False):
+    from .attainment_cache import refresh_course_attainment
+
+    course_id, attempts = job
+    try:
+        refresh_course_attainment(course_id)
+        return True
+    except Exception:
+        logger.exception("Attainment recompute failed for course %s", course_id)
+        if attempts + 1 < MAX_JOB_ATTEMPTS:
+            retry_at = timezone.now() + timedelta(seconds=RETRY_DELAY_SECONDS * (attempts + 1))
+            # A course queued again meanwhile keeps its enqueued_at
+            retry = {'attempts': attempts + 1, 'not_before': retry_at}
+            if not AttainmentRecomputeJob.objects.filter(course_id=course_id).update(**retry):
+                AttainmentRecomputeJob.objects.get_or_create(course_id=course_id, defaults={**retry, 'enqueued_at': retry_at})
+        return False
+    finally:
+        if close_connection:
+            # Pool threads each hold their own database connection
+            connection.close()
+
+
+def run_due_jobs(limit=50, workers=1):
+    """Claims and recomputes due courses. Returns (claimed, succeeded)."""
+    jobs = claim_due_jobs(limit)
+    if workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda job: _run_job(job, close_connection=True), jobs))
+    else:
+        results = [_run_job(job) for job in jobs]
+    return len(jobs), sum(results)
@@ -0,0 +1,113 @@
+"""
+What-if attainment for candidate scheme settings.
+
+The marks of the selected courses are loaded once and parsed into
+MarkMatrix arrays; the current settings and every candidate are then
+evaluated from those arrays in one evaluate_mark_matrix_sweep per course.
+Nothing is stored.
+"""
+import math
+
+from .calculation_services import (
+    DEFAULT_SCHEME_SETTINGS,
+    _load_course_inputs,
+    get_course_scheme,
+    get_scheme_settings,
+    report_from_co_levels,
+    rollup_outcome_attainment,
+)
+from .compiled_scheme import compile_scheme
+from .vectorized_attainment import build_mark_matrix, evaluate_mark_matrix_sweep
+
+MAX_SIMULATION_COURSES = 200
+MAX_SIMULATION_CANDIDATES = 20
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def validate_candidate(candidate):
+    """Returns an error message, or None when the settings compile and their numbers are usable."""
+    if not isinstance(candidate, dict):
+        return "Each candidate must be an object of scheme settings"
+    try:
+        scheme = compile_scheme({**DEFAULT_SCHEME_SETTINGS, **candidate})
+    except (AttributeError, TypeError, ValueError) as exc:
+        return f"Invalid scheme settings: {exc}"
+    # Only read by the PO arithmetic, after the course reports are built
+    weightage = candidate.get('weightage', DEFAULT_SCHEME_SETTINGS['weightage'])
+    if any(not _is_number(weightage.get(key, 0)) for key in ('direct', 'indirect')):
+        return "Invalid scheme settings: weightage direct and indirect must be numbers"
+    if not _is_number(scheme.normalization_factor) or scheme.normalization_factor <= 0:
+        return "Invalid scheme settings: po_calculation.normalization_factor must be a number greater than 0"
+    return None
+
+
+def _outcome(report):
+    return {"co_attainment": report["co_attainment"], "po_attainment": report["po_attainment"]}
+
+
+def _changed_cos(before, after):
+    levels = {row['co']: (row['cie_level'], row['see_level']) for row in before['co_attainment']}
+    return [
+        row['co'] for row in after['co_attainment']
+        if levels.get(row['co']) != (row['cie_level'], row['see_level'])
+    ]
+
+
+def simulate_attainment(courses, candidates):
+    """
+    Reports of `courses` (loaded with select_related('scheme')) under their
+    current settings and under each candidate. A candidate overrides the
+    course's settings key by key, so {"pass_criteria": 60} keeps the
+    course's levels and weightage.
+    """
+    courses = list(courses)
+    marks_by_course, matrices, global_settings = _load_course_inputs(courses)
+
+    course_results = []
+    before_reports, after_reports = [], [[] for _ in candidates]
+    compiled = {}
+    for course in courses:
+        # 1. Current scheme plus the candidates merged over it (compiled once per scheme)
+        scheme_key = course.scheme_id if course.scheme and course.scheme.settings else None
+        if scheme_key not in compiled:
+            settings = get_scheme_settings(course, global_settings)
+            compiled[scheme_key] = [get_course_scheme(course, global_settings)] + [
+                compile_scheme({**settings, **candidate}) for candidate in candidates
+            ]
+        schemes = compiled[scheme_key]
+
+        # 2. One matrix per course, evaluated under every scheme at once
+        mark_matrix = build_mark_matrix(marks_by_course[course.id], course)
+        co_levels = evaluate_mark_matrix_sweep(mark_matrix, schemes)
+        reports = [
+            report_from_co_levels(course, stats, matrices.get(course.id), scheme)
+            for stats, scheme in zip(co_levels, schemes)
+        ]
+
+        before = _outcome(reports[0])
+        before_reports.append(reports[0])
+        after = []
+        for i, report in enumerate(reports[1:]):
+            after.append({**_outcome(report), "changed_cos": _changed_cos(reports[0], report)})
+            after_reports[i].append(report)
+        course_results.append({
+            "course_id": course.id,
+            "code": course.code,
+            "name": course.name,
+            "scheme_used": reports[0]["scheme_used"],
+            "before": before,
+            "after": after,
+        })
+
+    # 3. Institution-level view of the same courses
+    before_po, before_pso = rollup_outcome_attainment(before_reports)
+    after_rollups = [rollup_outcome_attainment(reports) for reports in after_reports]
+    return {
+        "candidates": candidates,
+        "courses": course_results,
+        "po_attainment": {"before": before_po, "after": [po for po, _ in after_rollups]},
+        "pso_attainment": {"before": before_pso, "after": [pso for _, pso in after_rollups]},
+    }
@@ -0,0 +1,158 @@
+"""
+JWT authentication without a users-table read per request.
+
+Access tokens carry the user's role, department and profile as claims.
+PrincipalJWTAuthentication turns them into an unsaved User instance (the
+"principal") and caches its fields for AUTH_PRINCIPAL_CACHE_SECONDS (in the
+process for at most CACHE_LOCAL_SECONDS, see api/caching.py), so filters
+like assigned_faculty=request.user and the role checks work as before. When
+a user is saved or deleted, the cached principal is dropped and tokens issued
+before the change are resolved from the database until they expire;
+refreshed tokens get their claims from the database.
+
+With a per-process shared tier (CACHE_BACKEND='locmem') other workers never
+see that invalidation, so each request instead reads the users-table version
+(one TableVersion query): cached principals are keyed by it, and claims
+issued before the last user change are not trusted.
+"""
+import time
+
+from django.conf import settings as django_settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import caching
+from .conditional import table_versions
+from .models import User
+
+PRINCIPAL_FIELDS = ('id', 'username', 'email', 'display_name', 'role', 'department_id', 'is_active')
+# Principal field -> access token claim (the id is USER_ID_CLAIM)
+PRINCIPAL_CLAIMS = {
+    'username': 'username',
+    'email': 'email',
+    'display_name': 'display_name',
+    'role': 'role',
+    'department_id': 'department',
+}
+
+
+def _principal_key(user_id):
+    return f'auth:principal:{user_id}'
+
+
+def _changed_key(user_id):
+    return f'auth:changed:{user_id}'
+
+
+def _forget_principal(user_id):
+    caching.delete(_principal_key(user_id))
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    # Shared tier only: every worker must see the change at once
+    caching.set(_changed_key(user_id), time.time(), timeout=int(lifetime) + 1, local_timeout=0)
+
+
+def invalidate_principal(user_id):
+    """
+    Drops the cached principal; tokens issued until now stop being trusted for
+    their claims. Done again when the transaction commits, since a request in
+    between still reads (and may cache) the old row.
+    """
+    _forget_principal(user_id)
+    transaction.on_commit(lambda: _forget_principal(user_id))
+
+
+def _with_claims(access, user):
+    token = AccessToken(access)
+    for field, claim in PRINCIPAL_CLAIMS.items():
+        token[claim] = getattr(user, field)
+    return str(token)
+
+
+def _users_version():
+    """
+    None when the shared tier is shared; else (version, last change time) of
+    the users table, read from the database since invalidations made by other
+    workers never reach this process's cache.
+    """
+    if caching.is_shared():
+        return None
+    versions, last_modified = table_versions([User])
+    return versions[User._meta.label_lower], last_modified
+
+
+def _principal_from_claims(user_id, token, users=None):
+    if any(claim not in token for claim in PRINCIPAL_CLAIMS.values()):
+        return None
+    if users is None:
+        changed_at = caching.get(_changed_key(user_id), local_timeout=0)
+    else:
+        # Any user change distrusts older claims: the version is per table
+        changed_at = users[1].timestamp() if users[1] else None
+    if changed_at is not None and token.get('iat', 0) <= changed_at:
+        return None
+    fields = {field: token[claim] for field, claim in PRINCIPAL_CLAIMS.items()}
+    return {**fields, 'id': user_id, 'is_active': True}
+
+
+def _principal_from_db(user_id):
+    return User.objects.filter(id=user_id, is_active=True).values(*PRINCIPAL_FIELDS).first()
+
+
+def get_principal(user_id, token):
+    """
+    The request user for a validated access token: cached fields, else the
+    token's claims, else one query. None when the user is gone or inactive.
+    """
+    users = _users_version()
+    key = _principal_key(user_id) if users is None else f'{_principal_key(user_id)}:{users[0]}'
+    fields = caching.get(key, local_timeout=caching.local_seconds())
+    if fields is None:
+        fields = _principal_from_claims(user_id, token, users) or _principal_from_db(user_id)
+        if fields is None:
+            return None
+        caching.set(key, fields, timeout=getattr(django_settings, 'AUTH_PRINCIPAL_CACHE_SECONDS', 60),
+                    local_timeout=caching.local_seconds())
+
+    # Built without a query and only partly filled: lookups and comparisons use its id; never save() it
+    user = User(**fields)
+    user._state.adding = False
+    return user
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The revoke claim is checked against the stored password hash
+            return super().get_user(validated_token)
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_principal(user_id, validated_token)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return user
+
+
+class PrincipalTokenObtainPairSerializer(TokenObtainPairSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data['access'] = _with_claims(data['access'], self.user)
+        return data
+
+
+class PrincipalTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        user_id = AccessToken(data['access'])[api_settings.USER_ID_CLAIM]
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None:
+            data['access'] = _with_claims(data['access'], user)
+        return data
@@ -0,0 +1,221 @@
+"""
+Synthetic institutions for load testing (`manage.py seed_benchmark`).
+
+Everything is written with bulk_create, so the Mark signals do not run:
+MarkScore rows are built alongside the marks, and attainment reports and CO
+counters are computed on first read like after any bulk import. Data is
+reproducible for a given seed and every id starts with the prefix.
+"""
+import random
+import time
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .calculation_services import SEE_TOOL_TYPES
+from .conditional import bump_table_versions
+from .mark_scores import score_rows_for
+from .models import ArticulationMatrix, Course, Department, Mark, MarkScore, Scheme, Student, User
+
+COURSE_COS = ['CO1', 'CO2', 'CO3', 'CO4', 'CO5']
+
+THEORY_TOOLS = [
+    {'name': 'IA 1', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO1': 25, 'CO2': 25}},
+    {'name': 'IA 2', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO3': 25, 'CO4': 25}},
+    {'name': 'IA 3', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO4': 20, 'CO5': 30}},
+    {'name': 'Assignment 1', 'type': 'Assignment', 'maxMarks': 10, 'coDistribution': {'CO1': 5, 'CO2': 5}},
+    {'name': 'Assignment 2', 'type': 'Assignment', 'maxMarks': 10, 'coDistribution': {'CO3': 5, 'CO5': 5}},
+    {'name': 'Quiz', 'type': 'Activity', 'maxMarks': 10},
+    {'name': 'Improvement Test', 'type': 'Improvement Test', 'maxMarks': 50},
+    {'name': 'SEE', 'type': 'SEE', 'maxMarks': 100},
+]
+
+LAB_TOOLS = [
+    {'name': 'Lab IA 1', 'type': 'Internal Assessment', 'maxMarks': 25, 'coDistribution': {'CO1': 10, 'CO2': 15}},
+    {'name': 'Lab IA 2', 'type': 'Internal Assessment', 'maxMarks': 25, 'coDistribution': {'CO3': 10, 'CO4': 15}},
+    {'name': 'Lab Record', 'type': 'Laboratory', 'maxMarks': 20},
+    {'name': 'SEE', 'type': 'SEE', 'maxMarks': 50},
+]
+
+SCHEME_SETTINGS = [
+    {'pass_criteria': 40, 'attainment_levels': {'level_3': 70, 'level_2': 60, 'level_1': 50},
+     'weightage': {'direct': 80, 'indirect': 20}, 'po_calculation': {'normalization_factor': 3}},
+    {'pass_criteria': 50, 'attainment_levels': {'level_3': 75, 'level_2': 60, 'level_1': 45},
+     'weightage': {'direct': 90, 'indirect': 10}, 'po_calculation': {'normalization_factor': 3}},
+    {'pass_criteria': 60, 'attainment_levels': {'level_3': 80, 'level_2': 65, 'level_1': 50},
+     'weightage': {'direct': 70, 'indirect': 30}, 'po_calculation': {'normalization_factor': 3}},
+]
+
+# Share of courses that are labs, of marks left absent and of students taking the improvement test
+LAB_COURSE_RATE = 0.25
+ABSENT_RATE = 0.03
+IMPROVEMENT_RATE = 0.15
+
+
+@dataclass
+class SeedStats:
+    departments: int = 0
+    schemes: int = 0
+    courses: int = 0
+    students: int = 0
+    enrollments: int = 0
+    marks: int = 0
+    mark_scores: int = 0
+    elapsed: float = 0.0
+    course_ids: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "departments": self.departments,
+            "schemes": self.schemes,
+            "courses": self.courses,
+            "students": self.students,
+            "enrollments": self.enrollments,
+            "marks": self.marks,
+            "mark_scores": self.mark_scores,
+        }
+
+
+def prefix_in_use(prefix):
+    return (
+        Department.objects.filter(id__startswith=prefix).exists()
+        or Scheme.objects.filter(id__startswith=f'{prefix}-').exists()
+        or Student.objects.filter(id__startswith=prefix).exists()
+    )
+
+
+def _score(rng, ability, max_marks):
+    """A mark around the student's ability; a few are absent."""
+    if rng.random() < ABSENT_RATE:
+        return 'AB'
+    fraction = min(1.0, max(0.0, rng.gauss(ability, 0.15)))
+    return round(fraction * max_marks) if max_marks >= 10 else round(fraction * max_marks, 1)
+
+
+def _tool_scores(rng, ability, tool, is_lab):
+    if is_lab and tool['type'] == 'Internal Assessment':
+        test_max = tool['maxMarks'] * 0.6
+        return {'Test Marks': _score(rng, ability, test_max), 'Continuous Eval': _score(rng, ability, tool['maxMarks'] - test_max)}
+    if tool['type'] in ['Activity', 'Laboratory'] or tool['type'] in SEE_TOOL_TYPES:
+        return {'Score': _score(rng, ability, tool['maxMarks'])}
+    return {co: _score(rng, ability, max_marks) for co, max_marks in tool['coDistribution'].items()}
+
+
+def _course_marks(rng, course, student_ids, abilities):
+    """Yields the marks of one course: every tool per student, plus some improvement tests."""
+    is_lab = course.settings.get('courseType') == 'Lab'
+    tools = [t for t in course.assessment_tools if t['type'] != 'Improvement Test']
+    ia_names = [t['name'] for t in tools if t['type'] == 'Internal Assessment']
+    has_improvement = any(t['type'] == 'Improvement Test' for t in course.assessment_tools)
+    for student_id in student_ids:
+        ability = abilities[student_id]
+        for tool in tools:
+            yield Mark(
+                id=f'{course.id}-{student_id}-{tool["name"]}', student_id=student_id, course_id=course.id,
+                assessment_name=tool['name'], scores=_tool_scores(rng, ability, tool, is_lab),
+            )
+        if has_improvement and rng.random() < IMPROVEMENT_RATE:
+            target_name = rng.choice(ia_names)
+            target = next(t for t in tools if t['name'] == target_name)
+            yield Mark(
+                id=f'{course.id}-{student_id}-imp', student_id=student_id, course_id=course.id,
+                assessment_name='Improvement Test', scores=_tool_scores(rng, min(1.0, ability + 0.1), target, False),
+                improvement_test_for=target['name'],
+            )
+
+
+def _articulation(rng):
+    return {co: {f'PO{p}': rng.choice([1, 2, 3]) for p in rng.sample(range(1, 13), 3)} for co in COURSE_COS}
+
+
+def seed_institution(prefix='BM', departments=2, courses_per_department=20, students=5000,
+                     students_per_course=60, seed=1, batch_size=10000, on_progress=None):
+    """
+    Writes a synthetic institution and returns its SeedStats.
+    `on_progress(stats)` is called after every flushed batch of marks.
+    """
+    rng = random.Random(seed)
+    stats = SeedStats()
+    started = time.perf_counter()
+    students_per_course = min(students_per_course, students)
+
+    # 1. Departments, schemes and one faculty per five courses
+    with transaction.atomic():
+        depts = Department.objects.bulk_create([
+            Department(id=f'{prefix}D{d:02d}', name=f'Benchmark Department {d}') for d in range(1, departments + 1)
+        ])
+        schemes = Scheme.objects.bulk_create([
+            Scheme(id=f'{prefix}-S{s}', name=f'Benchmark Scheme {s}', settings=settings)
+            for s, settings in enumerate(SCHEME_SETTINGS, start=1)
+        ])
+        password = make_password(None)
+        faculty = {
+            dept.id: User.objects.bulk_create([
+                User(username=f'{prefix.lower()}-{dept.id.lower()}-f{f}', password=password, role=User.Role.FACULTY,
+                     department=dept, display_name=f'Faculty {f}')
+                for f in range(max(1, courses_per_department // 5))
+            ])
+            for dept in depts
+        }
+
+        # 2. Courses, with their articulation matrices
+        courses = []
+        for dept in depts:
+            for c in range(courses_per_department):
+                is_lab = rng.random() < LAB_COURSE_RATE
+                courses.append(Course(
+                    id=f'{prefix}C{dept.id[-2:]}{c:04d}', code=f'{dept.id}{c:04d}', name=f'Benchmark Course {c}',
+                    semester=1 + c % 8, credits=2 if is_lab else 4, department=dept,
+                    assigned_faculty=faculty[dept.id][c % len(faculty[dept.id])], scheme=rng.choice(schemes),
+                    cos=[{'id': co} for co in COURSE_COS[:4 if is_lab else 5]],
+                    assessment_tools=LAB_TOOLS if is_lab else THEORY_TOOLS,
+                    settings={'courseType': 'Lab'} if is_lab else {},
+                ))
+        Course.objects.bulk_create(courses, batch_size=1000)
+        # bulk_create sends no signals
+        bump_table_versions(Scheme, Course, User)
+        ArticulationMatrix.objects.bulk_create(
+            [ArticulationMatrix(course=course, matrix=_articulation(rng)) for course in courses], batch_size=1000
+        )
+
+        # 3. Students
+        student_ids = [f'{prefix}S{j:07d}' for j in range(students)]
+        Student.objects.bulk_create(
+            [Student(id=sid, name=f'Student {j}', usn=f'{prefix}USN{j:07d}') for j, sid in enumerate(student_ids)],
+            batch_size=batch_size,
+        )
+    abilities = {sid: min(0.95, max(0.2, rng.gauss(0.62, 0.15))) for sid in student_ids}
+    stats.departments, stats.schemes, stats.courses, stats.students = len(depts), len(schemes), len(courses), students
+    stats.course_ids = [course.id for course in courses]
+
+    # 4. Enrollments and marks, flushed in batches so memory stays flat
+    Enrollment = Student.courses.through
+    marks = []
+
+    def flush():
+        with transaction.atomic():
+            Mark.objects.bulk_create(marks, batch_size=batch_size)
+            stats.mark_scores += len(MarkScore.objects.bulk_create(
+                [row for mark in marks for row in score_rows_for(mark)], batch_size=batch_size
+            ))
+        stats.marks += len(marks)
+        marks.clear()
+        if on_progress:
+            on_progress(stats)
+
+    for course in courses:
+        enrolled = rng.sample(student_ids, students_per_course)
+        Enrollment.objects.bulk_create(
+            [Enrollment(student_id=sid, course_id=course.id) for sid in enrolled], batch_size=batch_size
+        )
+        stats.enrollments += len(enrolled)
+        for mark in _course_marks(rng, course, enrolled, abilities):
+            marks.append(mark)
+            if len(marks) >= batch_size:
+                flush()
+    if marks:
+        flush()
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
@@ -0,0 +1,190 @@
+"""
+Load benchmarks over a seeded institution (`manage.py run_benchmarks`).
+
+Each benchmark is timed for a number of rounds after one warm-up call and
+summarized like pytest-benchmark (min/max/mean/median/stddev, seconds).
+Results are saved as JSON so a later run can be compared against them.
+Endpoints are called on their viewsets with APIRequestFactory (view,
+serializer and query work, without middleware); writes run in a
+transaction that is rolled back.
+"""
+import io
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings as django_settings
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .bulk_marks import MAX_BULK_MARK_ROWS
+from .calculation_services import calculate_course_attainment, calculate_courses_attainment
+from .models import Course, Mark, Student, User
+from .views import CourseViewSet, MarkViewSet, StudentViewSet
+
+BULK_UPLOAD_ROWS = 500
+
+
+def available_engines():
+    engines = ['python', 'vectorized', 'incremental']
+    if connection.vendor == 'postgresql':
+        engines.insert(2, 'sql')
+    return engines
+
+
+def time_rounds(fn, rounds):
+    """Runs fn once to warm up, then `rounds` times; returns the timing summary."""
+    fn()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "rounds": rounds,
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "stddev": statistics.stdev(timings) if rounds > 1 else 0.0,
+    }
+
+
+def _call(view, request, user):
+    force_authenticate(request, user=user)
+    response = view(request)
+    response.render()
+    if response.status_code >= 400:
+        raise RuntimeError(f"{request.path} returned {response.status_code}: {response.content[:200]!r}")
+    return response
+
+
+def _rolled_back(fn):
+    def run():
+        with transaction.atomic():
+            fn()
+            transaction.set_rollback(True)
+    return run
+
+
+def _benchmarks(courses, engines):
+    """name -> callable, over the sampled courses."""
+    course = courses[0]
+    faculty = course.assigned_faculty
+    admin = User(username='benchmark-superadmin', role=User.Role.SUPER_ADMIN)
+    factory = APIRequestFactory()
+    benchmarks = {}
+
+    # 1. Attainment: per course with each engine, and the batched path
+    for engine in engines:
+        def attainment(engine=engine):
+            with override_settings(ATTAINMENT_ENGINE=engine):
+                for c in courses:
+                    report = calculate_course_attainment(c.id)
+                    if "error" in report:
+                        raise RuntimeError(f"{c.id}: {report['error']}")
+        benchmarks[f"attainment.{engine}"] = attainment
+    benchmarks["attainment.batch"] = lambda: calculate_courses_attainment(courses)
+
+    # 2. List endpoints, as the course's faculty and as a super admin
+    mark_list = MarkViewSet.as_view({'get': 'list'})
+    student_list = StudentViewSet.as_view({'get': 'list'})
+    course_list = CourseViewSet.as_view({'get': 'list'})
+    benchmarks["list.marks"] = lambda: _call(
+        mark_list, factory.get('/api/marks/', {'course': course.id, 'paginate': 'cursor', 'page_size': 5000}), faculty)
+    benchmarks["list.students"] = lambda: _call(
+        student_list, factory.get('/api/students/', {'course': course.id, 'paginate': 'cursor', 'page_size': 5000}), faculty)
+    benchmarks["list.courses"] = lambda: _call(
+        course_list, factory.get('/api/courses/', {'department': course.department_id}), admin)
+
+    # 3. Writes: a CSV of new students and an upsert of existing marks
+    bulk_upload = StudentViewSet.as_view({'post': 'bulk_upload'})
+    csv_body = ''.join(f'BENCHUSN{j:05d},Benchmark Student {j}\n' for j in range(BULK_UPLOAD_ROWS))
+
+    def upload_students():
+        upload = io.BytesIO(csv_body.encode())
+        upload.name = 'students.csv'
+        _call(bulk_upload, factory.post('/api/students/bulk_upload/', {'file': upload, 'course_id': course.id},
+                                        format='multipart'), admin)
+    benchmarks["bulk_upload.students"] = _rolled_back(upload_students)
+
+    marks_bulk = MarkViewSet.as_view({'post': 'bulk'})
+    rows = [
+        {'student': student_id, 'course': course.id, 'assessment_name': name, 'scores': scores}
+        for student_id, name, scores in Mark.objects.filter(course=course, improvement_test_for__isnull=True)
+        .values_list('student_id', 'assessment_name', 'scores')[:MAX_BULK_MARK_ROWS]
+    ]
+    benchmarks["bulk.marks"] = _rolled_back(
+        lambda: _call(marks_bulk, factory.post('/api/marks/bulk/', {'rows': rows}, format='json'), faculty)
+    )
+    return benchmarks
+
+
+def run_benchmarks(courses, rounds=5, engines=None, only=None):
+    """
+    Times every benchmark over `courses` (a Course queryset) and returns the
+    results document. `only` restricts the run to names starting with one of
+    its prefixes.
+    """
+    courses = list(courses.select_related('scheme', 'assigned_faculty'))
+    if not courses:
+        raise ValueError("No courses to benchmark")
+    if courses[0].assigned_faculty is None:
+        raise ValueError(f"Course {courses[0].id} has no assigned faculty")
+
+    results = []
+    # Paginated responses build absolute URLs from the factory's host
+    with override_settings(ALLOWED_HOSTS=[*django_settings.ALLOWED_HOSTS, 'testserver']):
+        for name, fn in _benchmarks(courses, engines or available_engines()).items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results.append({"name": name, "stats": time_rounds(fn, rounds)})
+
+    return {
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "machine_info": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": connection.vendor,
+            "attainment_engine": getattr(django_settings, 'ATTAINMENT_ENGINE', 'python'),
+        },
+        "dataset": {
+            "courses": Course.objects.count(),
+            "students": Student.objects.count(),
+            "marks": Mark.objects.count(),
+            "sampled_courses": [c.id for c in courses],
+        },
+        "benchmarks": results,
+    }
+
+
+def save_results(results, path):
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2)
+
+
+def load_results(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare_results(results, baseline, threshold=0.2):
+    """
+    Median of each benchmark against the baseline. Returns rows of
+    (name, baseline median, current median, change) and the names that are
+    slower by more than `threshold` (a fraction).
+    """
+    before = {b['name']: b['stats']['median'] for b in baseline.get('benchmarks', [])}
+    rows, regressions = [], []
+    for bench in results['benchmarks']:
+        name, median = bench['name'], bench['stats']['median']
+        if name not in before:
+            continue
+        change = median / before[name] - 1 if before[name] else 0.0
+        rows.append((name, before[name], median, change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
@@ -0,0 +1,163 @@
+import re
+import uuid
+
+from django.db import transaction
+
+from .attainment_cache import invalidate_course_attainment
+from .co_counters import incremental_enabled, reset_co_counters
+from .mark_scores import sync_mark_scores
+from .models import Mark, Student
+
+# Upper bound for a single POST /marks/bulk/ request
+MAX_BULK_MARK_ROWS = 10000
+
+MARK_UNIQUE_FIELDS = ['student', 'course', 'assessment_name']
+
+
+def _mark_id(course_id, student_id, assessment_name):
+    # Same format MarksEntryPage.jsx uses for new records
+    mark_id = f"M_{course_id}_{student_id}_{re.sub(r'[^a-zA-Z0-9]', '', assessment_name)}"
+    if len(mark_id) > Mark._meta.get_field('id').max_length:
+        mark_id = f"M_{uuid.uuid4().hex}"
+    return mark_id
+
+
+def _validate_row(row, courses, known_students):
+    if not isinstance(row, dict):
+        return {"row": "Each row must be an object"}
+
+    errors = {}
+    for field in ['student', 'course', 'assessment_name']:
+        if not row.get(field):
+            errors[field] = "This field is required."
+    if errors:
+        return errors
+
+    if str(row['course']) not in courses:
+        errors['course'] = "Course not found."
+    if str(row['student']) not in known_students:
+        errors['student'] = "Student not found."
+    if len(str(row['assessment_name'])) > Mark._meta.get_field('assessment_name').max_length:
+        errors['assessment_name'] = "Ensure this field has no more than 100 characters."
+
+    improvement_for = row.get('improvement_test_for')
+    if improvement_for is not None:
+        if not isinstance(improvement_for, str):
+            errors['improvement_test_for'] = "Must be a string or null."
+        elif len(improvement_for) > Mark._meta.get_field('improvement_test_for').max_length:
+            errors['improvement_test_for'] = "Ensure this field has no more than 100 characters."
+
+    if not row.get('delete') and not isinstance(row.get('scores', {}), dict):
+        errors['scores'] = "Scores must be an object."
+    if row.get('id') is not None and len(str(row['id'])) > Mark._meta.get_field('id').max_length:
+        errors['id'] = "Ensure this field has no more than 50 characters."
+    return errors
+
+
+def _existing_mark_ids(keys):
+    """{(student_id, course_id, assessment_name): mark id} of the stored marks among `keys`."""
+    if not keys:
+        return {}
+    queryset = Mark.objects.filter(
+        student_id__in={key[0] for key in keys},
+        course_id__in={key[1] for key in keys},
+        assessment_name__in={key[2] for key in keys},
+    ).values_list('id', 'student_id', 'course_id', 'assessment_name')
+    return {(s, c, a): mark_id for mark_id, s, c, a in queryset}
+
+
+def upsert_marks(rows, courses):
+    """
+    Applies a batch of mark rows in one transaction.
+
+    Rows are upserted with bulk_create(update_conflicts=True) on the
+    (student, course, assessment_name) key; a row with "delete": true removes
+    the matching mark instead. `courses` maps course id -> Course for the
+    courses the caller is allowed to write. Returns per-row outcomes.
+    """
+    student_ids = {str(row.get('student')) for row in rows if isinstance(row, dict) and row.get('student')}
+    known_students = set(Student.objects.filter(id__in=student_ids).values_list('id', flat=True))
+
+    results = [None] * len(rows)
+    valid = []
+    seen = set()
+    for index, row in enumerate(rows):
+        errors = _validate_row(row, courses, known_students)
+        if not errors:
+            key = (str(row['student']), str(row['course']), str(row['assessment_name']))
+            if key in seen:
+                errors = {"row": "Duplicate row for this student and assessment."}
+            else:
+                seen.add(key)
+                valid.append((index, key, row))
+        if errors:
+            results[index] = {"index": index, "status": "error", "errors": errors}
+
+    touched_courses = {key[1] for _, key, _ in valid}
+    with transaction.atomic():
+        # 1. Existing marks and the new ids, read in the write's transaction
+        existing = _existing_mark_ids([key for _, key, _ in valid])
+
+        to_delete = []
+        to_upsert = {}
+        new_ids = {}
+        for index, key, row in valid:
+            student_id, course_id, assessment_name = key
+            mark_id = existing.get(key)
+            if row.get('delete'):
+                if mark_id:
+                    to_delete.append(mark_id)
+                results[index] = {"index": index, "status": "deleted" if mark_id else "skipped", "id": mark_id}
+                continue
+
+            if not mark_id:
+                mark_id = str(row['id']) if row.get('id') else _mark_id(course_id, student_id, assessment_name)
+                if mark_id in new_ids:
+                    mark_id = f"M_{uuid.uuid4().hex}"
+                new_ids[mark_id] = index
+            to_upsert[index] = Mark(
+                id=mark_id,
+                student_id=student_id,
+                course_id=course_id,
+                assessment_name=assessment_name,
+                scores=row.get('scores') or {},
+                improvement_test_for=row.get('improvement_test_for') or None,
+            )
+            results[index] = {"index": index, "status": "updated" if key in existing else "created", "id": mark_id}
+
+        # A generated id that already belongs to another mark would break the insert
+        if new_ids:
+            for mark_id in Mark.objects.filter(id__in=list(new_ids)).values_list('id', flat=True):
+                index = new_ids[mark_id]
+                to_upsert[index].id = results[index]['id'] = f"M_{uuid.uuid4().hex}"
+
+        # 2. Write
+        if to_delete:
+            Mark.objects.filter(id__in=to_delete).delete()
+        if to_upsert:
+            Mark.objects.bulk_create(
+                list(to_upsert.values()),
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=MARK_UNIQUE_FIELDS,
+                update_fields=['scores', 'improvement_test_for'],
+            )
+            # A mark inserted concurrently since step 1 was updated and kept its id
+            stored = _existing_mark_ids([
+                (m.student_id, m.course_id, m.assessment_name) for m in to_upsert.values()
+            ])
+            for index, mark in to_upsert.items():
+                stored_id = stored[(mark.student_id, mark.course_id, mark.assessment_name)]
+                if stored_id != mark.id:
+                    mark.id = stored_id
+                    results[index].update(id=stored_id, status="updated")
+        # bulk_create bypasses the post_save signals
+        sync_mark_scores(to_upsert.values())
+        invalidate_course_attainment(touched_courses)
+        if incremental_enabled():
+            reset_co_counters(touched_courses)
+
+    summary = {status: 0 for status in ['created', 'updated', 'deleted', 'skipped', 'error']}
+    for result in results:
+        summary[result['status']] += 1
+    return {**summary, "results": results}
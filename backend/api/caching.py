@@ -0,0 +1,195 @@
+"""
+Two-tier cache shared by the worker processes.
+
+The 'local' cache (settings.CACHES) lives in the process; 'default' is the
+shared tier every worker sees (a database table, files or Redis, picked by
+CACHE_BACKEND). Reads try the local tier first and fill it from the shared
+one. Keys embed the version of the data they were built from
+(AttainmentResult.version, the TableVersion counters), which the model
+signals bump, so a changed row is never read from an old entry. The few
+unversioned entries are deleted by the signals and kept in the local tier for
+at most CACHE_LOCAL_SECONDS (or not at all).
+
+get_or_compute lets one caller rebuild a missing value while concurrent
+callers, in any worker, wait for it instead of recomputing (single flight).
+Hits and misses per key kind are counted in `metrics` for /api/cache-stats/.
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+
+LOCAL_ALIAS = 'local'
+SHARED_ALIAS = 'default'
+# Waiters re-check the shared tier this often while another caller computes
+LOCK_POLL_SECONDS = 0.05
+
+MISSING = object()
+# Keep the backend's TIMEOUT
+DEFAULT = object()
+
+
+class CacheMetrics:
+    """Per-process counts of local_hit, shared_hit, miss, wait and lock_timeout by key kind."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def record(self, kind, event):
+        with self.lock:
+            self.counts.setdefault(kind, Counter())[event] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+    def snapshot(self):
+        with self.lock:
+            counts = {kind: dict(events) for kind, events in self.counts.items()}
+        kinds = {}
+        for kind, events in sorted(counts.items()):
+            hits = events.get('local_hit', 0) + events.get('shared_hit', 0) + events.get('wait', 0)
+            lookups = hits + events.get('miss', 0)
+            kinds[kind] = {**events, "hit_rate": round(hits / lookups, 3) if lookups else None}
+        return {
+            "shared_backend": settings.CACHES[SHARED_ALIAS]['BACKEND'],
+            "kinds": kinds,
+        }
+
+
+metrics = CacheMetrics()
+
+
+def _local():
+    return caches[LOCAL_ALIAS]
+
+
+def _shared():
+    return caches[SHARED_ALIAS]
+
+
+def _kind(key):
+    return key.split(':', 1)[0]
+
+
+def _timeout_kwargs(timeout):
+    return {} if timeout is DEFAULT else {'timeout': timeout}
+
+
+def is_shared():
+    """False when the 'shared' tier is a per-process LocMemCache (CACHE_BACKEND='locmem')."""
+    return not settings.CACHES[SHARED_ALIAS]['BACKEND'].endswith('.LocMemCache')
+
+
+def check_shared_backend(app_configs=None, **kwargs):
+    """System check: a per-process shared tier misses other workers' invalidations."""
+    if is_shared() or settings.DEBUG or getattr(settings, 'TESTING', False):
+        return []
+    return [checks.Warning(
+        "The shared cache tier is a per-process LocMemCache.",
+        hint="Set CACHE_BACKEND to db, file or redis unless the API runs in a single worker process.",
+        id='api.W001',
+    )]
+
+
+def local_seconds():
+    """Local-tier lifetime of unversioned entries: how late other workers may see their changes."""
+    return getattr(settings, 'CACHE_LOCAL_SECONDS', 5)
+
+
+def get(key, default=None, local_timeout=DEFAULT):
+    """
+    Local tier, then the shared one. A shared hit is copied to the local tier
+    for `local_timeout` seconds (0 keeps it out of the local tier).
+    """
+    kind = _kind(key)
+    if local_timeout != 0:
+        value = _local().get(key, MISSING)
+        if value is not MISSING:
+            metrics.record(kind, 'local_hit')
+            return value
+    value = _shared().get(key, MISSING)
+    if value is MISSING:
+        metrics.record(kind, 'miss')
+        return default
+    metrics.record(kind, 'shared_hit')
+    if local_timeout != 0:
+        _local().set(key, value, **_timeout_kwargs(local_timeout))
+    return value
+
+
+def set(key, value, timeout=DEFAULT, local_timeout=DEFAULT):
+    _shared().set(key, value, **_timeout_kwargs(timeout))
+    if local_timeout != 0:
+        _local().set(key, value, **_timeout_kwargs(timeout if local_timeout is DEFAULT else local_timeout))
+
+
+def delete(*keys):
+    """Removes the keys from the shared tier and this process's local tier."""
+    _shared().delete_many(keys)
+    _local().delete_many(keys)
+
+
+def delete_on_commit(*keys):
+    """
+    delete() now and again when the transaction commits, so a value rebuilt
+    from the uncommitted rows in between is dropped too.
+    """
+    delete(*keys)
+    transaction.on_commit(lambda: delete(*keys))
+
+
+def clear():
+    _shared().clear()
+    _local().clear()
+
+
+def get_or_compute(key, compute, timeout=DEFAULT, local_timeout=DEFAULT, cache_if=None):
+    """
+    The cached value of `key`, else compute() stored in both tiers (unless
+    cache_if(value) is false). Only one caller computes a key at a time:
+    the others poll the shared tier for its result, for up to
+    CACHE_LOCK_SECONDS, then compute themselves.
+    """
+    value = get(key, MISSING, local_timeout)
+    if value is not MISSING:
+        return value
+
+    kind = _kind(key)
+    lock_key = f'lock:{key}'
+    lock_seconds = getattr(settings, 'CACHE_LOCK_SECONDS', 30)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + lock_seconds
+    while not _shared().add(lock_key, token, timeout=lock_seconds):
+        if time.monotonic() >= deadline:
+            metrics.record(kind, 'lock_timeout')
+            token = None
+            break
+        time.sleep(LOCK_POLL_SECONDS)
+        value = _shared().get(key, MISSING)
+        if value is not MISSING:
+            metrics.record(kind, 'wait')
+            if local_timeout != 0:
+                _local().set(key, value, **_timeout_kwargs(local_timeout))
+            return value
+
+    try:
+        # Filled by the previous holder between our miss and taking the lock
+        value = _shared().get(key, MISSING) if token is not None else MISSING
+        if value is not MISSING:
+            metrics.record(kind, 'wait')
+            return value
+        value = compute()
+        if cache_if is None or cache_if(value):
+            set(key, value, timeout, local_timeout)
+    finally:
+        # The lock may have expired and been taken by another caller meanwhile
+        if token is not None and _shared().get(lock_key) == token:
+            _shared().delete(lock_key)
+    return value
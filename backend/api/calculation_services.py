@@ -1,32 +1,76 @@
+from django.conf import settings as django_settings
+
+from . import caching
+from .compiled_scheme import get_compiled_scheme
 from .models import Course, Mark, ArticulationMatrix, Configuration
+from .profiling import phase, profiled
 
-def get_scheme_settings(course):
-    if course.scheme and course.scheme.settings:
-        return course.scheme.settings
-    
+DEFAULT_SCHEME_SETTINGS = {
+    "pass_criteria": 50,
+    "attainment_levels": {"level_3": 70, "level_2": 60, "level_1": 50},
+    "weightage": {"direct": 80, "indirect": 20},
+    "po_calculation": {"normalization_factor": 3}
+}
+
+# Cache key of the global scheme settings, deleted by the Configuration signal
+GLOBAL_SETTINGS_CACHE_KEY = 'config:global_scheme_settings'
+
+def get_global_scheme_settings():
+    # Shared tier only: reports computed from settings another worker changed would be stored as fresh
+    return caching.get_or_compute(GLOBAL_SETTINGS_CACHE_KEY, _load_global_scheme_settings, local_timeout=0)
+
+def _load_global_scheme_settings():
     try:
         global_config = Configuration.objects.get(key='global_scheme_settings')
         return global_config.value
     except Configuration.DoesNotExist:
-        return {
-            "pass_criteria": 50,
-            "attainment_levels": {"level_3": 70, "level_2": 60, "level_1": 50},
-            "weightage": {"direct": 80, "indirect": 20},
-            "po_calculation": {"normalization_factor": 3}
-        }
+        return DEFAULT_SCHEME_SETTINGS
+
+def get_scheme_settings(course, global_settings=None):
+    """
+    Settings of the course's scheme, falling back to the global configuration.
+    Batch callers pass `global_settings` so it is only fetched once.
+    """
+    if course.scheme and course.scheme.settings:
+        return course.scheme.settings
+    if global_settings is not None:
+        return global_settings
+    return get_global_scheme_settings()
+
+def get_course_scheme(course, global_settings=None):
+    """get_scheme_settings compiled for the engines, memoized per scheme id."""
+    settings = get_scheme_settings(course, global_settings)
+    scheme_id = course.scheme_id if course.scheme and course.scheme.settings else None
+    return get_compiled_scheme(scheme_id, settings)
 
 def calculate_course_attainment(course_id):
     try:
-        course = Course.objects.get(id=course_id)
+        course = Course.objects.select_related('scheme').get(id=course_id)
     except Course.DoesNotExist:
         return {"error": "Course not found"}
 
-    settings = get_scheme_settings(course)
+    scheme = get_course_scheme(course)
     marks = Mark.objects.filter(course=course)
-    
-    co_stats = _calculate_co_levels(marks, course, settings)
-    final_scores = _calculate_final_score_index(co_stats, course, settings)
-    po_stats = _calculate_po_attainment(course, final_scores, settings)
+    matrix = ArticulationMatrix.objects.filter(course=course).values_list('matrix', flat=True).first()
+
+    return build_course_report(course, marks, matrix, scheme)
+
+def build_course_report(course, marks, matrix, scheme):
+    """
+    Computes the CO/PO report from already-loaded inputs.
+    `marks` is a Mark queryset, Mark objects or MARK_ROW_FIELDS tuples; `matrix` is the
+    ArticulationMatrix.matrix dict, or None when the course has no matrix;
+    `scheme` is a CompiledScheme.
+    """
+    # Querysets are streamed by the engine, so their loading counts as co_levels
+    with phase('co_levels'):
+        co_stats = _get_co_level_engine()(marks, course, scheme)
+    return report_from_co_levels(course, co_stats, matrix, scheme)
+
+def report_from_co_levels(course, co_stats, matrix, scheme):
+    """The course report for already computed {co: {cie_level, see_level}}."""
+    final_scores = _calculate_final_score_index(co_stats, course, scheme)
+    po_stats = _calculate_po_attainment(matrix, final_scores, scheme)
     
     return {
         "course_id": course.id,
@@ -35,156 +79,273 @@ def calculate_course_attainment(course_id):
         "po_attainment": po_stats
     }
 
-def _calculate_co_levels(marks, course, settings):
-    pass_threshold = float(settings.get('pass_criteria', 50))
-    levels_dict = settings.get('attainment_levels', {'level_3': 70, 'level_2': 60, 'level_1': 50})
-    
-    course_type = course.settings.get('courseType', 'Theory') if course.settings else 'Theory'
-    
-    sorted_levels = []
-    for k, v in levels_dict.items():
-        lvl_num = int(''.join(filter(str.isdigit, k))) if any(c.isdigit() for c in k) else 0
-        sorted_levels.append({'level': lvl_num, 'threshold': float(v)})
-    sorted_levels.sort(key=lambda x: x['threshold'], reverse=True)
-    
-    def get_level(percentage):
-        for l in sorted_levels:
-            if percentage >= l['threshold']:
-                return l['level']
-        return 0
+def calculate_courses_attainment(courses):
+    """
+    Batch version of calculate_course_attainment for courses loaded with
+    select_related('scheme'). Marks, articulation matrices and the global
+    configuration are fetched with one query each, whatever the course count.
+    Returns {course_id: report}.
+    """
+    courses = list(courses)
+    if not courses:
+        return {}
+    marks_by_course, matrices, global_settings = _load_course_inputs(courses)
 
-    tools = course.assessment_tools if isinstance(course.assessment_tools, list) else []
-    see_tool = next((t for t in tools if t.get('type') in ['Semester End Exam', 'SEE']), None)
-    internal_tools = [t for t in tools if t.get('type') not in ['Semester End Exam', 'SEE', 'Improvement Test']]
-    
-    co_list = []
+    return {
+        c.id: build_course_report(c, marks_by_course[c.id], matrices.get(c.id), get_course_scheme(c, global_settings))
+        for c in courses
+    }
+
+@profiled('load_marks')
+def _load_course_inputs(courses):
+    """
+    ({course_id: MARK_ROW_FIELDS tuples}, {course_id: matrix}, global settings or None)
+    for a list of courses, one query each.
+    """
+    course_ids = [c.id for c in courses]
+
+    marks_by_course = {course_id: [] for course_id in course_ids}
+    for course_id, *row in Mark.objects.filter(course_id__in=course_ids).values_list('course_id', *MARK_ROW_FIELDS):
+        marks_by_course[course_id].append(tuple(row))
+
+    matrices = dict(ArticulationMatrix.objects.filter(course_id__in=course_ids).values_list('course_id', 'matrix'))
+
+    global_settings = None
+    if any(not (c.scheme and c.scheme.settings) for c in courses):
+        global_settings = get_global_scheme_settings()
+    return marks_by_course, matrices, global_settings
+
+def rollup_outcome_attainment(reports):
+    """
+    Averages the per-course PO attainment of several course reports.
+    Matrix columns whose id starts with 'PSO' are returned separately.
+    """
+    totals = {}
+    for report in reports:
+        for row in report.get('po_attainment', []):
+            entry = totals.setdefault(row['po'], {'attained': 0.0, 'percentage': 0.0, 'courses': 0})
+            entry['attained'] += row['attained']
+            entry['percentage'] += row['percentage']
+            entry['courses'] += 1
+
+    po_rollup, pso_rollup = [], []
+    for outcome_id, entry in totals.items():
+        item = {
+            "po": outcome_id,
+            "attained": round(entry['attained'] / entry['courses'], 2),
+            "percentage": round(entry['percentage'] / entry['courses'], 2),
+            "courses": entry['courses']
+        }
+        if str(outcome_id).upper().startswith('PSO'):
+            pso_rollup.append(item)
+        else:
+            po_rollup.append(item)
+    return po_rollup, pso_rollup
+
+def _get_co_level_engine():
+    """
+    Returns the CO level implementation selected by settings.ATTAINMENT_ENGINE.
+    All engines produce identical results; 'vectorized' needs NumPy,
+    'sql' runs its aggregates on PostgreSQL (other databases use 'python')
+    and 'incremental' reads the per-CO counters kept by api/co_counters.py.
+    """
+    engine = getattr(django_settings, 'ATTAINMENT_ENGINE', 'python')
+    if engine == 'vectorized':
+        from .vectorized_attainment import calculate_co_levels_vectorized
+        return calculate_co_levels_vectorized
+    if engine == 'sql':
+        from .sql_attainment import calculate_co_levels_sql
+        return calculate_co_levels_sql
+    if engine == 'incremental':
+        from .co_counters import calculate_co_levels_incremental
+        return calculate_co_levels_incremental
+    return _calculate_co_levels
+
+# --- Helpers shared by the Python and vectorized CO engines ---
+
+SEE_TOOL_TYPES = ['Semester End Exam', 'SEE']
+SEE_RECORD_NAMES = ['SEE', 'Semester End Exam']
+MARK_ROW_FIELDS = ('student_id', 'assessment_name', 'scores', 'improvement_test_for')
+
+def _mark_rows(marks):
+    # Querysets are read with values_list, so no Mark instances are built
+    if hasattr(marks, 'values_list'):
+        return marks.values_list(*MARK_ROW_FIELDS)
+    return (m if isinstance(m, tuple) else (m.student_id, m.assessment_name, m.scores, m.improvement_test_for) for m in marks)
+
+def _course_type(course):
+    return course.settings.get('courseType', 'Theory') if course.settings else 'Theory'
+
+def _course_co_list(course):
     if isinstance(course.cos, list):
-        co_list = [c.get('id') if isinstance(c, dict) else c for c in course.cos]
-        
-    student_marks = {}
-    for m in marks:
-        if m.student.id not in student_marks:
-            student_marks[m.student.id] = []
-        student_marks[m.student.id].append(m)
-
-    def is_absent(val):
-        return str(val).strip().upper() in ['AB', 'ABSENT', 'A', 'NA', '-']
-
-    def get_total(scores, co_keys):
-        t = 0
-        for k, v in scores.items():
-            if k in co_keys and not str(k).startswith('_'):
+        return [c.get('id') if isinstance(c, dict) else c for c in course.cos]
+    return []
+
+def _split_assessment_tools(course):
+    tools = course.assessment_tools if isinstance(course.assessment_tools, list) else []
+    see_tool = next((t for t in tools if t.get('type') in SEE_TOOL_TYPES), None)
+    internal_tools = [t for t in tools if t.get('type') not in SEE_TOOL_TYPES + ['Improvement Test']]
+    return see_tool, internal_tools
+
+def _tool_co_distribution(tool, co_list):
+    # --- THE FIX: ALWAYS READ THE CO DISTRIBUTION FIRST ---
+    co_dist = tool.get('coDistribution', {})
+    if not co_dist and tool.get('maxMarks'):
+        co_dist = {co: tool.get('maxMarks') for co in co_list}
+    return co_dist
+
+def _is_absent(val):
+    return str(val).strip().upper() in ['AB', 'ABSENT', 'A', 'NA', '-']
+
+def _normalize_name(s):
+    return ''.join(filter(str.isalnum, str(s).lower()))
+
+def _get_total(scores, co_keys):
+    t = 0
+    for k, v in scores.items():
+        if k in co_keys and not str(k).startswith('_'):
+            try:
+                t += float(v)
+            except ValueError:
+                pass
+    return t
+
+def _see_obtained(scores):
+    """Total SEE marks, or None when the student was absent for any part."""
+    vals = list(scores.values())
+    if any(_is_absent(v) for v in vals):
+        return None
+    return sum(float(v) for v in vals if str(v).replace('.', '', 1).isdigit())
+
+def _normalize_tool_scores(sc, tool, co_dist, co_list, course_type):
+    # --- PROPORTIONAL MATHEMATICS ---
+    if not sc: return {}
+    norm = dict(sc)
+    if course_type == 'Lab' and tool.get('type') == 'Internal Assessment':
+        t_val = norm.get('Test Marks')
+        c_val = norm.get('Continuous Eval')
+        if t_val is not None or c_val is not None:
+            if _is_absent(t_val) and _is_absent(c_val):
+                for c in co_dist.keys(): norm[c] = 'AB'
+            else:
                 try:
-                    t += float(v)
+                    t_tot = float(t_val or 0) + float(c_val or 0)
+                    max_m = float(tool.get('maxMarks', 1))
+                    # Calculate ratio: (Total Obtained / Tool Max Marks) * CO Max Marks
+                    for c, c_max in co_dist.items():
+                        norm[c] = (t_tot / max_m) * float(c_max) if max_m > 0 else 0
                 except ValueError:
-                    pass
-        return t
-        
-    co_results = {co: {'cie_attempts': 0, 'cie_passed': 0, 'see_attempts': 0, 'see_passed': 0} for co in co_list}
-
-    def normalize(s): 
-        return ''.join(filter(str.isalnum, str(s).lower()))
-
-    for student_id, s_marks in student_marks.items():
-        if see_tool:
-            see_record = next((m for m in s_marks if m.assessment_name in [see_tool.get('name'), 'SEE', 'Semester End Exam']), None)
-            if see_record and see_record.scores:
-                vals = list(see_record.scores.values())
-                if not any(is_absent(v) for v in vals):
-                    obt = sum(float(v) for v in vals if str(v).replace('.','',1).isdigit())
-                    target = (float(see_tool.get('maxMarks', 100)) * pass_threshold) / 100.0
-                    
-                    see_map = list(see_tool.get('coDistribution', {}).keys())
-                    if not see_map:
-                        see_map = co_list
-                        
-                    for co in see_map:
-                        if co in co_results:
-                            co_results[co]['see_attempts'] += 1
-                            if obt >= target:
-                                co_results[co]['see_passed'] += 1
-        
-        for tool in internal_tools:
-            tool_name = tool.get('name')
-            record = next((m for m in s_marks if m.assessment_name == tool_name), None)
-            raw_scores = record.scores if record else {}
-            
-            # --- THE FIX: ALWAYS READ THE CO DISTRIBUTION FIRST ---
-            co_dist = tool.get('coDistribution', {})
-            if not co_dist and tool.get('maxMarks'):
-                 co_dist = {co: tool.get('maxMarks') for co in co_list}
-            
-            # --- PROPORTIONAL MATHEMATICS ---
-            def normalize_scores_for_calc(sc):
-                if not sc: return {}
-                norm = dict(sc)
-                if course_type == 'Lab' and tool.get('type') == 'Internal Assessment':
-                    t_val = norm.get('Test Marks')
-                    c_val = norm.get('Continuous Eval')
-                    if t_val is not None or c_val is not None:
-                        if is_absent(t_val) and is_absent(c_val):
-                            for c in co_dist.keys(): norm[c] = 'AB'
-                        else:
-                            try:
-                                t_tot = float(t_val or 0) + float(c_val or 0)
-                                max_m = float(tool.get('maxMarks', 1))
-                                # Calculate ratio: (Total Obtained / Tool Max Marks) * CO Max Marks
-                                for c, c_max in co_dist.items():
-                                    norm[c] = (t_tot / max_m) * float(c_max) if max_m > 0 else 0
-                            except ValueError:
-                                for c in co_dist.keys(): norm[c] = 'AB'
-                elif tool.get('type') in ['Activity', 'Laboratory']:
-                    s_val = norm.get('Score')
-                    if s_val is not None:
-                        for c in co_list: norm[c] = s_val
-                return norm
-
-            scores = normalize_scores_for_calc(raw_scores)
-
-            imp_record = next((m for m in s_marks if 
-                normalize(m.improvement_test_for) == normalize(tool_name) or 
-                normalize(m.scores.get('_improvementTarget', '')) == normalize(tool_name)
-            ), None)
-
-            if imp_record and imp_record.scores:
-                imp_scores = normalize_scores_for_calc(imp_record.scores)
-                orig_tot = get_total(scores, co_dist.keys())
-                imp_tot = get_total(imp_scores, co_dist.keys())
+                    for c in co_dist.keys(): norm[c] = 'AB'
+    elif tool.get('type') in ['Activity', 'Laboratory']:
+        s_val = norm.get('Score')
+        if s_val is not None:
+            for c in co_list: norm[c] = s_val
+    return norm
+
+def _co_value(scores, co):
+    val = scores.get(co)
+    if val is None and len([k for k in scores if not k.startswith('_')]) == 1:
+        val = list(scores.values())[0]
+    return val
+
+def _plan_tool_scores(sc, tool_plan, plan):
+    if tool_plan.kind == 'plain':
+        return sc or {}
+    return _normalize_tool_scores(sc, tool_plan.tool, tool_plan.co_dist, plan.co_list, plan.course_type)
+
+def _calculate_co_levels(marks, course, scheme):
+    from .assessment_plan import get_assessment_plan
+
+    # 1. Everything derived from the course configuration comes precompiled
+    plan = get_assessment_plan(course)
+    counts, has_marks = _count_co_attempts(marks, plan, scheme.pass_criteria)
+    return _co_levels_from_counts(plan, counts, has_marks, scheme)
+
+def _count_co_attempts(marks, plan, pass_threshold):
+    """
+    Per plan.co_keys column: (cie_attempts, cie_passed, see_attempts, see_passed),
+    plus whether any student has marks.
+    """
+    from .assessment_plan import improvement_key
+
+    targets = plan.targets(pass_threshold)
+
+    # 2. One pass over the rows indexes each student's records by assessment
+    #    name, their improvement records by tool and their SEE record
+    #    (first match wins, as with the old next() scans)
+    students = {}
+    records = {}
+    improvements = {}
+    see_records = {}
+    for student_id, name, scores, imp_for in _mark_rows(marks):
+        students.setdefault(student_id, None)
+        records.setdefault((student_id, name), scores)
+        if name in plan.see_names:
+            see_records.setdefault(student_id, scores)
+        for key in (improvement_key(imp_for), improvement_key(scores.get('_improvementTarget', ''))):
+            for t in plan.improvement_tools.get(key, ()):
+                improvements.setdefault((student_id, t), scores)
+
+    n_cos = len(plan.co_keys)
+    cie_attempts, cie_passed = [0] * n_cos, [0] * n_cos
+    see_attempts, see_passed = [0] * n_cos, [0] * n_cos
+
+    for s, student_id in enumerate(students):
+        see_scores = see_records.get(student_id)
+        if see_scores:
+            obt = _see_obtained(see_scores)
+            if obt is not None:
+                passed = obt >= plan.see_target(pass_threshold)
+                columns = plan.see_columns + plan.see_late_columns if s else plan.see_columns
+                for c in columns:
+                    see_attempts[c] += 1
+                    if passed:
+                        see_passed[c] += 1
+
+        # 3. CIE: indexed comparisons against the precomputed targets
+        for t, tool_plan in enumerate(plan.tools):
+            scores = _plan_tool_scores(records.get((student_id, tool_plan.name), {}), tool_plan, plan)
+
+            imp_raw = improvements.get((student_id, t))
+            if imp_raw:
+                imp_scores = _plan_tool_scores(imp_raw, tool_plan, plan)
+                orig_tot = _get_total(scores, tool_plan.co_dist.keys())
+                imp_tot = _get_total(imp_scores, tool_plan.co_dist.keys())
                 if imp_tot > orig_tot:
                     scores = imp_scores
-            
-            for co, max_val in co_dist.items():
-                if co not in co_results:
-                    co_results[co] = {'cie_attempts': 0, 'cie_passed': 0, 'see_attempts': 0, 'see_passed': 0}
-                
-                val = scores.get(co)
-                if val is None and len([k for k in scores if not k.startswith('_')]) == 1:
-                    val = list(scores.values())[0]
 
-                if not is_absent(val) and val is not None:
+            for co, c, target in zip(tool_plan.cos, tool_plan.columns, targets[t]):
+                val = _co_value(scores, co)
+
+                if not _is_absent(val) and val is not None:
                     try:
                         num_val = float(val)
-                        co_results[co]['cie_attempts'] += 1
-                        if num_val >= (float(max_val) * pass_threshold / 100.0):
-                            co_results[co]['cie_passed'] += 1
                     except ValueError:
-                        pass
+                        continue
+                    cie_attempts[c] += 1
+                    if target is not None and num_val >= target:
+                        cie_passed[c] += 1
+
+    return (cie_attempts, cie_passed, see_attempts, see_passed), bool(students)
 
+def _co_levels_from_counts(plan, counts, has_marks, scheme):
+    cie_attempts, cie_passed, see_attempts, see_passed = counts
     final_co_stats = {}
-    for co, data in co_results.items():
-        cie_perc = (data['cie_passed'] / data['cie_attempts'] * 100) if data['cie_attempts'] > 0 else 0
-        see_perc = (data['see_passed'] / data['see_attempts'] * 100) if data['see_attempts'] > 0 else 0
+    for c, co in enumerate(plan.output_keys(has_marks)):
+        cie_perc = (cie_passed[c] / cie_attempts[c] * 100) if cie_attempts[c] > 0 else 0
+        see_perc = (see_passed[c] / see_attempts[c] * 100) if see_attempts[c] > 0 else 0
         
         final_co_stats[co] = {
-            'cie_level': get_level(cie_perc),
-            'see_level': get_level(see_perc)
+            'cie_level': scheme.level_for(cie_perc),
+            'see_level': scheme.level_for(see_perc)
         }
         
     return final_co_stats
 
-def _calculate_final_score_index(co_stats, course, settings):
-    w_direct = settings.get('weightage', {}).get('direct', 80) / 100.0
-    w_indirect = settings.get('weightage', {}).get('indirect', 20) / 100.0
+@profiled('final_index')
+def _calculate_final_score_index(co_stats, course, scheme):
+    w_direct = scheme.w_direct
+    w_indirect = scheme.w_indirect
     
     indirect_attainment_map = course.settings.get('indirect_attainment', {}) if course.settings else {}
     
@@ -205,14 +366,12 @@ def _calculate_final_score_index(co_stats, course, settings):
         
     return final_scores
 
-def _calculate_po_attainment(course, final_scores, settings):
-    try:
-        matrix_record = ArticulationMatrix.objects.get(course=course)
-        matrix = matrix_record.matrix
-    except ArticulationMatrix.DoesNotExist:
+@profiled('po')
+def _calculate_po_attainment(matrix, final_scores, scheme):
+    if matrix is None:
         return []
 
-    norm_factor = settings.get('po_calculation', {}).get('normalization_factor', 3)
+    norm_factor = scheme.normalization_factor
     po_sums = {}
     po_counts = {}
 
@@ -0,0 +1,175 @@
+"""
+Incremental CO counters for ATTAINMENT_ENGINE='incremental'.
+
+The CIE/SEE results of a course are sums of per-student contributions, so
+instead of recounting every mark on each edit, COAttainmentCounter keeps the
+sums per (course, CO). A Mark write recounts only the affected student's
+marks in the course, before and after the write, and applies the difference.
+Reports then read O(COs) rows. Counters are (re)built from a full count when
+missing or made under another configuration; cascades and queryset deletes
+drop them so the next read rebuilds. `manage.py reconcile_co_counters`
+checks them against a full recount.
+
+Counter writes lock the course row: a Mark write from its pre_save recount
+until its transaction commits, a rebuild while it counts and stores, so
+concurrent writes cannot apply a delta against the same "before" state or
+miss a rebuild.
+"""
+import hashlib
+
+from django.conf import settings as django_settings
+from django.db import transaction
+from django.db.models import F
+
+from .assessment_plan import get_assessment_plan, plan_key
+from .calculation_services import (
+    MARK_ROW_FIELDS,
+    _calculate_co_levels,
+    _co_levels_from_counts,
+    _count_co_attempts,
+    get_course_scheme,
+)
+from .models import COAttainmentCounter, Course, Mark
+
+COUNTER_FIELDS = ('cie_attempts', 'cie_passed', 'see_attempts', 'see_passed')
+
+
+def incremental_enabled():
+    return getattr(django_settings, 'ATTAINMENT_ENGINE', 'python') == 'incremental'
+
+
+def counter_fingerprint(course, scheme):
+    return hashlib.sha1(f"{plan_key(course)}|{scheme.pass_criteria}".encode()).hexdigest()
+
+
+def supports_counters(plan):
+    # A SEE CO that only exists in a tool distribution is counted from the
+    # second student on, which depends on the row order of the whole course
+    return not plan.see_late_columns
+
+
+def read_co_counters(course, plan, fingerprint):
+    """Stored counts per plan column, or None when they must be rebuilt."""
+    rows = list(
+        COAttainmentCounter.objects.filter(course_id=course.id, fingerprint=fingerprint)
+        .order_by('position').values_list(*COUNTER_FIELDS)
+    )
+    if len(rows) != len(plan.co_keys):
+        return None
+    return tuple(list(column) for column in zip(*rows)) if rows else ([], [], [], [])
+
+
+def lock_courses(course_ids):
+    """Row locks on the courses until the current transaction ends (no-op on SQLite)."""
+    list(Course.objects.select_for_update().filter(id__in=list(course_ids)).order_by('id').values_list('id', flat=True))
+
+
+def store_co_counters(course, plan, fingerprint, counts):
+    with transaction.atomic():
+        COAttainmentCounter.objects.filter(course_id=course.id).delete()
+        COAttainmentCounter.objects.bulk_create([
+            COAttainmentCounter(
+                course_id=course.id, co=co, position=c, fingerprint=fingerprint,
+                **{name: counts[i][c] for i, name in enumerate(COUNTER_FIELDS)},
+            )
+            for c, co in enumerate(plan.co_keys)
+        ])
+
+
+def reset_co_counters(course_ids):
+    """Drops the counters; the next report rebuilds them from a full count."""
+    course_ids = list(course_ids)
+    with transaction.atomic():
+        lock_courses(course_ids)
+        return COAttainmentCounter.objects.filter(course_id__in=course_ids).delete()[0]
+
+
+def calculate_co_levels_incremental(marks, course, scheme):
+    plan = get_assessment_plan(course)
+    if not supports_counters(plan):
+        return _calculate_co_levels(marks, course, scheme)
+
+    fingerprint = counter_fingerprint(course, scheme)
+    counts = read_co_counters(course, plan, fingerprint)
+    if counts is None:
+        with transaction.atomic():
+            # Mark writes wait until the rebuilt counters are stored
+            lock_courses([course.id])
+            counts = read_co_counters(course, plan, fingerprint)
+            if counts is None:
+                # Counted under the lock: `marks` may have been loaded before it
+                rows = Mark.objects.filter(course_id=course.id).values_list(*MARK_ROW_FIELDS)
+                counts, has_marks = _count_co_attempts(rows, plan, scheme.pass_criteria)
+                store_co_counters(course, plan, fingerprint, counts)
+                return _co_levels_from_counts(plan, counts, has_marks, scheme)
+    has_marks = Mark.objects.filter(course_id=course.id).exists()
+    return _co_levels_from_counts(plan, counts, has_marks, scheme)
+
+
+def _course_context(course_id):
+    """(plan, pass criteria, fingerprint) of a course whose counters are live, else None."""
+    course = Course.objects.select_related('scheme').filter(id=course_id).first()
+    if course is None:
+        return None
+    plan = get_assessment_plan(course)
+    if not supports_counters(plan):
+        return None
+    scheme = get_course_scheme(course)
+    fingerprint = counter_fingerprint(course, scheme)
+    if not COAttainmentCounter.objects.filter(course_id=course_id, fingerprint=fingerprint).exists():
+        return None
+    return plan, scheme.pass_criteria, fingerprint
+
+
+def _student_counts(course_id, student_id, plan, pass_threshold):
+    rows = Mark.objects.filter(course_id=course_id, student_id=student_id).values_list(*MARK_ROW_FIELDS)
+    return _count_co_attempts(rows, plan, pass_threshold)[0]
+
+
+def capture_mark_counts(mark, origin=None):
+    """
+    pre_save / pre_delete of a Mark: remembers the current contribution of
+    each student the write affects (the previous course/student too when the
+    mark is moved).
+    """
+    if origin is not None and not isinstance(origin, Mark):
+        # Course/student cascade or queryset delete: one reset per course
+        reset = origin.__dict__.setdefault('_co_counter_resets', set())
+        if mark.course_id not in reset:
+            reset.add(mark.course_id)
+            reset_co_counters([mark.course_id])
+        return
+
+    pairs = {(mark.course_id, mark.student_id)}
+    old_pair = Mark.objects.filter(pk=mark.pk).values_list('course_id', 'student_id').first()
+    if old_pair:
+        pairs.add(old_pair)
+    # Held until the write commits (Mark.save and deletes run in a transaction)
+    lock_courses({course_id for course_id, _ in pairs})
+
+    captured = {}
+    contexts = {}
+    for course_id, student_id in pairs:
+        if course_id not in contexts:
+            contexts[course_id] = _course_context(course_id)
+        context = contexts[course_id]
+        if context:
+            plan, pass_threshold, _ = context
+            captured[(course_id, student_id)] = (context, _student_counts(course_id, student_id, plan, pass_threshold))
+    mark._co_counts_before = captured
+
+
+def apply_mark_counts(mark):
+    """
+    post_save / post_delete of a Mark: applies the change of each captured
+    contribution, still under the course locks taken by capture_mark_counts.
+    """
+    captured = mark.__dict__.pop('_co_counts_before', None)
+    for (course_id, student_id), ((plan, pass_threshold, fingerprint), before) in (captured or {}).items():
+        after = _student_counts(course_id, student_id, plan, pass_threshold)
+        for c in range(len(plan.co_keys)):
+            deltas = {name: after[i][c] - before[i][c] for i, name in enumerate(COUNTER_FIELDS)}
+            if any(deltas.values()):
+                COAttainmentCounter.objects.filter(course_id=course_id, position=c, fingerprint=fingerprint).update(
+                    **{name: F(name) + delta for name, delta in deltas.items() if delta}
+                )
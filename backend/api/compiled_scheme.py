@@ -0,0 +1,76 @@
+import copy
+from bisect import bisect_right
+from dataclasses import dataclass
+
+from .caching import metrics
+
+DEFAULT_ATTAINMENT_LEVELS = {'level_3': 70, 'level_2': 60, 'level_1': 50}
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledScheme:
+    """
+    Scheme settings parsed once: level thresholds sorted for bisect lookups,
+    plus the pass criteria, weightages and PO normalization factor the
+    attainment engines need. Build with compile_scheme().
+    """
+    source: dict
+    pass_criteria: float
+    thresholds: tuple # ascending
+    levels: tuple # level reached at the matching threshold
+    w_direct: float
+    w_indirect: float
+    normalization_factor: object # kept as configured (int or float) for the PO arithmetic
+
+    def level_for(self, percentage):
+        """Highest level whose threshold the percentage reaches, 0 if none."""
+        index = bisect_right(self.thresholds, percentage)
+        return self.levels[index - 1] if index else 0
+
+
+def compile_scheme(settings):
+    levels_dict = settings.get('attainment_levels', DEFAULT_ATTAINMENT_LEVELS)
+    entries = []
+    for k, v in levels_dict.items():
+        lvl_num = int(''.join(filter(str.isdigit, k))) if any(c.isdigit() for c in k) else 0
+        entries.append((float(v), lvl_num))
+    # Equal thresholds: the first one listed wins, so it must come last in ascending order
+    entries.sort(key=lambda e: e[0], reverse=True)
+    entries.reverse()
+
+    weightage = settings.get('weightage', {})
+    return CompiledScheme(
+        source=copy.deepcopy(settings),
+        pass_criteria=float(settings.get('pass_criteria', 50)),
+        thresholds=tuple(threshold for threshold, _ in entries),
+        levels=tuple(level for _, level in entries),
+        w_direct=weightage.get('direct', 80) / 100.0,
+        w_indirect=weightage.get('indirect', 20) / 100.0,
+        normalization_factor=settings.get('po_calculation', {}).get('normalization_factor', 3),
+    )
+
+
+# Per-process memo: scheme id -> CompiledScheme (None is the global configuration).
+# It is the local tier of the compiled schemes: their settings come from the
+# database or the shared cache, and an entry is only reused for equal settings.
+_compiled_schemes = {}
+
+
+def get_compiled_scheme(scheme_id, settings):
+    """
+    Memoized compile_scheme. The cached entry is only reused while its source
+    still equals `settings`, so a stale entry in another worker process is
+    recompiled instead of being trusted.
+    """
+    compiled = _compiled_schemes.get(scheme_id)
+    if compiled is None or compiled.source != settings:
+        metrics.record('compiled_scheme', 'miss')
+        compiled = compile_scheme(settings)
+        _compiled_schemes[scheme_id] = compiled
+    else:
+        metrics.record('compiled_scheme', 'local_hit')
+    return compiled
+
+
+def clear_compiled_schemes():
+    _compiled_schemes.clear()
@@ -0,0 +1,116 @@
+"""
+Conditional GET (ETag / Last-Modified) from per-table change counters.
+
+The signals bump a TableVersion row whenever a tracked model is saved or
+deleted, so the validators of a list or detail response are one small
+query: a request whose If-None-Match still matches gets a 304 before the
+queryset is evaluated or anything is serialized, and any other request is
+served from the shared cache under its ETag. Bulk writes that bypass the
+signals call bump_table_versions themselves.
+"""
+import hashlib
+import json
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import caching
+from .models import TableVersion
+
+
+def _table(model):
+    return model._meta.label_lower
+
+
+def bump_table_versions(*models):
+    """Marks the tables of `models` as changed."""
+    now = timezone.now()
+    for model in models:
+        table = _table(model)
+        if not TableVersion.objects.filter(table=table).update(version=F('version') + 1, updated_at=now):
+            TableVersion.objects.get_or_create(table=table, defaults={'version': 1, 'updated_at': now})
+
+
+def table_versions(models):
+    """Returns ({table: version}, last change time or None) for `models`."""
+    tables = [_table(model) for model in models]
+    versions = {table: 0 for table in tables}
+    last_modified = None
+    for table, version, updated_at in TableVersion.objects.filter(table__in=tables).values_list('table', 'version', 'updated_at'):
+        versions[table] = version
+        last_modified = max(last_modified or updated_at, updated_at)
+    return versions, last_modified
+
+
+def make_etag(*parts):
+    # Weak: equal versions mean equal data, not byte-identical bodies
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 response when the request's validators still match, else None."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user data: browsers may keep it but must revalidate before reuse
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified for the list and retrieve actions of a viewset whose
+    output only depends on `etag_models`, the request URL and the user.
+    """
+    etag_models = ()
+
+    def get_etag(self, request, versions, last_modified):
+        user = request.user
+        # Role and department decide the queryset filters; the change time tells
+        # apart equal versions of a counter that was rolled back and bumped again.
+        # The absolute URL (scheme and host) because paginated bodies embed
+        # absolute next/previous links
+        return make_etag(request.build_absolute_uri(), user.pk, user.role, user.department_id, versions, last_modified)
+
+    def _conditional(self, request, action, *args, **kwargs):
+        versions, last_modified = table_versions(self.etag_models)
+        etag = self.get_etag(request, versions, last_modified)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        # The ETag names this exact data, so it doubles as the cache key
+        computed = {}
+
+        def render():
+            computed['response'] = action(request, *args, **kwargs)
+            return computed['response'].data
+
+        data = caching.get_or_compute(
+            'response:' + etag.strip('W/"'), render,
+            cache_if=lambda _: computed['response'].status_code == 200,
+        )
+        response = computed['response'] if 'response' in computed else Response(data)
+        if response.status_code == 200:
+            add_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
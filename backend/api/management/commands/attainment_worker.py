@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.attainment_queue import run_due_jobs
+
+
+class Command(BaseCommand):
+    help = 'Recomputes queued course attainment reports (used with ATTAINMENT_ASYNC_RECOMPUTE=True).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Courses recomputed in parallel (threads)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Jobs claimed per round')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Process the due jobs once and exit')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(f"Attainment worker started ({options['workers']} threads)"))
+        try:
+            while True:
+                claimed, succeeded = run_due_jobs(limit=options['batch_size'], workers=options['workers'])
+                if claimed:
+                    self.stdout.write(f"Recomputed {succeeded}/{claimed} courses")
+                if options['once']:
+                    break
+                if claimed < options['batch_size']:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Attainment worker stopped"))
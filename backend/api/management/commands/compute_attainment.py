@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.attainment_batch import DEFAULT_SHARD_SIZE, compute_attainment
+from api.models import AttainmentResult, Course
+
+
+class Command(BaseCommand):
+    help = 'Recomputes and stores course attainment reports, sharded across worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Every course in the institution')
+        parser.add_argument('--department', action='append', default=[], help='Department id (repeatable)')
+        parser.add_argument('--course', action='append', default=[], help='Course id (repeatable)')
+        parser.add_argument('--stale-only', action='store_true', help='Skip courses whose stored report is fresh')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='Courses per batched calculation')
+
+    def handle(self, *args, **options):
+        if not (options['all'] or options['department'] or options['course']):
+            raise CommandError("Pass --all, --department or --course")
+
+        # 1. Select the courses
+        courses = Course.objects.all()
+        if not options['all']:
+            courses = courses.filter(department_id__in=options['department']) | courses.filter(id__in=options['course'])
+        if options['stale_only']:
+            fresh = AttainmentResult.objects.filter(is_stale=False, result__isnull=False).values('course_id')
+            courses = courses.exclude(id__in=fresh)
+        course_ids = list(courses.order_by('id').values_list('id', flat=True))
+        if not course_ids:
+            self.stdout.write("No courses to compute")
+            return
+
+        # 2. Compute
+        workers = max(1, options['workers'])
+        self.stdout.write(self.style.WARNING(f"Computing {len(course_ids)} courses with {workers} worker(s)..."))
+
+        def progress(stats, total):
+            done = stats.courses + len(stats.failed)
+            self.stdout.write(f"  {done}/{total} courses")
+
+        stats = compute_attainment(course_ids, workers=workers, shard_size=options['shard_size'], on_progress=progress)
+
+        # 3. Report throughput
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed {stats.courses} courses in {stats.elapsed:.2f}s "
+            f"({stats.courses_per_second:.1f} courses/s): {stats.stored} stored, "
+            f"{stats.skipped} skipped (changed while computing), {len(stats.failed)} failed"
+        ))
+        if stats.failed:
+            self.stdout.write(self.style.ERROR(f"Failed courses: {', '.join(stats.failed)}"))
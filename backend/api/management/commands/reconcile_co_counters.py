@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.assessment_plan import get_assessment_plan
+from api.calculation_services import MARK_ROW_FIELDS, _count_co_attempts, get_course_scheme
+from api.co_counters import COUNTER_FIELDS, counter_fingerprint, read_co_counters, store_co_counters, supports_counters
+from api.models import Course, Mark
+
+
+class Command(BaseCommand):
+    help = 'Checks the incremental CO counters against a full recount of the marks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', default=[], help='Course id (repeatable, default: all)')
+        parser.add_argument('--fix', action='store_true', help='Rewrite counters that are out of sync')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.filter(co_counters__isnull=False).select_related('scheme').distinct().order_by('id')
+        if options['course']:
+            courses = courses.filter(id__in=options['course'])
+
+        checked, mismatched = 0, []
+        for course in courses:
+            plan = get_assessment_plan(course)
+            if not supports_counters(plan):
+                continue
+            scheme = get_course_scheme(course)
+            fingerprint = counter_fingerprint(course, scheme)
+            stored = read_co_counters(course, plan, fingerprint)
+            if stored is None:
+                # Made under an older configuration: rebuilt on the next read
+                continue
+
+            checked += 1
+            marks = Mark.objects.filter(course_id=course.id).values_list(*MARK_ROW_FIELDS)
+            expected, _ = _count_co_attempts(marks, plan, scheme.pass_criteria)
+            diffs = [
+                f"{co} {name} {stored[i][c]} != {expected[i][c]}"
+                for c, co in enumerate(plan.co_keys)
+                for i, name in enumerate(COUNTER_FIELDS)
+                if stored[i][c] != expected[i][c]
+            ]
+            if diffs:
+                mismatched.append(course.id)
+                self.stdout.write(self.style.ERROR(f"{course.id}: {', '.join(diffs)}"))
+                if options['fix']:
+                    store_co_counters(course, plan, fingerprint, expected)
+
+        self.stdout.write(f"Checked {checked} courses, {len(mismatched)} out of sync")
+        if mismatched and not options['fix']:
+            raise CommandError(f"{len(mismatched)} courses have out-of-sync counters (rerun with --fix)")
+        if mismatched:
+            self.stdout.write(self.style.SUCCESS(f"Rewrote the counters of {len(mismatched)} courses"))
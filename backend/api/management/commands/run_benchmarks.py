@@ -0,0 +1,62 @@
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark_suite import compare_results, load_results, run_benchmarks, save_results
+from api.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Times attainment, the list endpoints and the bulk uploads, saving the results as a JSON baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='BM', help='Benchmark courses whose id starts with this (see seed_benchmark)')
+        parser.add_argument('--courses', type=int, default=20, help='Courses timed by the attainment benchmarks')
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--engine', action='append', default=[], help='Attainment engine (repeatable, default: all available)')
+        parser.add_argument('--only', action='append', default=[], help='Benchmark name prefix, e.g. list. (repeatable)')
+        parser.add_argument('--output', help='Results file (default: benchmarks/<timestamp>.json)')
+        parser.add_argument('--compare', help='Baseline file to compare the medians against')
+        parser.add_argument('--threshold', type=float, default=20.0, help='Slowdown in percent that fails --compare')
+
+    def handle(self, *args, **options):
+        # 1. Sample the seeded courses that have an assigned faculty
+        courses = (
+            Course.objects.filter(id__startswith=options['prefix'].upper(), assigned_faculty__isnull=False)
+            .order_by('id')[:max(1, options['courses'])]
+        )
+        if not courses.exists():
+            raise CommandError(f"No courses with prefix {options['prefix']}; run seed_benchmark first")
+        baseline = load_results(options['compare']) if options['compare'] else None
+
+        # 2. Time
+        self.stdout.write(self.style.WARNING(f"Running benchmarks ({options['rounds']} rounds)..."))
+        results = run_benchmarks(
+            Course.objects.filter(id__in=list(courses.values_list('id', flat=True))),
+            rounds=max(1, options['rounds']),
+            engines=options['engine'] or None,
+            only=options['only'] or None,
+        )
+        for bench in results['benchmarks']:
+            stats = bench['stats']
+            self.stdout.write(
+                f"  {bench['name']:<24} median {stats['median'] * 1000:9.1f} ms  "
+                f"min {stats['min'] * 1000:9.1f} ms  stddev {stats['stddev'] * 1000:7.1f} ms"
+            )
+
+        output = options['output'] or os.path.join('benchmarks', f"{datetime.now():%Y%m%d-%H%M%S}.json")
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        save_results(results, output)
+        self.stdout.write(self.style.SUCCESS(f"Saved results to {output}"))
+
+        # 3. Compare against the baseline
+        if baseline is None:
+            return
+        rows, regressions = compare_results(results, baseline, threshold=options['threshold'] / 100)
+        for name, before, after, change in rows:
+            line = f"  {name:<24} {before * 1000:9.1f} ms -> {after * 1000:9.1f} ms  ({change * 100:+.1f}%)"
+            self.stdout.write(self.style.ERROR(line) if name in regressions else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmarks regressed by more than {options['threshold']:g}%: {', '.join(regressions)}")
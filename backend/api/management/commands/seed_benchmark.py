@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark_data import prefix_in_use, seed_institution
+
+# Keeps the generated department/course/student ids within their max_length
+MAX_PREFIX_LENGTH = 6
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic institution (departments, schemes, courses, students, marks) for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='BM', help='Prefix of every generated id')
+        parser.add_argument('--departments', type=int, default=2)
+        parser.add_argument('--courses-per-department', type=int, default=20)
+        parser.add_argument('--students', type=int, default=5000, help='Students in the institution')
+        parser.add_argument('--students-per-course', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (same seed, same data)')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk_create')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix'].upper()
+        if not prefix.isalnum() or len(prefix) > MAX_PREFIX_LENGTH:
+            raise CommandError(f"--prefix must be alphanumeric and at most {MAX_PREFIX_LENGTH} characters")
+        if not 1 <= options['departments'] <= 99:
+            raise CommandError("--departments must be between 1 and 99")
+        if not 1 <= options['courses_per_department'] <= 9999:
+            raise CommandError("--courses-per-department must be between 1 and 9999")
+        if options['students'] < 1 or options['students_per_course'] < 1:
+            raise CommandError("--students and --students-per-course must be positive")
+        if prefix_in_use(prefix):
+            raise CommandError(f"Data with prefix {prefix} already exists; pick another --prefix")
+
+        expected_courses = options['departments'] * options['courses_per_department']
+        self.stdout.write(self.style.WARNING(
+            f"Seeding {expected_courses} courses and {options['students']} students "
+            f"({min(options['students_per_course'], options['students'])} per course)..."
+        ))
+
+        def progress(stats):
+            self.stdout.write(f"  {stats.marks} marks")
+
+        stats = seed_institution(
+            prefix=prefix,
+            departments=options['departments'],
+            courses_per_department=options['courses_per_department'],
+            students=options['students'],
+            students_per_course=options['students_per_course'],
+            seed=options['seed'],
+            batch_size=max(1, options['batch_size']),
+            on_progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {stats.departments} departments, {stats.courses} courses, {stats.students} students, "
+            f"{stats.enrollments} enrollments, {stats.marks} marks ({stats.mark_scores} score rows) "
+            f"in {stats.elapsed:.1f}s"
+        ))
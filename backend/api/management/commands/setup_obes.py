@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth.hashers import make_password
 from api.models import User, Department, Configuration
@@ -8,7 +9,11 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.WARNING("Starting OBES Database Initialization..."))
 
-        # 1. Create Default Departments
+        # 1. Create the shared cache table (CACHE_BACKEND='db'); the signals below write to it
+        self.stdout.write("Creating cache table...")
+        call_command('createcachetable')
+
+        # 2. Create Default Departments
         self.stdout.write("Creating default departments...")
         depts = [
             {"id": "D01", "name": "Computer Science & Engineering"},
@@ -17,7 +22,7 @@ class Command(BaseCommand):
         for dept in depts:
             Department.objects.get_or_create(id=dept["id"], defaults={"name": dept["name"]})
 
-        # 2. Create Global Configurations
+        # 3. Create Global Configurations
         self.stdout.write("Creating global configurations...")
         Configuration.objects.get_or_create(
             key="global_scheme_settings",
@@ -31,7 +36,7 @@ class Command(BaseCommand):
             }
         )
 
-        # 3. Create the Super Admin User
+        # 4. Create the Super Admin User
         self.stdout.write("Setting up Super Admin account...")
         admin_email = "admin@obe.com"
         admin_password = "password123"
@@ -0,0 +1,57 @@
+import math
+
+from .calculation_services import _is_absent
+from .models import Mark, MarkScore
+
+CO_KEY_MAX_LENGTH = MarkScore._meta.get_field('co').max_length
+
+
+def _numeric(val):
+    try:
+        num = float(val)
+    except (TypeError, ValueError):
+        return None
+    return num if math.isfinite(num) else None
+
+
+def score_rows_for(mark):
+    """Builds the MarkScore rows for a mark (metadata keys like '_improvementTarget' are skipped)."""
+    scores = mark.scores if isinstance(mark.scores, dict) else {}
+    is_improvement = bool(mark.improvement_test_for or scores.get('_improvementTarget'))
+    rows = []
+    for key, val in scores.items():
+        if str(key).startswith('_') or len(str(key)) > CO_KEY_MAX_LENGTH:
+            continue
+        absent = _is_absent(val)
+        rows.append(MarkScore(
+            mark_id=mark.id,
+            course_id=mark.course_id,
+            student_id=mark.student_id,
+            assessment_name=mark.assessment_name,
+            co=str(key),
+            value=None if absent else _numeric(val),
+            is_absent=absent,
+            is_improvement=is_improvement,
+        ))
+    return rows
+
+
+def sync_mark_scores(marks):
+    """Replaces the MarkScore rows of the given (saved) marks."""
+    marks = list(marks)
+    if not marks:
+        return
+    MarkScore.objects.filter(mark_id__in=[m.id for m in marks]).delete()
+    MarkScore.objects.bulk_create([row for m in marks for row in score_rows_for(m)], batch_size=1000)
+
+
+def rebuild_mark_scores(chunk_size=2000):
+    """Backfills MarkScore for every existing mark."""
+    queryset = Mark.objects.only('id', 'course_id', 'student_id', 'assessment_name', 'scores', 'improvement_test_for')
+    chunk = []
+    for mark in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(mark)
+        if len(chunk) >= chunk_size:
+            sync_mark_scores(chunk)
+            chunk = []
+    sync_mark_scores(chunk)
@@ -0,0 +1,60 @@
+import csv
+import json
+import re
+
+from .models import MarkScore
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ['csv', 'ndjson']
+
+EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('course', 'course_id'),
+    ('course_code', 'course__code'),
+    ('student', 'student_id'),
+    ('usn', 'student__usn'),
+    ('student_name', 'student__name'),
+    ('assessment_name', 'assessment_name'),
+    ('improvement_test_for', 'improvement_test_for'),
+]
+
+
+class _Echo:
+    """csv.writer target that hands each formatted line back instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def _natural_key(key):
+    # CO2 before CO10
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', key)]
+
+
+def score_columns(queryset):
+    """Score keys used by the exported marks, read from MarkScore instead of scanning the JSON."""
+    keys = MarkScore.objects.filter(mark__in=queryset.values('pk')).values_list('co', flat=True).distinct()
+    return sorted(keys, key=_natural_key)
+
+
+def _export_rows(queryset):
+    lookups = [lookup for _, lookup in EXPORT_FIELDS] + ['scores']
+    rows = queryset.order_by('course_id', 'student__usn', 'assessment_name', 'id').values_list(*lookups)
+    names = [name for name, _ in EXPORT_FIELDS]
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield dict(zip(names, row[:-1])), row[-1] if isinstance(row[-1], dict) else {}
+
+
+def stream_marks_csv(queryset):
+    """Yields CSV lines: the mark fields followed by one column per score key (CO1, CO2, ...)."""
+    columns = score_columns(queryset)
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_FIELDS] + columns)
+    for fields, scores in _export_rows(queryset):
+        yield writer.writerow(list(fields.values()) + [scores.get(key, '') for key in columns])
+
+
+def stream_marks_ndjson(queryset):
+    """Yields one JSON object per mark; scores are kept as a nested object."""
+    for fields, scores in _export_rows(queryset):
+        yield json.dumps({**fields, 'scores': scores}) + '\n'
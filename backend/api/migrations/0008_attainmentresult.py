@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_mark_improvement_test_for_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttainmentResult',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attainment_result', serialize=False, to='api.course')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('is_stale', models.BooleanField(default=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
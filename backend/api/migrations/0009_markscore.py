@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:35
+
+import math
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ABSENT_VALUES = ['AB', 'ABSENT', 'A', 'NA', '-']
+
+
+def backfill_mark_scores(apps, schema_editor):
+    # Mirrors api.mark_scores.score_rows_for using the historical models
+    Mark = apps.get_model('api', 'Mark')
+    MarkScore = apps.get_model('api', 'MarkScore')
+
+    def numeric(val):
+        try:
+            num = float(val)
+        except (TypeError, ValueError):
+            return None
+        return num if math.isfinite(num) else None
+
+    rows = []
+    for mark in Mark.objects.all().iterator(chunk_size=2000):
+        scores = mark.scores if isinstance(mark.scores, dict) else {}
+        is_improvement = bool(mark.improvement_test_for or scores.get('_improvementTarget'))
+        for key, val in scores.items():
+            if str(key).startswith('_') or len(str(key)) > 100:
+                continue
+            absent = str(val).strip().upper() in ABSENT_VALUES
+            rows.append(MarkScore(
+                mark_id=mark.id, course_id=mark.course_id, student_id=mark.student_id,
+                assessment_name=mark.assessment_name, co=str(key),
+                value=None if absent else numeric(val), is_absent=absent, is_improvement=is_improvement,
+            ))
+        if len(rows) >= 5000:
+            MarkScore.objects.bulk_create(rows)
+            rows = []
+    MarkScore.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_attainmentresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarkScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_name', models.CharField(max_length=100)),
+                ('co', models.CharField(max_length=100)),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('is_absent', models.BooleanField(default=False)),
+                ('is_improvement', models.BooleanField(default=False)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.course')),
+                ('mark', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_rows', to='api.mark')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'assessment_name', 'co'], name='markscore_course_assess_co')],
+                'unique_together': {('mark', 'co')},
+            },
+        ),
+        migrations.RunPython(backfill_mark_scores, migrations.RunPython.noop),
+    ]
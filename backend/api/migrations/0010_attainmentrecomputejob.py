@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_markscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttainmentRecomputeJob',
+            fields=[
+                ('course_id', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('enqueued_at', models.DateTimeField()),
+                ('not_before', models.DateTimeField(db_index=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
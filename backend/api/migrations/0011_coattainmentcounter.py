@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_attainmentrecomputejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='COAttainmentCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('co', models.CharField(max_length=100)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('cie_attempts', models.IntegerField(default=0)),
+                ('cie_passed', models.IntegerField(default=0)),
+                ('see_attempts', models.IntegerField(default=0)),
+                ('see_passed', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_counters', to='api.course')),
+            ],
+            options={
+                'unique_together': {('course', 'co')},
+            },
+        ),
+    ]
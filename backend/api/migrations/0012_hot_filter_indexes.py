@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.db import migrations, models
+
+
+def create_scores_gin_index(apps, schema_editor):
+    # jsonb GIN (has_key / contains lookups on Mark.scores); other databases have no equivalent
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS mark_scores_gin ON api_mark USING gin (scores)')
+
+
+def drop_scores_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS mark_scores_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_coattainmentcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['department', 'code'], name='course_dept_code'),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['course', 'id'], name='mark_course_pk'),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(condition=models.Q(('improvement_test_for__isnull', False)), fields=['course', 'improvement_test_for'], name='mark_course_improvements'),
+        ),
+        migrations.RunPython(create_scores_gin_index, drop_scores_gin_index),
+    ]
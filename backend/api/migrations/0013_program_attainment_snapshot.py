@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgramAttainmentSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=9)),
+                ('scheme_key', models.CharField(blank=True, max_length=20)),
+                ('signature', models.CharField(max_length=40)),
+                ('result', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField()),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='program_snapshots', to='api.department')),
+            ],
+            options={
+                'unique_together': {('department', 'academic_year', 'scheme_key')},
+            },
+        ),
+    ]
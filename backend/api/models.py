@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.contrib.postgres.fields import ArrayField
 
 class Department(models.Model):
@@ -77,6 +77,12 @@ class Course(models.Model):
     assessment_tools = models.JSONField(default=list, blank=True)
     settings = models.JSONField(default=dict, blank=True)
 
+    class Meta:
+        indexes = [
+            # Department listings and reports are ordered by code
+            models.Index(fields=['department', 'code'], name='course_dept_code'),
+        ]
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -100,6 +106,52 @@ class Mark(models.Model):
 
     class Meta:
         unique_together = ('student', 'course', 'assessment_name')
+        indexes = [
+            # Per-course mark lists are paged by primary key
+            models.Index(fields=['course', 'id'], name='mark_course_pk'),
+            # Improvement-test rows are a small fraction of the marks
+            models.Index(
+                fields=['course', 'improvement_test_for'], name='mark_course_improvements',
+                condition=models.Q(improvement_test_for__isnull=False),
+            ),
+        ]
+        # PostgreSQL also gets a GIN index on scores (migration 0012)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored course, so a save that moves the mark can invalidate it (api/signals.py)
+        instance._loaded_course_id = instance.__dict__.get('course_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # pre_save and post_save run in the write's transaction, so the CO
+        # counter update (api/co_counters.py) holds its course lock throughout
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+class MarkScore(models.Model):
+    """
+    One typed row per Mark.scores entry (CO id or question/part key), kept in
+    sync with every Mark write by api/mark_scores.py. The student report's
+    class averages and the marks export's columns aggregate these rows in
+    SQL; the attainment engines still read Mark.scores.
+    """
+    mark = models.ForeignKey(Mark, on_delete=models.CASCADE, related_name="score_rows")
+    # Denormalized from the mark for the (course, assessment_name, co) index
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="+")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="+")
+    assessment_name = models.CharField(max_length=100)
+    co = models.CharField(max_length=100)
+    value = models.FloatField(null=True, blank=True) # None when absent or not numeric
+    is_absent = models.BooleanField(default=False)
+    is_improvement = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('mark', 'co')
+        indexes = [
+            models.Index(fields=['course', 'assessment_name', 'co'], name='markscore_course_assess_co'),
+        ]
 
 class ProgramOutcome(models.Model):
     id = models.CharField(max_length=10, primary_key=True) # e.g., PO1
@@ -130,4 +182,89 @@ class Survey(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Surveys - {self.department.name}"
\ No newline at end of file
+        return f"Surveys - {self.department.name}"
+
+class ProgramAttainmentSnapshot(models.Model):
+    """
+    Department PO/PSO attainment (course roll-up blended with the surveys) for
+    one academic year and reference scheme, built by api/program_attainment.py.
+    `signature` identifies the inputs it was computed from.
+    """
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="program_snapshots")
+    academic_year = models.CharField(max_length=9) # e.g., "2025-26"
+    scheme_key = models.CharField(max_length=20, blank=True) # reference scheme id, "" for the global settings
+    signature = models.CharField(max_length=40)
+    result = models.JSONField(default=dict)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('department', 'academic_year', 'scheme_key')
+
+    def __str__(self):
+        return f"Program attainment - {self.department_id} {self.academic_year}"
+
+class AttainmentResult(models.Model):
+    """
+    Materialized output of calculate_course_attainment for one course.
+    `version` is bumped by the invalidation signals in api/signals.py, so a
+    result computed against older data is never stored over a newer one.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name="attainment_result")
+    version = models.PositiveIntegerField(default=0)
+    is_stale = models.BooleanField(default=True)
+    result = models.JSONField(null=True, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Attainment - {self.course_id} (v{self.version})"
+
+class COAttainmentCounter(models.Model):
+    """
+    CIE/SEE attempt and pass counts of one course CO, kept up to date by the
+    Mark signals when ATTAINMENT_ENGINE='incremental' (see api/co_counters.py).
+    `fingerprint` identifies the course configuration and pass criteria the
+    counts were made with; rows with another fingerprint are rebuilt.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="co_counters")
+    co = models.CharField(max_length=100)
+    position = models.PositiveSmallIntegerField() # column in AssessmentPlan.co_keys
+    fingerprint = models.CharField(max_length=40)
+    cie_attempts = models.IntegerField(default=0)
+    cie_passed = models.IntegerField(default=0)
+    see_attempts = models.IntegerField(default=0)
+    see_passed = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('course', 'co')
+
+    def __str__(self):
+        return f"{self.course_id} {self.co}: CIE {self.cie_passed}/{self.cie_attempts}, SEE {self.see_passed}/{self.see_attempts}"
+
+class AttainmentRecomputeJob(models.Model):
+    """
+    Queue of courses whose attainment report must be recomputed by
+    `manage.py attainment_worker`. One row per course: repeated writes only
+    push `not_before` back (debounce), and the worker deletes the row when it
+    claims the job.
+    """
+    # Plain id rather than a FK: marks deleted by a course cascade still enqueue it
+    course_id = models.CharField(max_length=20, primary_key=True)
+    enqueued_at = models.DateTimeField() # first write of the burst; bounds the debounce
+    not_before = models.DateTimeField(db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Recompute {self.course_id} after {self.not_before}"
+
+class TableVersion(models.Model):
+    """
+    Change counter of a set of rows served by the API (e.g. "courses"),
+    bumped by the signals in api/signals.py. ETags and Last-Modified of the
+    list/detail endpoints are derived from it (see api/conditional.py).
+    """
+    table = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
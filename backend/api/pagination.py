@@ -0,0 +1,48 @@
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+# Largest page a client can ask for in cursor mode (?page_size=)
+MAX_CURSOR_PAGE_SIZE = 5000
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination ordered by primary key: every page is an indexed
+    "pk > last seen" lookup, so deep pages cost the same as the first one
+    and no COUNT(*) is run.
+    """
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_CURSOR_PAGE_SIZE
+
+
+class PageOrCursorPagination(BasePagination):
+    """
+    The default page-number pagination (with "count", which the dashboards
+    read), or KeysetPagination when the request has ?paginate=cursor.
+    The next/previous links keep the parameter, so fetchAllPages just follows them.
+    """
+    mode_query_param = 'paginate'
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.paginator = KeysetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginator.get_schema_operation_parameters(view)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
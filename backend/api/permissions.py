@@ -25,12 +25,12 @@ class IsFacultyForCourse(permissions.BasePermission):
         
         # If user is a Department Admin, check if the course belongs to their department
         if request.user.role == 'admin':
-            if hasattr(course, 'department'):
-                return course.department == request.user.department
+            if hasattr(course, 'department_id'):
+                return course.department_id == request.user.department_id
             return True # Fallback if no department linked
 
         # If user is Faculty, check explicit assignment
-        if hasattr(course, 'assigned_faculty'):
-            return course.assigned_faculty == request.user
+        if hasattr(course, 'assigned_faculty_id'):
+            return course.assigned_faculty_id == request.user.id
             
         return False
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Opt-in request profiling (settings.PROFILING_ENABLED).
+
+ProfilingMiddleware samples PROFILING_SAMPLE_RATE of the requests. For a
+sampled request it records wall time, DB query count and time, serializer
+time and the phases marked with `profiled`/`phase` (the attainment engine
+marks load_marks, co_levels, final_index and po), returns them in a
+Server-Timing header and adds them to an in-process rolling window read by
+the profiling stats endpoint. Outside a sampled request `phase` is a single
+context variable lookup, so the markers can stay on hot paths.
+"""
+import contextvars
+import functools
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Slow queries kept for the stats endpoint
+MAX_SLOW_QUERIES = 50
+MAX_SQL_LENGTH = 500
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+        self.active = set()
+        self.slow_queries = []
+
+    def add_phase(self, name, elapsed):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def phase(name):
+    """Adds the time spent in the block to `name` of the current sampled request."""
+    profile = _current.get()
+    # Nested blocks of the same phase (a serializer inside a serializer) count once
+    if profile is None or name in profile.active:
+        yield
+        return
+    profile.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.active.discard(name)
+        profile.add_phase(name, time.perf_counter() - started)
+
+
+def profiled(name):
+    """Decorator form of `phase`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfiledSerializerMixin:
+    """Counts to_representation as the request's serializer time."""
+
+    def to_representation(self, instance):
+        with phase('serialize'):
+            return super().to_representation(instance)
+
+
+class ProfileStats:
+    """Rolling window of the sampled requests, shared by the threads of a process."""
+
+    def __init__(self, window):
+        self.lock = threading.Lock()
+        self.requests = deque(maxlen=window)
+        self.slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+
+    def record(self, entry, slow_queries):
+        with self.lock:
+            self.requests.append(entry)
+            self.slow_queries.extend(slow_queries)
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.slow_queries.clear()
+
+    def snapshot(self):
+        with self.lock:
+            requests = list(self.requests)
+            slow_queries = list(self.slow_queries)
+
+        by_endpoint = {}
+        for entry in requests:
+            by_endpoint.setdefault(entry['endpoint'], []).append(entry)
+
+        endpoints = []
+        for endpoint, entries in by_endpoint.items():
+            totals = sorted(e['total_ms'] for e in entries)
+            phase_names = sorted({name for e in entries for name in e['phases']})
+            endpoints.append({
+                "endpoint": endpoint,
+                "count": len(entries),
+                "total_ms": {
+                    "p50": round(statistics.median(totals), 2),
+                    "p95": round(totals[min(len(totals) - 1, int(len(totals) * 0.95))], 2),
+                    "max": round(totals[-1], 2),
+                },
+                "db_ms": round(statistics.mean(e['db_ms'] for e in entries), 2),
+                "queries": round(statistics.mean(e['queries'] for e in entries), 1),
+                "phases_ms": {
+                    name: round(sum(e['phases'].get(name, 0.0) for e in entries) / len(entries), 2)
+                    for name in phase_names
+                },
+            })
+        endpoints.sort(key=lambda e: e['total_ms']['p95'], reverse=True)
+
+        return {
+            "enabled": getattr(settings, 'PROFILING_ENABLED', False),
+            "sample_rate": getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0),
+            "sampled_requests": len(requests),
+            "endpoints": endpoints,
+            "slow_queries": list(reversed(slow_queries)),
+        }
+
+
+stats = ProfileStats(getattr(settings, 'PROFILING_WINDOW', 1000))
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method} {'/' + match.route if match and match.route else request.path}"
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.05)
+        self.slow_query_seconds = getattr(settings, 'PROFILING_SLOW_QUERY_MS', 100) / 1000
+        self.slow_request_seconds = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 1000) / 1000
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self._query_timer(profile)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - profile.started
+
+        # 1. Server-Timing header (the DB time is part of the phases it ran in)
+        metrics = [f"total;dur={_ms(total)}", f'db;dur={_ms(profile.db_time)};desc="{profile.queries} queries"']
+        metrics += [f"{name};dur={_ms(elapsed)}" for name, elapsed in profile.phases.items()]
+        response['Server-Timing'] = ', '.join(metrics)
+
+        # 2. Rolling stats
+        endpoint = _endpoint(request)
+        slow_queries = [{**query, "endpoint": endpoint} for query in profile.slow_queries]
+        stats.record({
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "total_ms": _ms(total),
+            "db_ms": _ms(profile.db_time),
+            "queries": profile.queries,
+            "phases": {name: _ms(elapsed) for name, elapsed in profile.phases.items()},
+        }, slow_queries)
+        if total >= self.slow_request_seconds:
+            logger.warning("Slow request %s: %.0f ms, %d queries (%.0f ms)",
+                           endpoint, total * 1000, profile.queries, profile.db_time * 1000)
+        return response
+
+    def _query_timer(self, profile):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                profile.queries += 1
+                profile.db_time += elapsed
+                if elapsed >= self.slow_query_seconds:
+                    profile.slow_queries.append({"sql": sql[:MAX_SQL_LENGTH], "ms": _ms(elapsed)})
+                    logger.warning("Slow query (%.0f ms): %s", elapsed * 1000, sql[:MAX_SQL_LENGTH])
+        return wrapper
@@ -0,0 +1,213 @@
+"""
+Department (program) PO/PSO attainment.
+
+Same arithmetic as the dashboards did in the browser, values unrounded:
+a course's attainment of an outcome is the mean of score_index * mapping /
+normalization factor over its COs with a numeric mapping (0 included), the
+factor being the course scheme's po_calculation.normalization_factor or 3;
+direct attainment averages that over the courses; indirect attainment is the
+average of the non-zero exit/employer/alumni ratings. The two are blended
+with the weightage of a reference scheme (the global settings without one).
+
+Results are stored as ProgramAttainmentSnapshot rows per department,
+academic year and reference scheme. Marks carry no academic year: the
+current year's snapshot is recomputed from all current data when its inputs
+change, and a past year is only what was stored while it was current.
+"""
+import hashlib
+import json
+import math
+import re
+
+from django.utils import timezone
+
+from .attainment_cache import get_department_attainment
+from .calculation_services import DEFAULT_SCHEME_SETTINGS, get_global_scheme_settings
+from .models import ArticulationMatrix, Course, ProgramAttainmentSnapshot, ProgramOutcome, ProgramSpecificOutcome, Survey
+
+SURVEY_FIELDS = {'exit': 'exit_survey', 'employer': 'employer_survey', 'alumni': 'alumni_survey'}
+# Bumped when the arithmetic changes, so older snapshots are recomputed
+ROLLUP_VERSION = 2
+# Normalization factor of courses whose scheme sets none
+DEFAULT_NORMALIZATION_FACTOR = 3
+# Leading number of a value, like JavaScript's parseFloat
+LEADING_NUMBER = re.compile(r'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+# First month of an academic year
+ACADEMIC_YEAR_START_MONTH = 7
+
+
+def current_academic_year(today=None):
+    today = today or timezone.localdate()
+    start = today.year if today.month >= ACADEMIC_YEAR_START_MONTH else today.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def _outcome_number(outcome_id):
+    match = re.search(r'\d+', outcome_id)
+    return int(match.group()) if match else 0
+
+
+def _outcome_ids(department_id):
+    """POs, then the department's PSOs, each in numeric order."""
+    pos = sorted(ProgramOutcome.objects.values_list('id', flat=True), key=_outcome_number)
+    psos = sorted(ProgramSpecificOutcome.objects.filter(department_id=department_id).values_list('id', flat=True),
+                  key=_outcome_number)
+    return pos + psos
+
+
+def _parse_number(val):
+    """The number `val` starts with, or None (matches the dashboards' parseFloat)."""
+    if isinstance(val, bool) or val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return float(val) if math.isfinite(val) else None
+    match = LEADING_NUMBER.match(str(val))
+    return float(match.group()) if match else None
+
+
+def _rating(val):
+    """A survey rating as a number; blank or invalid ratings count as 0 (not rated)."""
+    return _parse_number(val) or 0.0
+
+
+def _normalization_factor(course):
+    settings = course.scheme.settings if course.scheme and isinstance(course.scheme.settings, dict) else {}
+    po_calculation = settings.get('po_calculation')
+    factor = po_calculation.get('normalization_factor') if isinstance(po_calculation, dict) else None
+    return _parse_number(factor) or DEFAULT_NORMALIZATION_FACTOR
+
+
+def course_outcome_attainment(co_attainment, matrix, norm_factor, outcome_ids):
+    """{outcome: mean of score_index * mapping / norm_factor over the COs with a numeric mapping}."""
+    attainment = {}
+    for outcome in outcome_ids:
+        values = []
+        for row in co_attainment:
+            mapping = matrix.get(row['co']) if isinstance(matrix, dict) else None
+            map_val = _parse_number(mapping.get(outcome)) if isinstance(mapping, dict) else None
+            if map_val is not None:
+                values.append(map_val * row['score_index'] / norm_factor)
+        if values:
+            attainment[outcome] = sum(values) / len(values)
+    return attainment
+
+
+def _weightage(settings):
+    """(direct, indirect) of the settings; the default weightage when it is missing or malformed."""
+    default = DEFAULT_SCHEME_SETTINGS['weightage']
+    weightage = settings.get('weightage') if isinstance(settings, dict) else None
+    if not isinstance(weightage, dict):
+        weightage = default
+    try:
+        return float(weightage.get('direct', default['direct'])), float(weightage.get('indirect', default['indirect']))
+    except (TypeError, ValueError):
+        return float(default['direct']), float(default['indirect'])
+
+
+def _signature(department_id, outcome_ids, survey, weightage):
+    """Changes whenever a course report, the survey, the outcomes or the weightage change."""
+    courses = list(
+        Course.objects.filter(department_id=department_id).order_by('id')
+        .values_list('id', 'code', 'name', 'attainment_result__version', 'attainment_result__computed_at')
+    )
+    payload = {
+        "courses": [[c_id, code, name, version or 0, str(computed_at)] for c_id, code, name, version, computed_at in courses],
+        "outcomes": outcome_ids,
+        "survey": [survey.id, str(survey.updated_at)] if survey else None,
+        "weightage": weightage,
+        "rollup": ROLLUP_VERSION,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def build_program_attainment(department_id, outcome_ids, survey, weightage):
+    department_report = get_department_attainment(department_id)
+    courses_by_id = Course.objects.filter(department_id=department_id).select_related('scheme').in_bulk()
+    matrices = dict(
+        ArticulationMatrix.objects.filter(course__department_id=department_id).values_list('course_id', 'matrix')
+    )
+
+    # 1. Direct: each course's outcome attainment, then the average over the courses that have it
+    courses = []
+    for report in department_report["courses"]:
+        course = courses_by_id[report["course_id"]]
+        courses.append({
+            "course_id": report["course_id"],
+            "code": report["code"],
+            "name": report["name"],
+            "scheme_used": report.get("scheme_used"),
+            "attainment": course_outcome_attainment(
+                report.get("co_attainment", []), matrices.get(course.id) or {}, _normalization_factor(course), outcome_ids
+            ),
+        })
+    direct = {}
+    for o in outcome_ids:
+        values = [course["attainment"][o] for course in courses if o in course["attainment"]]
+        if values:
+            direct[o] = sum(values) / len(values)
+
+    # 2. Indirect: average of the surveys that rated the outcome; the ratings are returned as stored
+    surveys = {}
+    for name, field in SURVEY_FIELDS.items():
+        ratings = getattr(survey, field, None) if survey else None
+        surveys[name] = {o: ratings[o] for o in outcome_ids if o in ratings} if isinstance(ratings, dict) else {}
+    indirect = {}
+    for o in outcome_ids:
+        rated = [_rating(ratings.get(o)) for ratings in surveys.values()]
+        rated = [value for value in rated if value]
+        indirect[o] = sum(rated) / len(rated) if rated else 0.0
+
+    # 3. Blend with the reference weightage
+    w_direct, w_indirect = weightage
+    weighted_direct = {o: direct.get(o, 0.0) * w_direct / 100 for o in outcome_ids}
+    weighted_indirect = {o: indirect[o] * w_indirect / 100 for o in outcome_ids}
+    return {
+        "outcomes": outcome_ids,
+        "weightage": {"direct": w_direct, "indirect": w_indirect},
+        "courses": courses,
+        "direct": direct,
+        "surveys": surveys,
+        "indirect": indirect,
+        "weighted_direct": weighted_direct,
+        "weighted_indirect": weighted_indirect,
+        "total": {o: weighted_direct[o] + weighted_indirect[o] for o in outcome_ids},
+    }
+
+
+def get_program_attainment(department_id, academic_year=None, scheme=None):
+    """
+    The department's program attainment for `academic_year` (default: the
+    current one) with the weightage of `scheme` (default: the global
+    settings). Returns None for a past year that has no snapshot.
+    """
+    academic_year = academic_year or current_academic_year()
+    scheme_key = scheme.id if scheme else ''
+    snapshot = ProgramAttainmentSnapshot.objects.filter(
+        department_id=department_id, academic_year=academic_year, scheme_key=scheme_key
+    ).first()
+    if academic_year != current_academic_year():
+        return snapshot.result if snapshot else None
+
+    # 1. Inputs, and whether the stored snapshot was built from them
+    outcome_ids = _outcome_ids(department_id)
+    survey = Survey.objects.filter(department_id=department_id).order_by('id').first()
+    weightage = _weightage(scheme.settings if scheme and scheme.settings else get_global_scheme_settings())
+    signature = _signature(department_id, outcome_ids, survey, weightage)
+    if snapshot and snapshot.signature == signature:
+        return snapshot.result
+
+    # 2. Recompute and store, signed after the roll-up refreshed any stale course reports
+    now = timezone.now()
+    result = {
+        "department_id": department_id,
+        "academic_year": academic_year,
+        "scheme": scheme.id if scheme else None,
+        **build_program_attainment(department_id, outcome_ids, survey, weightage),
+        "computed_at": now.isoformat(),
+    }
+    signature = _signature(department_id, outcome_ids, survey, weightage)
+    ProgramAttainmentSnapshot.objects.update_or_create(
+        department_id=department_id, academic_year=academic_year, scheme_key=scheme_key,
+        defaults={"signature": signature, "result": result, "computed_at": now},
+    )
+    return result
@@ -1,12 +1,13 @@
 from rest_framework import serializers
+from .profiling import ProfiledSerializerMixin
 from .models import User, Department, Course, Student, Mark, ArticulationMatrix, Configuration, ProgramOutcome, ProgramSpecificOutcome, Survey, Scheme
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = '__all__'
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'display_name', 'role', 'department', 'password']
@@ -21,12 +22,12 @@ class UserSerializer(serializers.ModelSerializer):
             user.save()
         return user
 
-class SchemeSerializer(serializers.ModelSerializer):
+class SchemeSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Scheme
         fields = '__all__'
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     # Optional: nested serializer to show faculty name instead of just ID
     assigned_faculty_name = serializers.ReadOnlyField(source='assigned_faculty.display_name')
     scheme_details = SchemeSerializer(source='scheme', read_only=True)
@@ -35,37 +36,37 @@ class CourseSerializer(serializers.ModelSerializer):
         model = Course
         fields = '__all__'
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = '__all__'
 
-class MarkSerializer(serializers.ModelSerializer):
+class MarkSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Mark
         fields = '__all__'
 
-class ProgramOutcomeSerializer(serializers.ModelSerializer):
+class ProgramOutcomeSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ProgramOutcome
         fields = '__all__'
 
-class ProgramSpecificOutcomeSerializer(serializers.ModelSerializer):
+class ProgramSpecificOutcomeSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ProgramSpecificOutcome
         fields = '__all__'
 
-class ConfigurationSerializer(serializers.ModelSerializer):
+class ConfigurationSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Configuration
         fields = '__all__'
 
-class ArticulationMatrixSerializer(serializers.ModelSerializer):
+class ArticulationMatrixSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ArticulationMatrix
         fields = '__all__'
 
-class SurveySerializer(serializers.ModelSerializer):
+class SurveySerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Survey
         fields = ['id', 'department', 'exit_survey', 'employer_survey', 'alumni_survey', 'updated_at']
\ No newline at end of file
@@ -0,0 +1,97 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import caching
+from .attainment_cache import (
+    invalidate_course_attainment,
+    invalidate_global_scheme_attainment,
+    invalidate_scheme_attainment,
+)
+from .authentication import invalidate_principal
+from .calculation_services import GLOBAL_SETTINGS_CACHE_KEY
+from .co_counters import apply_mark_counts, capture_mark_counts, incremental_enabled
+from .compiled_scheme import clear_compiled_schemes
+from .conditional import bump_table_versions
+from .mark_scores import sync_mark_scores
+from .models import ArticulationMatrix, Configuration, Course, Mark, ProgramOutcome, ProgramSpecificOutcome, Scheme, User
+
+GLOBAL_SCHEME_KEY = 'global_scheme_settings'
+
+# Course fields that feed calculate_course_attainment
+ATTAINMENT_COURSE_FIELDS = {'cos', 'assessment_tools', 'settings', 'scheme', 'scheme_id'}
+# Mark fields copied into its MarkScore rows (api/mark_scores.score_rows_for)
+MARK_SCORE_SOURCE_FIELDS = {
+    'scores', 'improvement_test_for', 'course', 'course_id', 'student', 'student_id', 'assessment_name',
+}
+
+
+@receiver([pre_save, pre_delete], sender=Mark)
+def mark_changing(sender, instance, origin=None, **kwargs):
+    if incremental_enabled():
+        capture_mark_counts(instance, origin=origin)
+
+
+@receiver([post_save, post_delete], sender=Mark)
+def mark_changed(sender, instance, **kwargs):
+    if incremental_enabled():
+        apply_mark_counts(instance)
+    # A mark moved to another course also changes the report of the one it left
+    # (known for marks loaded from the database, see Mark.from_db)
+    invalidate_course_attainment({instance.course_id, getattr(instance, '_loaded_course_id', None)} - {None})
+    instance._loaded_course_id = instance.course_id
+
+
+@receiver(post_save, sender=Mark)
+def mark_saved(sender, instance, update_fields=None, **kwargs):
+    # MarkScore rows are removed by the FK cascade when a mark is deleted
+    if update_fields is None or MARK_SCORE_SOURCE_FIELDS.intersection(update_fields):
+        sync_mark_scores([instance])
+
+
+@receiver(post_save, sender=Course)
+def course_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not ATTAINMENT_COURSE_FIELDS.intersection(update_fields):
+        return
+    invalidate_course_attainment([instance.id])
+
+
+@receiver([post_save, post_delete], sender=ArticulationMatrix)
+def matrix_changed(sender, instance, **kwargs):
+    invalidate_course_attainment([instance.course_id])
+
+
+@receiver(post_save, sender=Scheme)
+@receiver(pre_delete, sender=Scheme)
+def scheme_changed(sender, instance, **kwargs):
+    # pre_delete: the courses still point at the scheme before SET_NULL runs
+    invalidate_scheme_attainment(instance.pk)
+    clear_compiled_schemes()
+
+
+@receiver([post_save, post_delete], sender=Configuration)
+def configuration_changed(sender, instance, **kwargs):
+    if instance.key == GLOBAL_SCHEME_KEY:
+        caching.delete_on_commit(GLOBAL_SETTINGS_CACHE_KEY)
+        invalidate_global_scheme_attainment()
+        clear_compiled_schemes()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # No token exists before the user does; logging in only stamps last_login
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    # Role, department or activation changes must not wait for the principal cache
+    invalidate_principal(instance.pk)
+    # Course responses show the faculty's display name
+    bump_table_versions(User)
+
+
+@receiver([post_save, post_delete], sender=ProgramOutcome)
+@receiver([post_save, post_delete], sender=ProgramSpecificOutcome)
+@receiver([post_save, post_delete], sender=Scheme)
+@receiver([post_save, post_delete], sender=Course)
+def table_changed(sender, **kwargs):
+    bump_table_versions(sender)
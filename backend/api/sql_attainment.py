@@ -0,0 +1,174 @@
+"""
+PostgreSQL implementation of the CO level engine.
+
+Per-CO CIE/SEE attempt and pass counts are computed inside the database
+with jsonb_each and COUNT(*) FILTER aggregates over api_mark, so only one
+row per CO crosses the wire. Select it with ATTAINMENT_ENGINE = 'sql'.
+
+Courses whose results depend on Python-side semantics (Lab internal
+assessment scaling, Activity/Laboratory score replication, improvement
+tests, ambiguous SEE records or unusual score values) are handed to the
+Python engine, as is every non-PostgreSQL database (e.g. SQLite in tests).
+The results are identical either way.
+"""
+from django.db import connection
+
+from .assessment_plan import TOOL_PLAIN, get_assessment_plan
+from .calculation_services import _calculate_co_levels
+from .models import Mark
+
+MARK_TABLE = Mark._meta.db_table
+
+ABSENT_SQL = "('AB', 'ABSENT', 'A', 'NA', '-')"
+# Plain decimals: the only strings Python's float() and PostgreSQL's float8 parse alike
+NUMBER_RE = r"'^\s*[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)\s*$'"
+# Strings float() may still accept (exponents, underscores, nan/inf)
+FLOAT_LIKE_RE = r"'(nan|inf|[0-9.][_e]|[_e][0-9])'"
+# Python's str(v).replace('.', '', 1).isdigit() used for SEE totals
+SEE_DIGITS_RE = r"'^([0-9]+\.?[0-9]*|\.[0-9]+)$'"
+
+
+def _values_clause(rows, casts):
+    row_sql = '(' + ', '.join(f'%s::{cast}' for cast in casts) + ')'
+    params = [value for row in rows for value in row]
+    return ', '.join([row_sql] * len(rows)), params
+
+
+def _sql_eligible(plan):
+    # Lab IA scaling and Activity/Laboratory score replication happen in Python
+    if any(tool.kind != TOOL_PLAIN for tool in plan.tools):
+        return False
+    # Keys are compared as text in SQL
+    if not all(isinstance(key, str) for key in plan.co_keys + tuple(tool.name for tool in plan.tools)):
+        return False
+    # Tools named '' or None match every mark as an improvement test
+    if '' in plan.improvement_tools or 'none' in plan.improvement_tools:
+        return False
+    # Distribution-only SEE COs depend on which student is processed first
+    return not plan.see_late_columns
+
+
+def _guard_counts(cursor, course_id, see_names):
+    see_placeholders = ', '.join(['%s'] * len(see_names)) or 'NULL'
+    cursor.execute(f"""
+        SELECT
+            (SELECT COUNT(*) FROM {MARK_TABLE} WHERE course_id = %s),
+            (SELECT COUNT(*) FROM {MARK_TABLE} WHERE course_id = %s
+               AND (improvement_test_for IS NOT NULL OR jsonb_exists(scores, '_improvementTarget'))),
+            (SELECT COUNT(*) FROM (
+                SELECT student_id FROM {MARK_TABLE}
+                WHERE course_id = %s AND assessment_name IN ({see_placeholders})
+                GROUP BY student_id HAVING COUNT(*) > 1) d)
+    """, [course_id, course_id, course_id] + see_names)
+    return cursor.fetchone()
+
+
+def _cie_counts(cursor, course_id, target_rows):
+    if not target_rows:
+        return {}, 0
+    targets_sql, params = _values_clause(target_rows, ['text', 'text', 'float8'])
+    # val mirrors _co_value: the CO key, else the first value of a single-key score object
+    # (jsonb keeps its keys in the order Python reads them back, so "first" agrees)
+    cursor.execute(f"""
+        WITH cells AS (
+            SELECT t.co, t.target,
+                   CASE
+                       WHEN jsonb_typeof(m.scores -> t.co) <> 'null' THEN m.scores -> t.co
+                       WHEN (SELECT COUNT(*) FROM jsonb_object_keys(m.scores) k WHERE left(k, 1) <> '_') = 1
+                       THEN (SELECT e.value FROM jsonb_each(m.scores) WITH ORDINALITY AS e(key, value, n) ORDER BY n LIMIT 1)
+                   END AS val
+            FROM {MARK_TABLE} m
+            JOIN (VALUES {targets_sql}) AS t(tool, co, target) ON t.tool = m.assessment_name
+            WHERE m.course_id = %s
+        ), classified AS (
+            SELECT co, target, jsonb_typeof(val) AS kind, val #>> '{{}}' AS txt
+            FROM cells
+            WHERE val IS NOT NULL AND jsonb_typeof(val) <> 'null'
+        ), numbers AS (
+            SELECT co, target, kind, txt,
+                   (kind = 'number' OR (kind = 'string' AND txt ~ {NUMBER_RE})) AS is_number,
+                   (kind = 'string' AND upper(btrim(txt)) IN {ABSENT_SQL}) AS is_absent
+            FROM classified
+        )
+        SELECT co,
+               COUNT(*) FILTER (WHERE is_number),
+               COUNT(*) FILTER (WHERE (CASE WHEN is_number THEN txt::float8 END) >= target),
+               COUNT(*) FILTER (WHERE NOT is_number AND NOT is_absent
+                                AND (kind <> 'string' OR lower(txt) ~ {FLOAT_LIKE_RE}))
+        FROM numbers
+        GROUP BY co
+    """, params + [course_id])
+    counts = {}
+    unusual = 0
+    for co, attempts, passed, odd in cursor.fetchall():
+        counts[co] = (attempts, passed)
+        unusual += odd
+    return counts, unusual
+
+
+def _see_counts(cursor, course_id, see_names, target):
+    see_placeholders = ', '.join(['%s'] * len(see_names))
+    cursor.execute(f"""
+        SELECT COUNT(*) FILTER (WHERE ok), COUNT(*) FILTER (WHERE ok AND obt >= %s)
+        FROM (
+            SELECT
+                (r.scores <> '{{}}'::jsonb AND NOT EXISTS (
+                    SELECT 1 FROM jsonb_each(r.scores) e
+                    WHERE jsonb_typeof(e.value) = 'string' AND upper(btrim(e.value #>> '{{}}')) IN {ABSENT_SQL}
+                )) AS ok,
+                (SELECT COALESCE(SUM((e.value #>> '{{}}')::float8), 0) FROM jsonb_each(r.scores) e
+                 WHERE (e.value #>> '{{}}') ~ {SEE_DIGITS_RE}) AS obt
+            FROM {MARK_TABLE} r
+            WHERE r.course_id = %s AND r.assessment_name IN ({see_placeholders})
+        ) s
+    """, [target, course_id] + see_names)
+    return cursor.fetchone()
+
+
+def calculate_co_levels_sql(marks, course, scheme):
+    plan = get_assessment_plan(course)
+    if connection.vendor != 'postgresql' or not _sql_eligible(plan):
+        return _calculate_co_levels(marks, course, scheme)
+
+    pass_threshold = scheme.pass_criteria
+    see_names = [name for name in dict.fromkeys(plan.see_names) if name is not None]
+    target_rows = [
+        (tool.name, co, target)
+        for tool, tool_targets in zip(plan.tools, plan.targets(pass_threshold))
+        for co, target in zip(tool.cos, tool_targets)
+    ]
+
+    with connection.cursor() as cursor:
+        mark_count, improvements, see_duplicates = _guard_counts(cursor, course.id, see_names)
+        if improvements or see_duplicates:
+            return _calculate_co_levels(marks, course, scheme)
+
+        cie, unusual = _cie_counts(cursor, course.id, target_rows)
+        if unusual:
+            return _calculate_co_levels(marks, course, scheme)
+
+        see_attempts = see_passed = 0
+        if plan.see_tool and mark_count:
+            see_attempts, see_passed = _see_counts(cursor, course.id, see_names, plan.see_target(pass_threshold))
+
+    # Same CO columns as the Python engine: course COs, then distribution-only keys
+    keys = plan.output_keys(bool(mark_count))
+    index = {co: c for c, co in enumerate(plan.co_keys)}
+    cie_attempts, cie_passed = [0] * len(keys), [0] * len(keys)
+    for co, (attempts, passed) in cie.items():
+        cie_attempts[index[co]] += attempts
+        cie_passed[index[co]] += passed
+    s_attempts, s_passed = [0] * len(keys), [0] * len(keys)
+    for c in plan.see_columns:
+        s_attempts[c] += see_attempts
+        s_passed[c] += see_passed
+
+    final_co_stats = {}
+    for c, co in enumerate(keys):
+        cie_perc = (cie_passed[c] / cie_attempts[c] * 100) if cie_attempts[c] > 0 else 0
+        see_perc = (s_passed[c] / s_attempts[c] * 100) if s_attempts[c] > 0 else 0
+        final_co_stats[co] = {
+            'cie_level': scheme.level_for(cie_perc),
+            'see_level': scheme.level_for(see_perc)
+        }
+    return final_co_stats
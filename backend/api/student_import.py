@@ -0,0 +1,127 @@
+import csv
+import io
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Student
+
+# Rows handled per round of queries; keeps memory flat for any file size
+IMPORT_CHUNK_SIZE = 1000
+# Row-level errors returned to the client (the total is always counted)
+MAX_REPORTED_ERRORS = 100
+
+
+class StudentImportResult:
+    def __init__(self):
+        self.created = 0
+        self.enrolled = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "message": f"Successfully created {self.created} new students and enrolled {self.enrolled} into the course.",
+            "created": self.created,
+            "enrolled": self.enrolled,
+            "skipped": self.skipped,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def _parse_rows(reader, result):
+    """Yields (line, usn, name) for valid rows, recording errors for the rest."""
+    usn_length = Student._meta.get_field('usn').max_length
+    name_length = Student._meta.get_field('name').max_length
+    for row in reader:
+        # Safely skip empty rows
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        line = reader.line_num
+        if len(row) < 2:
+            result.add_error(line, "Expected USN and Name columns")
+            continue
+
+        usn = str(row[0]).strip().upper()
+        name = str(row[1]).strip()
+        if not usn or not name:
+            result.add_error(line, "USN and Name are required")
+        elif len(usn) > usn_length:
+            result.add_error(line, f"USN is longer than {usn_length} characters")
+        elif len(name) > name_length:
+            result.add_error(line, f"Name is longer than {name_length} characters")
+        else:
+            yield line, usn, name
+
+
+def _import_chunk(chunk, course, seen_usns, result):
+    rows = []
+    for line, usn, name in chunk:
+        if usn in seen_usns:
+            result.skipped += 1
+            continue
+        seen_usns.add(usn)
+        rows.append((line, usn, name))
+    if not rows:
+        return
+
+    usns = [usn for _, usn, _ in rows]
+    student_ids = dict(Student.objects.filter(usn__in=usns).values_list('usn', 'id'))
+
+    # 1. Create the students we have never seen (id = USN, as before)
+    new_rows = [(line, usn, name) for line, usn, name in rows if usn not in student_ids]
+    if new_rows:
+        Student.objects.bulk_create(
+            [Student(id=usn, usn=usn, name=name) for _, usn, name in new_rows],
+            ignore_conflicts=True
+        )
+        # ignore_conflicts hides which rows were inserted, so read them back
+        created = dict(Student.objects.filter(usn__in=[usn for _, usn, _ in new_rows]).values_list('usn', 'id'))
+        for line, usn, _ in new_rows:
+            if usn in created:
+                student_ids[usn] = created[usn]
+                result.created += 1
+            else:
+                result.add_error(line, f"Student ID {usn} is already used by another student")
+
+    # 2. Enroll them in the course, skipping existing enrollments
+    Enrollment = Student.courses.through
+    ids = list(student_ids.values())
+    already = set(Enrollment.objects.filter(course_id=course.id, student_id__in=ids).values_list('student_id', flat=True))
+    Enrollment.objects.bulk_create(
+        [Enrollment(student_id=student_id, course_id=course.id) for student_id in ids if student_id not in already],
+        ignore_conflicts=True
+    )
+    result.enrolled += len(ids) - len(already)
+    result.skipped += len(already)
+
+
+def import_students_csv(uploaded_file, course):
+    """
+    Streams a "USN, Name" CSV (with a header row) into Student rows and
+    enrollments for `course`. Rows are handled IMPORT_CHUNK_SIZE at a time
+    with a fixed number of queries per chunk, so the file is never fully
+    loaded into memory. The import is all-or-nothing: UnicodeDecodeError /
+    csv.Error on bad input, wherever it occurs, rolls back every chunk.
+    """
+    text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8', newline='')
+    reader = csv.reader(text)
+    next(reader, None) # Skip the header row (USN, Name)
+
+    result = StudentImportResult()
+    seen_usns = set()
+    rows = _parse_rows(reader, result)
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(rows, IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            _import_chunk(chunk, course, seen_usns, result)
+    return result
@@ -0,0 +1,144 @@
+"""
+Per-student report: a student's assessment totals and CO performance in
+each of their courses, computed server-side with the same score
+normalization as the CO engines (Lab IA scaling, Activity/Laboratory
+scores, improvement-test replacement).
+"""
+from django.db.models import Count, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .assessment_plan import get_assessment_plan, improvement_key
+from .calculation_services import MARK_ROW_FIELDS, _co_value, _get_total, _is_absent, _plan_tool_scores
+from .models import Mark, MarkScore
+
+
+def _number(val):
+    """Score as a float; absent, missing and non-numeric scores count as 0."""
+    if val is None or _is_absent(val):
+        return 0.0
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _record_total(scores):
+    return sum(_number(val) for key, val in scores.items() if not str(key).startswith('_'))
+
+
+def _percentage(obtained, max_marks):
+    return round(obtained / max_marks * 100, 2) if max_marks else 0.0
+
+
+def _effective_tool_scores(records, improvements, plan):
+    """Per plan tool, the normalized scores the CO engines use (improvement test applied when better)."""
+    effective = []
+    for t, tool_plan in enumerate(plan.tools):
+        scores = _plan_tool_scores(records.get(tool_plan.name, {}), tool_plan, plan)
+        imp_raw = improvements.get(t)
+        if imp_raw:
+            imp_scores = _plan_tool_scores(imp_raw, tool_plan, plan)
+            if _get_total(imp_scores, tool_plan.co_dist.keys()) > _get_total(scores, tool_plan.co_dist.keys()):
+                scores = imp_scores
+        effective.append(scores)
+    return effective
+
+
+def build_student_course_report(course, rows, class_averages):
+    """
+    `rows` are the student's MARK_ROW_FIELDS tuples in `course`;
+    `class_averages` maps assessment name -> average total of the students who sat it.
+    """
+    plan = get_assessment_plan(course)
+
+    # 1. Index the student's records like the CO engines (first match wins)
+    records, improvements = {}, {}
+    for _, name, scores, imp_for in rows:
+        records.setdefault(name, scores)
+        for key in (improvement_key(imp_for), improvement_key(scores.get('_improvementTarget', ''))):
+            for t in plan.improvement_tools.get(key, ()):
+                improvements.setdefault(t, scores)
+    effective = _effective_tool_scores(records, improvements, plan)
+    tool_index = {tool_plan.name: t for t, tool_plan in enumerate(plan.tools)}
+
+    # 2. Assessment totals, with the CO breakdown of the internal tools
+    assessments = []
+    for tool in course.assessment_tools if isinstance(course.assessment_tools, list) else []:
+        scores = records.get(tool.get('name'), {})
+        t = tool_index.get(tool.get('name'))
+        breakdown = []
+        if t is not None:
+            tool_plan = plan.tools[t]
+            normalized = _plan_tool_scores(scores, tool_plan, plan)
+            breakdown = [
+                {"co": co, "max": max_val, "obtained": round(_number(_co_value(normalized, co)), 2)}
+                for co, max_val in zip(tool_plan.cos, tool_plan.max_values)
+            ]
+        assessments.append({
+            "name": tool.get('name'),
+            "type": tool.get('type'),
+            "max": tool.get('maxMarks'),
+            "obtained": round(_record_total(scores), 2),
+            "attempted": tool.get('name') in records,
+            "class_average": round(class_averages.get(tool.get('name'), 0.0), 2),
+            "breakdown": breakdown,
+        })
+
+    # 3. CIE performance per course CO, over every tool that assesses it
+    obtained = [0.0] * len(plan.co_keys)
+    max_marks = [0.0] * len(plan.co_keys)
+    for scores, tool_plan in zip(effective, plan.tools):
+        for co, c, max_val in zip(tool_plan.cos, tool_plan.columns, tool_plan.max_values):
+            if max_val is None:
+                continue
+            max_marks[c] += max_val
+            obtained[c] += _number(_co_value(scores, co))
+    co_performance = [
+        {
+            "co": co,
+            "obtained": round(obtained[c], 2),
+            "max": max_marks[c],
+            "percentage": _percentage(obtained[c], max_marks[c]),
+        }
+        for c, co in enumerate(plan.co_keys[:plan.n_course_cos])
+    ]
+
+    return {
+        "course_id": course.id,
+        "code": course.code,
+        "name": course.name,
+        "semester": course.semester,
+        "assessments": assessments,
+        "co_performance": co_performance,
+    }
+
+
+def get_student_report(student, courses):
+    """
+    Reports of `student` in `courses` (a Course queryset the caller already
+    scoped to what the user may see). Four queries whatever the course count.
+    """
+    courses = list(
+        courses.filter(Q(id__in=Mark.objects.filter(student=student).values('course_id')) | Q(students=student))
+        .distinct().order_by('code')
+    )
+    course_ids = [c.id for c in courses]
+
+    rows_by_course = {course_id: [] for course_id in course_ids}
+    for course_id, *row in Mark.objects.filter(student=student, course_id__in=course_ids).values_list('course_id', *MARK_ROW_FIELDS):
+        rows_by_course[course_id].append(tuple(row))
+
+    # Class average per assessment: total of the present scores / marks with a present score
+    class_averages = {course_id: {} for course_id in course_ids}
+    averages = (
+        MarkScore.objects.filter(course_id__in=course_ids, is_absent=False)
+        .values('course_id', 'assessment_name')
+        .annotate(total=Sum(Coalesce('value', Value(0.0), output_field=FloatField())), marks=Count('mark', distinct=True))
+    )
+    for row in averages:
+        class_averages[row['course_id']][row['assessment_name']] = row['total'] / row['marks'] if row['marks'] else 0.0
+
+    return {
+        "student": {"id": student.id, "usn": student.usn, "name": student.name},
+        "courses": [build_student_course_report(c, rows_by_course[c.id], class_averages[c.id]) for c in courses],
+    }
@@ -1,3 +1,1589 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import caching
+from .assessment_plan import get_assessment_plan
+from .attainment_cache import get_course_attainment, store_course_attainment, store_course_attainments
+from .attainment_queue import run_due_jobs
+from .calculation_services import _calculate_co_levels, calculate_course_attainment, get_course_scheme, get_global_scheme_settings
+from .compiled_scheme import compile_scheme
+from .mark_scores import rebuild_mark_scores, score_rows_for
+from .profiling import stats as profiling_stats
+from .program_attainment import current_academic_year
+from .models import (
+    ArticulationMatrix, AttainmentRecomputeJob, AttainmentResult, COAttainmentCounter, Configuration, Course, Department, Mark, MarkScore,
+    ProgramAttainmentSnapshot, ProgramOutcome, ProgramSpecificOutcome, Scheme, Student, Survey, TableVersion, User,
+)
+
+
+ABSENT_VALUES = ['AB', 'ab', 'Absent', 'A', 'NA', '-']
+IA_TOOLS = [
+    {'name': 'IA 1', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO1': 25, 'CO2': 25}},
+    {'name': 'IA 2', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO2': 20, 'CO3': 15, 'CO5': 15}},
+    {'name': 'Assignment', 'type': 'Assignment', 'maxMarks': 10},
+    {'name': 'Quiz', 'type': 'Activity', 'maxMarks': 10, 'coDistribution': {'CO4': 10}},
+    {'name': 'Improvement', 'type': 'Improvement Test', 'maxMarks': 50},
+    {'name': 'SEE', 'type': 'Semester End Exam', 'maxMarks': 100, 'coDistribution': {'CO1': 50, 'CO5': 50}},
+]
+LAB_TOOLS = [
+    {'name': 'Lab IA', 'type': 'Internal Assessment', 'maxMarks': 25, 'coDistribution': {'CO1': 10, 'CO2': 15}},
+    {'name': 'Lab Record', 'type': 'Laboratory', 'maxMarks': 20},
+    {'name': 'SEE', 'type': 'SEE', 'maxMarks': 50},
+]
+
+
+def random_score(rng, max_marks):
+    roll = rng.random()
+    if roll < 0.08:
+        return rng.choice(ABSENT_VALUES)
+    if roll < 0.12:
+        return ''
+    if roll < 0.2:
+        return str(round(rng.uniform(0, max_marks), 1))
+    return rng.randint(0, int(max_marks))
+
+
+class AttainmentFixtureMixin:
+    """Builds courses with randomized but reproducible marks."""
+
+    def setUp(self):
+        # Rows are rolled back between tests but the caches are not
+        caching.clear()
+        self.department = Department.objects.create(id='D01', name='Computer Science')
+        self.scheme = Scheme.objects.create(id='S2022', name='2022 Scheme', settings={
+            'pass_criteria': 40,
+            'attainment_levels': {'level_3': 75, 'level_2': 55, 'level_1': 35},
+            'weightage': {'direct': 90, 'indirect': 10},
+            'po_calculation': {'normalization_factor': 3},
+        })
+
+    def make_course(self, course_id, tools, cos=('CO1', 'CO2', 'CO3', 'CO4'), settings=None, scheme=None):
+        course = Course.objects.create(
+            id=course_id, code=course_id, name=f'Course {course_id}', semester=3, credits=4,
+            department=self.department, scheme=scheme,
+            cos=[{'id': co} for co in cos], assessment_tools=tools,
+            settings=settings or {},
+        )
+        ArticulationMatrix.objects.create(course=course, matrix={
+            'CO1': {'PO1': 3, 'PO2': 2}, 'CO2': {'PO1': '2', 'PSO1': 1}, 'CO3': {'PO3': '-'},
+        })
+        return course
+
+    def make_marks(self, course, n_students, seed, improvement_rate=0.2):
+        rng = random.Random(seed)
+        marks = []
+        for i in range(n_students):
+            student, _ = Student.objects.get_or_create(
+                id=f'{course.id}-S{i}', defaults={'name': f'Student {i}', 'usn': f'{course.id}USN{i}'}
+            )
+            student.courses.add(course)
+            for tool in course.assessment_tools:
+                if tool['type'] == 'Improvement Test' or rng.random() < 0.1:
+                    continue
+                dist = tool.get('coDistribution') or {'Score': tool['maxMarks']}
+                if tool['type'] == 'Internal Assessment' and course.settings.get('courseType') == 'Lab':
+                    dist = {'Test Marks': 15, 'Continuous Eval': 10}
+                scores = {key: random_score(rng, max_marks) for key, max_marks in dist.items()}
+                marks.append(Mark(
+                    id=f'{course.id}-{i}-{tool["name"]}', student=student, course=course,
+                    assessment_name=tool['name'], scores=scores,
+                ))
+            if rng.random() < improvement_rate:
+                target = rng.choice([t['name'] for t in course.assessment_tools if t['type'] != 'Improvement Test'])
+                scores = {'CO1': rng.randint(0, 25), 'CO2': rng.randint(0, 25)}
+                if rng.random() < 0.5:
+                    marks.append(Mark(
+                        id=f'{course.id}-{i}-imp', student=student, course=course,
+                        assessment_name='Improvement', scores=scores, improvement_test_for=target,
+                    ))
+                else:
+                    scores['_improvementTarget'] = target.lower()
+                    marks.append(Mark(
+                        id=f'{course.id}-{i}-imp', student=student, course=course,
+                        assessment_name='Improvement', scores=scores,
+                    ))
+        rng.shuffle(marks)
+        Mark.objects.bulk_create(marks)
+
+
+class AttainmentEngineParityTests(AttainmentFixtureMixin, TestCase):
+    """The vectorized engine must reproduce the Python engine exactly."""
+
+    def assert_engines_agree(self, course_id):
+        with override_settings(ATTAINMENT_ENGINE='python'):
+            expected = calculate_course_attainment(course_id)
+        with override_settings(ATTAINMENT_ENGINE='vectorized'):
+            actual = calculate_course_attainment(course_id)
+        self.assertEqual(actual, expected)
+        return expected
+
+    def test_theory_course(self):
+        course = self.make_course('C101', IA_TOOLS)
+        self.make_marks(course, 60, seed=1)
+        report = self.assert_engines_agree('C101')
+        self.assertEqual([row['co'] for row in report['co_attainment']], ['CO1', 'CO2', 'CO3', 'CO4', 'CO5'])
+
+    def test_theory_course_with_scheme(self):
+        course = self.make_course('C102', IA_TOOLS, scheme=self.scheme)
+        self.make_marks(course, 80, seed=2, improvement_rate=0.5)
+        self.assert_engines_agree('C102')
+
+    def test_lab_course(self):
+        course = self.make_course('C103', LAB_TOOLS, cos=('CO1', 'CO2'), settings={'courseType': 'Lab'})
+        self.make_marks(course, 50, seed=3)
+        self.assert_engines_agree('C103')
+
+    def test_many_seeds(self):
+        for seed in range(5):
+            course = self.make_course(f'R{seed}', IA_TOOLS, scheme=self.scheme if seed % 2 else None)
+            self.make_marks(course, 25, seed=seed)
+            self.assert_engines_agree(f'R{seed}')
+
+    def test_course_without_marks(self):
+        self.make_course('C104', IA_TOOLS)
+        report = self.assert_engines_agree('C104')
+        self.assertEqual(len(report['co_attainment']), 4)
+
+    def test_single_key_scores_and_edge_values(self):
+        course = self.make_course('C105', [
+            {'name': 'IA 1', 'type': 'Internal Assessment', 'maxMarks': 20, 'coDistribution': {'CO1': 10, 'CO2': 'x'}},
+            {'name': 'SEE', 'type': 'SEE', 'maxMarks': 100},
+        ], cos=('CO1', 'CO2'))
+        student = Student.objects.create(id='S1', name='One', usn='USN1')
+        other = Student.objects.create(id='S2', name='Two', usn='USN2')
+        Mark.objects.create(id='M1', student=student, course=course, assessment_name='IA 1', scores={'Total': '8'})
+        Mark.objects.create(id='M2', student=student, course=course, assessment_name='SEE', scores={'Q1': '30', 'Q2': 25.5})
+        Mark.objects.create(id='M3', student=other, course=course, assessment_name='IA 1', scores={'CO1': 'nan', 'CO2': 4})
+        Mark.objects.create(id='M4', student=other, course=course, assessment_name='SEE', scores={'Q1': 'AB', 'Q2': 40})
+        self.assert_engines_agree('C105')
+
+    def test_known_levels(self):
+        course = self.make_course('C106', [
+            {'name': 'IA 1', 'type': 'Internal Assessment', 'maxMarks': 20, 'coDistribution': {'CO1': 10, 'CO2': 10}},
+            {'name': 'SEE', 'type': 'SEE', 'maxMarks': 100},
+        ], cos=('CO1', 'CO2'))
+        for i, (co1, co2, see) in enumerate([(10, 2, 80), (6, 3, 20), (4, 'AB', 55), (9, 9, 60)]):
+            student = Student.objects.create(id=f'K{i}', name=f'K{i}', usn=f'KUSN{i}')
+            Mark.objects.create(id=f'K{i}-IA', student=student, course=course, assessment_name='IA 1', scores={'CO1': co1, 'CO2': co2})
+            Mark.objects.create(id=f'K{i}-SEE', student=student, course=course, assessment_name='SEE', scores={'Total': see})
+        report = self.assert_engines_agree('C106')
+        levels = {row['co']: (row['cie_level'], row['see_level']) for row in report['co_attainment']}
+        # CO1: 3/4 passed (75%) -> level 3; CO2: 1/3 passed -> level 0; SEE: 3/4 passed -> level 3
+        self.assertEqual(levels, {'CO1': (3, 3), 'CO2': (0, 3)})
+
+
+SQL_TOOLS = [
+    {'name': 'IA 1', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO1': 25, 'CO2': 25}},
+    {'name': 'IA 2', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO2': 20, 'CO3': 15, 'CO5': 15}},
+    {'name': 'Assignment', 'type': 'Assignment', 'maxMarks': 10},
+    {'name': 'SEE', 'type': 'Semester End Exam', 'maxMarks': 100, 'coDistribution': {'CO1': 50, 'CO6': 50}},
+]
+
+
+class SqlAttainmentEngineTests(AttainmentFixtureMixin, TestCase):
+    """The SQL engine matches the Python engine, aggregating in PostgreSQL where it can."""
+
+    def compare(self, course_id, expect_sql):
+        with override_settings(ATTAINMENT_ENGINE='python'):
+            expected = calculate_course_attainment(course_id)
+        with override_settings(ATTAINMENT_ENGINE='sql'), \
+                mock.patch('api.sql_attainment._calculate_co_levels', wraps=_calculate_co_levels) as fallback:
+            actual = calculate_course_attainment(course_id)
+        self.assertEqual(actual, expected)
+        used_sql = connection.vendor == 'postgresql' and expect_sql
+        self.assertEqual(fallback.called, not used_sql)
+
+    def test_theory_courses(self):
+        for seed in range(4):
+            course = self.make_course(f'Q{seed}', SQL_TOOLS, scheme=self.scheme if seed % 2 else None)
+            self.make_marks(course, 40, seed=seed, improvement_rate=0)
+            self.compare(f'Q{seed}', expect_sql=True)
+
+    def test_course_without_marks(self):
+        self.make_course('Q10', SQL_TOOLS)
+        self.compare('Q10', expect_sql=True)
+
+    def test_edge_values(self):
+        course = self.make_course('Q11', SQL_TOOLS, cos=('CO1', 'CO2', 'CO3'))
+        student = Student.objects.create(id='S1', name='One', usn='USN1')
+        other = Student.objects.create(id='S2', name='Two', usn='USN2')
+        Mark.objects.create(id='M1', student=student, course=course, assessment_name='IA 1', scores={'CO1': ' 10 ', 'CO2': '12.5'})
+        Mark.objects.create(id='M2', student=other, course=course, assessment_name='IA 1', scores={'CO1': '.5', 'CO2': ' ab '})
+        Mark.objects.create(id='M3', student=student, course=course, assessment_name='IA 2', scores={'CO2': 'x', 'CO3': -6, '_note': 1})
+        Mark.objects.create(id='M4', student=student, course=course, assessment_name='SEE', scores={'Q1': '30', 'Q2': 25.5, 'Q3': '-5'})
+        Mark.objects.create(id='M5', student=other, course=course, assessment_name='Semester End Exam', scores={'Q1': '45.'})
+        self.compare('Q11', expect_sql=True)
+
+    def test_single_key_scores(self):
+        course = self.make_course('Q13', SQL_TOOLS)
+        self.make_marks(course, 10, seed=8, improvement_rate=0)
+        Mark.objects.filter(course=course, assessment_name='IA 1').update(scores={'Total': '20'})
+        Mark.objects.filter(course=course, assessment_name='IA 2').update(scores={'_n': 'x', 'Total': '9'})
+        self.compare('Q13', expect_sql=True)
+
+    def test_python_only_cases_fall_back(self):
+        course = self.make_course('Q12', SQL_TOOLS)
+        self.make_marks(course, 30, seed=7, improvement_rate=0.5)
+        self.compare('Q12', expect_sql=False)
+
+        course = self.make_course('Q14', SQL_TOOLS)
+        self.make_marks(course, 10, seed=9, improvement_rate=0)
+        Mark.objects.filter(course=course, assessment_name='Assignment').update(scores={'CO1': '1e1', 'CO2': 3})
+        self.compare('Q14', expect_sql=False)
+
+        self.make_course('Q15', IA_TOOLS)
+        self.compare('Q15', expect_sql=False)
+
+
+@override_settings(ATTAINMENT_ENGINE='incremental')
+class IncrementalCounterTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C301', SQL_TOOLS, scheme=self.scheme)
+        self.make_marks(self.course, 20, seed=5, improvement_rate=0.5)
+        calculate_course_attainment('C301')
+
+    def assert_in_sync(self):
+        call_command('reconcile_co_counters', stdout=StringIO())
+        with override_settings(ATTAINMENT_ENGINE='python'):
+            expected = calculate_course_attainment('C301')
+        self.assertEqual(calculate_course_attainment('C301'), expected)
+
+    def test_counters_follow_mark_writes(self):
+        self.assertEqual(COAttainmentCounter.objects.filter(course=self.course).count(), 5)
+        student = Student.objects.filter(mark__course=self.course).exclude(mark__assessment_name='Improvement').first()
+        mark = Mark.objects.get(course=self.course, student=student, assessment_name='IA 1')
+        mark.scores = {'CO1': 2, 'CO2': 'AB'}
+        mark.save()
+        self.assert_in_sync()
+
+        improvement = Mark.objects.create(
+            id='C301-imp', student=student, course=self.course, assessment_name='Improvement',
+            scores={'CO1': 25, 'CO2': 25}, improvement_test_for='IA 1',
+        )
+        self.assert_in_sync()
+        improvement.scores = {'CO1': 0, 'CO2': 0}
+        improvement.save()
+        self.assert_in_sync()
+        improvement.delete()
+        self.assert_in_sync()
+
+        see = Mark.objects.filter(course=self.course, assessment_name='SEE').first()
+        see.scores = {'Q1': 'AB'}
+        see.save()
+        self.assert_in_sync()
+
+        newcomer = Student.objects.create(id='C301-NEW', name='New', usn='C301NEW')
+        mark.student = newcomer
+        mark.save()
+        self.assert_in_sync()
+        mark.delete()
+        self.assert_in_sync()
+
+    @skipUnless(connection.features.has_select_for_update, "row locks need select_for_update")
+    def test_mark_writes_and_rebuilds_lock_the_course(self):
+        def locks_course(queries):
+            return any('FOR UPDATE' in q['sql'] and '"api_course"' in q['sql'] for q in queries)
+
+        mark = Mark.objects.filter(course=self.course).first()
+        mark.scores = {'CO1': 1}
+        with CaptureQueriesContext(connection) as ctx:
+            mark.save()
+        self.assertTrue(locks_course(ctx.captured_queries))
+
+        COAttainmentCounter.objects.filter(course=self.course).delete()
+        with CaptureQueriesContext(connection) as ctx:
+            calculate_course_attainment('C301')
+        self.assertTrue(locks_course(ctx.captured_queries))
+        self.assert_in_sync()
+
+    def test_report_reads_do_not_scan_marks(self):
+        with self.assertNumQueries(4):
+            calculate_course_attainment('C301')
+
+    def test_configuration_changes_and_cascades_rebuild(self):
+        old = set(COAttainmentCounter.objects.values_list('fingerprint', flat=True))
+        self.scheme.settings = {**self.scheme.settings, 'pass_criteria': 60}
+        self.scheme.save()
+        self.assert_in_sync()
+        self.assertNotEqual(set(COAttainmentCounter.objects.values_list('fingerprint', flat=True)), old)
+
+        Student.objects.filter(mark__course=self.course).first().delete()
+        self.assertFalse(COAttainmentCounter.objects.filter(course=self.course).exists())
+        self.assert_in_sync()
+
+    def test_reconcile_detects_and_fixes_drift(self):
+        COAttainmentCounter.objects.filter(course=self.course, co='CO1').update(cie_passed=F('cie_passed') + 3)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_co_counters', stdout=StringIO())
+        call_command('reconcile_co_counters', '--fix', stdout=StringIO())
+        self.assert_in_sync()
+
+
+class AttainmentCacheTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C201', IA_TOOLS, scheme=self.scheme)
+        self.make_marks(self.course, 20, seed=7)
+
+    def assert_stale(self, stale=True):
+        self.assertEqual(AttainmentResult.objects.get(course=self.course).is_stale, stale)
+
+    def test_repeated_reads_are_single_lookup(self):
+        first = get_course_attainment('C201')
+        self.assertEqual(first, calculate_course_attainment('C201'))
+        with self.assertNumQueries(1):
+            self.assertEqual(get_course_attainment('C201'), first)
+
+    def test_unknown_course(self):
+        self.assertEqual(get_course_attainment('NOPE'), {"error": "Course not found"})
+        self.assertFalse(AttainmentResult.objects.exists())
+
+    def test_mark_write_invalidates(self):
+        get_course_attainment('C201')
+        mark = Mark.objects.filter(course=self.course).first()
+        mark.scores = {'CO1': 0}
+        mark.save()
+        self.assert_stale()
+        self.assertEqual(get_course_attainment('C201'), calculate_course_attainment('C201'))
+        self.assert_stale(False)
+        mark.delete()
+        self.assert_stale()
+
+    def test_moved_mark_invalidates_both_courses(self):
+        other = self.make_course('C202', IA_TOOLS, scheme=self.scheme)
+        get_course_attainment('C201')
+        get_course_attainment('C202')
+        mark = Mark.objects.filter(course=self.course).first()
+        # The stored course is remembered from the load, not read again on save
+        with CaptureQueriesContext(connection) as queries:
+            mark.save()
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "api_mark"' in q['sql']])
+        get_course_attainment('C201')
+
+        mark.course = other
+        mark.save()
+        self.assert_stale()
+        self.assertTrue(AttainmentResult.objects.get(course=other).is_stale)
+        self.assertEqual(get_course_attainment('C201'), calculate_course_attainment('C201'))
+
+    def test_course_and_matrix_writes_invalidate(self):
+        get_course_attainment('C201')
+        self.course.name = 'Renamed'
+        self.course.save(update_fields=['name'])
+        self.assert_stale(False)
+        self.course.settings = {'indirect_attainment': {'CO1': 2.5}}
+        self.course.save()
+        self.assert_stale()
+
+        get_course_attainment('C201')
+        matrix = ArticulationMatrix.objects.get(course=self.course)
+        matrix.matrix = {'CO1': {'PO1': 1}}
+        matrix.save()
+        self.assert_stale()
+
+    def test_scheme_and_global_configuration_invalidate(self):
+        get_course_attainment('C201')
+        Configuration.objects.create(key='global_scheme_settings', value={'pass_criteria': 60})
+        self.assert_stale(False)
+        self.scheme.settings = {**self.scheme.settings, 'pass_criteria': 60}
+        self.scheme.save()
+        self.assert_stale()
+
+        self.scheme.delete()
+        get_course_attainment('C201')
+        Configuration.objects.update_or_create(key='global_scheme_settings', defaults={'value': {'pass_criteria': 30}})
+        self.assert_stale()
+        self.assertEqual(get_course_attainment('C201'), calculate_course_attainment('C201'))
+
+    def test_result_is_not_stored_over_newer_invalidation(self):
+        get_course_attainment('C201')
+        row = AttainmentResult.objects.get(course=self.course)
+        Mark.objects.filter(course=self.course).first().save()
+        self.assertFalse(store_course_attainment('C201', {'old': True}, row.version))
+        self.assert_stale()
+
+
+@override_settings(ATTAINMENT_ASYNC_RECOMPUTE=True, ATTAINMENT_RECOMPUTE_DEBOUNCE_SECONDS=0)
+class AttainmentQueueTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C251', IA_TOOLS, scheme=self.scheme)
+        self.make_marks(self.course, 12, seed=11)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+        self.url = '/api/reports/course-attainment/C251/'
+
+    def edit_mark(self):
+        mark = Mark.objects.filter(course=self.course).first()
+        mark.scores = {'CO1': 0}
+        mark.save()
+
+    def test_stale_report_is_served_until_worker_runs(self):
+        first = self.client.get(self.url).data
+        self.assertFalse(first['freshness']['stale'])
+        self.edit_mark()
+        self.edit_mark()
+        self.assertEqual(AttainmentRecomputeJob.objects.count(), 1)
+
+        stale = self.client.get(self.url).data
+        self.assertTrue(stale['freshness']['stale'])
+        self.assertEqual(stale['co_attainment'], first['co_attainment'])
+
+        self.assertEqual(run_due_jobs(), (1, 1))
+        self.assertFalse(AttainmentRecomputeJob.objects.exists())
+        fresh = self.client.get(self.url).data
+        self.assertFalse(fresh['freshness']['stale'])
+        self.assertEqual(fresh['co_attainment'], calculate_course_attainment('C251')['co_attainment'])
+
+    def test_debounce_delays_jobs(self):
+        get_course_attainment('C251')
+        with override_settings(ATTAINMENT_RECOMPUTE_DEBOUNCE_SECONDS=60):
+            self.edit_mark()
+        self.assertEqual(run_due_jobs(), (0, 0))
+
+    def test_failed_job_is_requeued(self):
+        get_course_attainment('C251')
+        self.edit_mark()
+        with mock.patch('api.attainment_cache.calculate_course_attainment', side_effect=RuntimeError):
+            self.assertEqual(run_due_jobs(), (1, 0))
+        self.assertEqual(AttainmentRecomputeJob.objects.get(course_id='C251').attempts, 1)
+        AttainmentRecomputeJob.objects.update(not_before=timezone.now())
+        call_command('attainment_worker', '--once', '--workers', '1', stdout=StringIO())
+        self.assertFalse(AttainmentRecomputeJob.objects.exists())
+        self.assertFalse(AttainmentResult.objects.get(course=self.course).is_stale)
+
+
+class ComputeAttainmentCommandTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            self.make_marks(self.make_course(f'B{i}', IA_TOOLS, scheme=self.scheme if i % 2 else None), 8, seed=i)
+
+    def test_all_courses_are_stored(self):
+        out = StringIO()
+        call_command('compute_attainment', '--all', '--workers', '1', '--shard-size', '2', stdout=out)
+        self.assertIn('Computed 5 courses', out.getvalue())
+        for row in AttainmentResult.objects.all():
+            self.assertFalse(row.is_stale)
+            self.assertEqual(row.result, calculate_course_attainment(row.course_id))
+
+        Mark.objects.filter(course_id='B3').first().save()
+        out = StringIO()
+        call_command('compute_attainment', '--all', '--stale-only', '--workers', '1', stdout=out)
+        self.assertIn('Computed 1 courses', out.getvalue())
+
+    def test_bulk_store_skips_newer_versions(self):
+        get_course_attainment('B0')
+        get_course_attainment('B1')
+        versions = dict(AttainmentResult.objects.values_list('course_id', 'version'))
+        Mark.objects.filter(course_id='B1').first().save()
+        self.assertEqual(store_course_attainments({'B0': {'new': 1}, 'B1': {'new': 1}}, versions), ['B0'])
+        self.assertEqual(AttainmentResult.objects.get(course_id='B0').result, {'new': 1})
+        self.assertTrue(AttainmentResult.objects.get(course_id='B1').is_stale)
+
+
+class DepartmentAttainmentTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(4):
+            course = self.make_course(f'D{i}', LAB_TOOLS if i == 3 else IA_TOOLS,
+                                      settings={'courseType': 'Lab'} if i == 3 else {},
+                                      scheme=self.scheme if i % 2 else None)
+            course.semester = 3 + i % 2
+            course.save()
+            self.make_marks(course, 15, seed=i)
+        self.client = APIClient()
+        self.superadmin = User.objects.create(username='root', role=User.Role.SUPER_ADMIN)
+        self.url = '/api/reports/department-attainment/D01/'
+
+    def test_matches_per_course_reports(self):
+        self.client.force_authenticate(self.superadmin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        courses = response.data['courses']
+        self.assertEqual([c['course_id'] for c in courses], ['D0', 'D1', 'D2', 'D3'])
+        for course in courses:
+            expected = calculate_course_attainment(course['course_id'])
+            self.assertEqual(course['co_attainment'], expected['co_attainment'])
+            self.assertEqual(course['po_attainment'], expected['po_attainment'])
+        self.assertEqual([row['po'] for row in response.data['pso_attainment']], ['PSO1'])
+        self.assertEqual(response.data['po_attainment'][0]['courses'], 4)
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.client.force_authenticate(self.superadmin)
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(self.url)
+        # Cold run: fixed lookups plus one conditional UPDATE per computed course
+        self.assertLessEqual(len(cold), 8 + 4)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_filters(self):
+        self.client.force_authenticate(self.superadmin)
+        response = self.client.get(self.url, {'semester': 4})
+        self.assertEqual([c['course_id'] for c in response.data['courses']], ['D1', 'D3'])
+        response = self.client.get(self.url, {'scheme': 'S2022', 'semester': 3})
+        self.assertEqual(response.data['courses'], [])
+        self.assertEqual(self.client.get(self.url, {'semester': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/department-attainment/D99/').status_code, 404)
+
+    def test_admins_are_limited_to_their_department(self):
+        other = Department.objects.create(id='D02', name='Electronics')
+        admin = User.objects.create(username='admin', role=User.Role.ADMIN, department=other)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get('/api/reports/department-attainment/D02/').status_code, 200)
+        faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department)
+        self.client.force_authenticate(faculty)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ProgramAttainmentTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            self.make_marks(self.make_course(f'P{i}', IA_TOOLS, scheme=self.scheme if i else None), 12, seed=i)
+        for n in (10, 2, 1, 3):
+            ProgramOutcome.objects.create(id=f'PO{n}', description='')
+        ProgramSpecificOutcome.objects.create(id='PSO1', description='', department=self.department)
+        self.survey = Survey.objects.create(
+            department=self.department,
+            exit_survey={'PO1': '2.5', 'PO2': 3, 'PSO1': ''},
+            employer_survey={'PO1': 1.5, 'PO2': 'x'},
+            alumni_survey={},
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+        self.url = '/api/reports/program-attainment/D01/'
+
+    def test_blends_course_rollup_with_surveys(self):
+        response = self.client.get(self.url, {'scheme': 'S2022'})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['outcomes'], ['PO1', 'PO2', 'PO3', 'PO10', 'PSO1'])
+        self.assertEqual(data['weightage'], {'direct': 90.0, 'indirect': 10.0})
+
+        # Unrounded course values, averaged unrounded
+        po1 = [self.client_attainment(f'P{i}', 'PO1') for i in range(3)]
+        self.assertEqual([c['attainment']['PO1'] for c in data['courses']], po1)
+        self.assertEqual(data['direct']['PO1'], sum(po1) / 3)
+        self.assertNotIn('PO10', data['direct'])
+        self.assertNotIn('PO3', data['direct'])
+
+        # Indirect averages only the surveys that rated the outcome; the ratings come back as stored
+        self.assertEqual(data['indirect'], {'PO1': 2.0, 'PO2': 3.0, 'PO3': 0.0, 'PO10': 0.0, 'PSO1': 0.0})
+        self.assertEqual(data['surveys']['exit'], {'PO1': '2.5', 'PO2': 3, 'PSO1': ''})
+        self.assertEqual(data['total']['PO1'], data['direct']['PO1'] * 90 / 100 + 2.0 * 10 / 100)
+        self.assertEqual(data['total']['PO10'], 0.0)
+
+    def client_attainment(self, course_id, outcome, norm_factor=3):
+        """The dashboards' former per-course math: mean of parseFloat(mapping) * score_index / factor."""
+        matrix = ArticulationMatrix.objects.get(course_id=course_id).matrix
+        values = []
+        for row in calculate_course_attainment(course_id)['co_attainment']:
+            mapping = matrix.get(row['co'], {}).get(outcome)
+            if mapping is not None and str(mapping).strip() not in ('', '-'):
+                values.append(float(mapping) * row['score_index'] / norm_factor)
+        return sum(values) / len(values) if values else None
+
+    def test_zero_mappings_count(self):
+        ArticulationMatrix.objects.filter(course_id='P1').update(matrix={
+            'CO1': {'PO1': 3, 'PO3': 0}, 'CO2': {'PO1': 0}, 'CO3': {'PO3': '-'},
+        })
+        Mark.objects.filter(course_id='P1').first().save()
+        data = self.client.get(self.url).data
+        self.assertEqual(data['courses'][1]['attainment']['PO3'], 0.0)
+        self.assertEqual(data['courses'][1]['attainment']['PO1'], self.client_attainment('P1', 'PO1'))
+        self.assertEqual(data['direct']['PO3'], 0.0)
+
+    def test_courses_without_a_factor_use_3(self):
+        # The global settings' factor is not used for the program roll-up
+        Configuration.objects.create(key='global_scheme_settings', value={'po_calculation': {'normalization_factor': 2}})
+        data = self.client.get(self.url).data
+        self.assertEqual([c['attainment']['PO1'] for c in data['courses']],
+                         [self.client_attainment(f'P{i}', 'PO1') for i in range(3)])
+        self.scheme.settings = {**self.scheme.settings, 'po_calculation': {'normalization_factor': 2}}
+        self.scheme.save()
+        data = self.client.get(self.url).data
+        self.assertEqual(data['courses'][1]['attainment']['PO1'], self.client_attainment('P1', 'PO1', norm_factor=2))
+        self.assertEqual(data['courses'][0]['attainment']['PO1'], self.client_attainment('P0', 'PO1'))
+
+    def test_snapshot_is_reused_until_inputs_change(self):
+        first = self.client.get(self.url).data
+        self.assertEqual(first['academic_year'], current_academic_year())
+        self.assertEqual(first['weightage'], {'direct': 80.0, 'indirect': 20.0})
+        self.assertEqual(ProgramAttainmentSnapshot.objects.count(), 1)
+        # A warm read checks the inputs' signature without recomputing any course
+        with self.assertNumQueries(6):
+            self.assertEqual(self.client.get(self.url).data['computed_at'], first['computed_at'])
+
+        mark = Mark.objects.filter(course_id='P1', assessment_name='IA 1').first()
+        mark.scores = {'CO1': 0, 'CO2': 0}
+        mark.save()
+        self.assertNotEqual(self.client.get(self.url).data['computed_at'], first['computed_at'])
+        self.survey.alumni_survey = {'PO3': 3}
+        self.survey.save()
+        self.assertEqual(self.client.get(self.url).data['indirect']['PO3'], 3.0)
+        self.assertEqual(ProgramAttainmentSnapshot.objects.count(), 1)
+
+    def test_malformed_weightage_falls_back_to_the_default(self):
+        # A reference scheme no course uses: only its weightage is read
+        reference = Scheme.objects.create(id='REF', name='Reference')
+        for weightage in ([80, 20], '80/20', {'direct': 'x'}):
+            reference.settings = {'weightage': weightage}
+            reference.save()
+            response = self.client.get(self.url, {'scheme': 'REF'})
+            self.assertEqual(response.status_code, 200, weightage)
+            self.assertEqual(response.data['weightage'], {'direct': 80.0, 'indirect': 20.0})
+
+    def test_past_years_are_served_as_stored(self):
+        self.assertEqual(self.client.get(self.url, {'academic_year': '2001-02'}).status_code, 404)
+        ProgramAttainmentSnapshot.objects.create(
+            department=self.department, academic_year='2001-02', signature='', result={'total': {'PO1': 1.0}},
+            computed_at=timezone.now(),
+        )
+        self.assertEqual(self.client.get(self.url, {'academic_year': '2001-02'}).data, {'total': {'PO1': 1.0}})
+        self.assertEqual(self.client.get(self.url, {'academic_year': '2001'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'scheme': 'nope'}).status_code, 404)
+
+    def test_admins_are_limited_to_their_department(self):
+        admin = User.objects.create(username='admin', role=User.Role.ADMIN,
+                                    department=Department.objects.create(id='D02', name='Electronics'))
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get('/api/reports/program-attainment/D02/').status_code, 200)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0)
+class ProfilingTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        course = self.make_course('PRF', IA_TOOLS, scheme=self.scheme)
+        self.make_marks(course, 10, seed=21)
+        self.superadmin = User.objects.create(username='root', role=User.Role.SUPER_ADMIN)
+        # The middleware is set up with the client's first request
+        self.client = APIClient()
+        self.client.force_authenticate(self.superadmin)
+        profiling_stats.reset()
+
+    def timings(self, response):
+        return {metric.split(';')[0] for metric in response['Server-Timing'].split(', ')}
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/reports/course-attainment/PRF/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue({'total', 'db', 'co_levels', 'final_index', 'po'} <= self.timings(response))
+
+        response = self.client.get('/api/marks/', {'course': 'PRF'})
+        self.assertTrue({'total', 'db', 'serialize'} <= self.timings(response))
+
+    def test_stats_endpoint(self):
+        self.client.get('/api/reports/course-attainment/PRF/')
+        self.client.get('/api/reports/course-attainment/PRF/')
+        data = self.client.get('/api/profiling/').data
+        endpoint = next(e for e in data['endpoints'] if 'course-attainment' in e['endpoint'])
+        self.assertEqual(endpoint['count'], 2)
+        self.assertGreater(endpoint['queries'], 0)
+        self.assertIn('co_levels', endpoint['phases_ms'])
+
+        self.assertEqual(self.client.delete('/api/profiling/').status_code, 204)
+        # Only the DELETE itself was sampled after the reset
+        self.assertEqual([e['endpoint'] for e in profiling_stats.snapshot()['endpoints']], ['DELETE /api/profiling/'])
+
+        faculty = User.objects.create(username='fac', role=User.Role.FACULTY)
+        self.client.force_authenticate(faculty)
+        self.assertEqual(self.client.get('/api/profiling/').status_code, 403)
+
+    def test_sampling_and_opt_in(self):
+        with override_settings(PROFILING_SAMPLE_RATE=0.0):
+            client = APIClient()
+            client.force_authenticate(self.superadmin)
+            self.assertNotIn('Server-Timing', client.get('/api/courses/'))
+        with override_settings(PROFILING_ENABLED=False):
+            client = APIClient()
+            client.force_authenticate(self.superadmin)
+            self.assertNotIn('Server-Timing', client.get('/api/courses/'))
+        self.assertEqual(profiling_stats.snapshot()['sampled_requests'], 0)
+
+
+class AttainmentSimulationTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.make_marks(self.make_course('W1', IA_TOOLS, scheme=self.scheme), 30, seed=21)
+        self.make_marks(self.make_course('W2', LAB_TOOLS, cos=('CO1', 'CO2'), settings={'courseType': 'Lab'}), 20, seed=22)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+        self.url = '/api/reports/attainment-simulation/'
+
+    def test_before_and_after_match_recalculation(self):
+        candidates = [
+            {'pass_criteria': 60},
+            {'pass_criteria': 60, 'attainment_levels': {'level_3': 50, 'level_2': 40, 'level_1': 30}},
+            {'weightage': {'direct': 50, 'indirect': 50}},
+        ]
+        response = self.client.post(self.url, {'course_ids': ['W1', 'W2'], 'candidates': candidates}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AttainmentResult.objects.exists())
+
+        for course in response.data['courses']:
+            expected = calculate_course_attainment(course['course_id'])
+            self.assertEqual(course['before']['co_attainment'], expected['co_attainment'])
+            self.assertEqual(course['before']['po_attainment'], expected['po_attainment'])
+            self.assertEqual(len(course['after']), 3)
+
+        # The first candidate applied for real gives the simulated W1 report
+        self.scheme.settings = {**self.scheme.settings, 'pass_criteria': 60}
+        self.scheme.save()
+        expected = calculate_course_attainment('W1')
+        simulated = response.data['courses'][0]['after'][0]
+        self.assertEqual(simulated['co_attainment'], expected['co_attainment'])
+        self.assertEqual(simulated['po_attainment'], expected['po_attainment'])
+        self.assertEqual(len(response.data['po_attainment']['after']), 3)
+
+    def test_validation_and_scoping(self):
+        post = lambda body: self.client.post(self.url, body, format='json')
+        self.assertEqual(post({'course_ids': ['W1'], 'settings': {'pass_criteria': 55}}).status_code, 200)
+        self.assertEqual(post({'course_ids': [], 'candidates': [{}]}).status_code, 400)
+        self.assertEqual(post({'course_ids': ['W1'], 'candidates': [{'attainment_levels': {'level_1': 'x'}}]}).status_code, 400)
+        self.assertEqual(post({'course_ids': ['W1'], 'candidates': ['x']}).status_code, 400)
+        for factor in (0, -1, '3', None, True):
+            response = post({'course_ids': ['W1'], 'candidates': [{'po_calculation': {'normalization_factor': factor}}]})
+            self.assertEqual(response.status_code, 400, factor)
+        for weightage in ({'direct': '80', 'indirect': 20}, {'direct': 80, 'indirect': None}, {'direct': True}):
+            self.assertEqual(post({'course_ids': ['W1'], 'candidates': [{'weightage': weightage}]}).status_code, 400, weightage)
+        self.assertEqual(post({'course_ids': ['W1'], 'candidates': [{'po_calculation': {'normalization_factor': 2.5}}]}).status_code, 200)
+        self.assertEqual(post({'course_ids': ['W1', 'NOPE'], 'candidates': [{}]}).status_code, 404)
+
+        other = Department.objects.create(id='D02', name='Electronics')
+        self.client.force_authenticate(User.objects.create(username='admin', role=User.Role.ADMIN, department=other))
+        self.assertEqual(post({'course_ids': ['W1'], 'candidates': [{}]}).status_code, 404)
+        faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department)
+        self.client.force_authenticate(faculty)
+        self.assertEqual(post({'course_ids': ['W1'], 'candidates': [{}]}).status_code, 403)
+
+
+class StudentReportTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department)
+        lab = self.make_course('L1', LAB_TOOLS, cos=('CO1', 'CO2'), settings={'courseType': 'Lab'})
+        theory = self.make_course('T1', IA_TOOLS)
+        Course.objects.filter(id='L1').update(assigned_faculty=self.faculty)
+        self.student = Student.objects.create(id='ST1', name='Asha', usn='1XX21CS001')
+        other = Student.objects.create(id='ST2', name='Ravi', usn='1XX21CS002')
+        self.student.courses.add(lab, theory)
+        Mark.objects.create(id='A1', student=self.student, course=lab, assessment_name='Lab IA',
+                            scores={'Test Marks': 10, 'Continuous Eval': 5})
+        Mark.objects.create(id='A2', student=self.student, course=lab, assessment_name='Lab Record', scores={'Score': 16})
+        Mark.objects.create(id='A3', student=self.student, course=theory, assessment_name='IA 1', scores={'CO1': 10, 'CO2': 20})
+        Mark.objects.create(id='A4', student=self.student, course=theory, assessment_name='Improvement',
+                            scores={'CO1': 20, 'CO2': 20}, improvement_test_for='IA 1')
+        Mark.objects.create(id='A5', student=other, course=theory, assessment_name='IA 1', scores={'CO1': 'AB', 'CO2': 10})
+        self.client = APIClient()
+        self.url = '/api/reports/student/1XX21CS001/'
+
+    def test_normalized_co_performance(self):
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        lab, theory = response.data['courses']
+
+        # Lab IA: 15/25 scaled onto CO1 (10) and CO2 (15); Lab Record's Score counts for every CO
+        self.assertEqual([(co['co'], co['percentage']) for co in lab['co_performance']], [('CO1', 73.33), ('CO2', 71.43)])
+        self.assertEqual(lab['assessments'][0]['breakdown'], [
+            {'co': 'CO1', 'max': 10.0, 'obtained': 6.0}, {'co': 'CO2', 'max': 15.0, 'obtained': 9.0},
+        ])
+        # The better improvement test replaces IA 1; the unattempted Assignment still counts as 0/10
+        self.assertEqual(theory['co_performance'][0], {'co': 'CO1', 'obtained': 20.0, 'max': 35.0, 'percentage': 57.14})
+        ia1 = theory['assessments'][0]
+        self.assertEqual((ia1['obtained'], ia1['class_average']), (30.0, 20.0))
+
+    def test_scoping(self):
+        self.client.force_authenticate(self.faculty)
+        self.assertEqual([c['course_id'] for c in self.client.get(self.url).data['courses']], ['L1'])
+        self.assertEqual(self.client.get(self.url, {'course': 'T1'}).data['courses'], [])
+        self.assertEqual(self.client.get('/api/reports/student/NOPE/').status_code, 404)
+        self.client.force_authenticate(User.objects.create(username='stu', role=User.Role.STUDENT))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class BulkMarksTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department)
+        self.course = self.make_course('C301', IA_TOOLS)
+        self.course.assigned_faculty = self.faculty
+        self.course.save()
+        self.students = [Student.objects.create(id=f'B{i}', name=f'B{i}', usn=f'BUSN{i}') for i in range(30)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.faculty)
+
+    def rows(self, assessment='IA 1', score=10):
+        return [
+            {'student': s.id, 'course': 'C301', 'assessment_name': assessment, 'scores': {'CO1': score, 'CO2': 5}}
+            for s in self.students
+        ]
+
+    def test_create_then_update(self):
+        response = self.client.post('/api/marks/bulk/', {'rows': self.rows()}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 30)
+        self.assertEqual(Mark.objects.get(student_id='B0').id, 'M_C301_B0_IA1')
+
+        response = self.client.post('/api/marks/bulk/', self.rows(score=20), format='json')
+        self.assertEqual(response.data['updated'], 30)
+        self.assertEqual(Mark.objects.count(), 30)
+        self.assertEqual(Mark.objects.get(student_id='B5').scores, {'CO1': 20, 'CO2': 5})
+        self.assertEqual(Mark.objects.get(student_id='B5').id, 'M_C301_B5_IA1')
+
+    def test_query_count_is_independent_of_row_count(self):
+        self.client.post('/api/marks/bulk/', {'rows': self.rows()}, format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post('/api/marks/bulk/', {'rows': self.rows(score=1)[:3]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post('/api/marks/bulk/', {'rows': self.rows(score=2)}, format='json')
+        self.assertEqual(len(small), len(large))
+
+    def test_delete_and_row_errors(self):
+        self.client.post('/api/marks/bulk/', {'rows': self.rows()[:2]}, format='json')
+        get_course_attainment('C301')
+        rows = [
+            {'student': 'B0', 'course': 'C301', 'assessment_name': 'IA 1', 'delete': True},
+            {'student': 'B9', 'course': 'C301', 'assessment_name': 'IA 1', 'delete': True},
+            {'student': 'NOPE', 'course': 'C301', 'assessment_name': 'IA 1', 'scores': {}},
+            {'student': 'B1', 'course': 'C301', 'assessment_name': 'IA 1', 'scores': 'bad'},
+            {'student': 'B2', 'course': 'C301', 'assessment_name': 'Improvement', 'scores': {'CO1': 9}, 'improvement_test_for': 'IA 1'},
+            {'student': 'B2', 'course': 'C301', 'assessment_name': 'Improvement', 'scores': {'CO1': 3}},
+        ]
+        data = self.client.post('/api/marks/bulk/', {'rows': rows}, format='json').data
+        self.assertEqual([r['status'] for r in data['results']], ['deleted', 'skipped', 'error', 'error', 'created', 'error'])
+        self.assertEqual(data['results'][2]['errors'], {'student': 'Student not found.'})
+        self.assertFalse(Mark.objects.filter(student_id='B0').exists())
+        self.assertEqual(Mark.objects.get(student_id='B2').improvement_test_for, 'IA 1')
+        self.assertTrue(AttainmentResult.objects.get(course=self.course).is_stale)
+
+    def test_mark_inserted_after_the_lookup_is_updated(self):
+        from . import bulk_marks
+        generate = bulk_marks._mark_id
+
+        def concurrent_insert(course_id, student_id, assessment_name):
+            # Another request stores the same key once the existing marks were read
+            if student_id == 'B0':
+                Mark.objects.create(id='OTHER', student_id='B0', course_id=course_id,
+                                    assessment_name=assessment_name, scores={'CO1': 1})
+            return generate(course_id, student_id, assessment_name)
+
+        with mock.patch('api.bulk_marks._mark_id', side_effect=concurrent_insert):
+            data = self.client.post('/api/marks/bulk/', {'rows': self.rows()[:2]}, format='json').data
+        self.assertEqual([(r['status'], r['id']) for r in data['results']],
+                         [('updated', 'OTHER'), ('created', 'M_C301_B1_IA1')])
+        self.assertEqual(Mark.objects.get(id='OTHER').scores, {'CO1': 10, 'CO2': 5})
+        self.assertFalse(Mark.objects.filter(id='M_C301_B0_IA1').exists())
+        self.assertEqual(sorted(MarkScore.objects.filter(student_id='B0').values_list('mark_id', 'co')),
+                         [('OTHER', 'CO1'), ('OTHER', 'CO2')])
+
+    def test_permission_checked_per_course(self):
+        other = self.make_course('C302', IA_TOOLS)
+        rows = self.rows()[:1] + [{'student': 'B1', 'course': other.id, 'assessment_name': 'IA 1', 'scores': {}}]
+        response = self.client.post('/api/marks/bulk/', {'rows': rows}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Mark.objects.exists())
+        self.assertEqual(self.client.post('/api/marks/bulk/', {'rows': []}, format='json').status_code, 400)
+
+
+class StudentBulkUploadTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C401', IA_TOOLS)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='adm', role=User.Role.ADMIN, department=self.department))
+
+    def upload(self, content, course_id='C401'):
+        file = SimpleUploadedFile('students.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/api/students/bulk_upload/', {'file': file, 'course_id': course_id}, format='multipart')
+
+    def test_creates_and_enrolls(self):
+        existing = Student.objects.create(id='OLD1', name='Old', usn='1AB001')
+        enrolled = Student.objects.create(id='1AB002', name='Enrolled', usn='1AB002')
+        enrolled.courses.add(self.course)
+        csv_body = 'USN,Name\n1ab001,Old\n1AB002,Enrolled\n1AB003,New One\n\n1AB003,Again\nONLYUSN\n1AB004,New Two\n'
+        response = self.upload(csv_body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {k: response.data[k] for k in ['created', 'enrolled', 'skipped', 'error_count']},
+            {'created': 2, 'enrolled': 3, 'skipped': 2, 'error_count': 1}
+        )
+        self.assertEqual(response.data['errors'], [{'row': 7, 'error': 'Expected USN and Name columns'}])
+        self.assertEqual(set(self.course.students.values_list('id', flat=True)), {existing.id, '1AB002', '1AB003', '1AB004'})
+
+    def test_queries_grow_per_chunk_not_per_row(self):
+        rows = ''.join(f'USN{i:04d},Student {i}\n' for i in range(200))
+        with mock.patch('api.student_import.IMPORT_CHUNK_SIZE', 100):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.upload('USN,Name\n' + rows)
+        self.assertEqual(response.data['created'], 200)
+        self.assertEqual(self.course.students.count(), 200)
+        self.assertLess(len(queries), 20)
+
+    def test_bad_input(self):
+        self.assertEqual(self.upload('USN,Name\n', course_id='NOPE').status_code, 404)
+        file = SimpleUploadedFile('students.csv', b'USN,Name\n\xff\xfe,bad\n', content_type='text/csv')
+        response = self.client.post('/api/students/bulk_upload/', {'file': file, 'course_id': 'C401'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+    def test_late_parse_error_imports_nothing(self):
+        # Far enough into the file that earlier chunks were already written
+        rows = ''.join(f'USN{i:04d},Student {i}\n' for i in range(1000)).encode('utf-8')
+        file = SimpleUploadedFile('students.csv', b'USN,Name\n' + rows + b'\xff\xfe,bad\n', content_type='text/csv')
+        with mock.patch('api.student_import.IMPORT_CHUNK_SIZE', 100):
+            response = self.client.post('/api/students/bulk_upload/', {'file': file, 'course_id': 'C401'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Student.objects.exists())
+        self.assertEqual(self.course.students.count(), 0)
+
+
+class MarkScoreSyncTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C501', IA_TOOLS)
+        self.student = Student.objects.create(id='N1', name='N1', usn='NUSN1')
+
+    def rows(self, **filters):
+        return sorted(MarkScore.objects.filter(**filters).values_list('co', 'value', 'is_absent', 'is_improvement'))
+
+    def test_rows_follow_mark_writes(self):
+        mark = Mark.objects.create(id='N-IA', student=self.student, course=self.course, assessment_name='IA 1',
+                                   scores={'CO1': '12.5', 'CO2': 'AB', 'Part A': 'x'})
+        self.assertEqual(self.rows(mark=mark), [('CO1', 12.5, False, False), ('CO2', None, True, False), ('Part A', None, False, False)])
+
+        mark.scores = {'CO1': 3, '_improvementTarget': 'IA 2'}
+        mark.save()
+        self.assertEqual(self.rows(mark=mark), [('CO1', 3.0, False, True)])
+        self.assertEqual(MarkScore.objects.get(mark=mark).assessment_name, 'IA 1')
+
+        # Every copied field resyncs, also when saved on its own
+        other = Student.objects.create(id='N2', name='N2', usn='NUSN2')
+        mark.assessment_name, mark.student = 'IA 3', other
+        mark.save(update_fields=['assessment_name'])
+        mark.save(update_fields=['student'])
+        self.assertEqual(list(MarkScore.objects.filter(mark=mark).values_list('assessment_name', 'student_id')), [('IA 3', 'N2')])
+
+        mark.delete()
+        self.assertFalse(MarkScore.objects.exists())
+
+    def test_bulk_upsert_and_rebuild(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+        row = {'student': 'N1', 'course': 'C501', 'assessment_name': 'IA 2', 'scores': {'CO2': 7, 'CO3': '-'}}
+        client.post('/api/marks/bulk/', {'rows': [row]}, format='json')
+        client.post('/api/marks/bulk/', {'rows': [{**row, 'scores': {'CO2': 9}, 'improvement_test_for': 'IA 1'}]}, format='json')
+        self.assertEqual(self.rows(course=self.course, assessment_name='IA 2'), [('CO2', 9.0, False, True)])
+
+        MarkScore.objects.all().delete()
+        rebuild_mark_scores()
+        self.assertEqual(self.rows(course=self.course, assessment_name='IA 2'), [('CO2', 9.0, False, True)])
+
+
+class PrincipalAuthenticationTests(AttainmentFixtureMixin, TestCase):
+    """Requests authenticated with a JWT resolve the user without reading the users table."""
+
+    def setUp(self):
+        super().setUp()
+        self.faculty = User.objects.create_user(username='fac', password='secret', role=User.Role.FACULTY,
+                                                department=self.department)
+        self.course = self.make_course('A1', IA_TOOLS)
+        self.course.assigned_faculty = self.faculty
+        self.course.save()
+        self.make_course('A2', IA_TOOLS)
+        self.make_marks(self.course, 3, seed=22)
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/token/', {'username': 'fac', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+    def course_ids(self):
+        return sorted(c['id'] for c in self.client.get('/api/courses/').data['results'])
+
+    def test_reads_skip_the_users_table(self):
+        tokens = self.login()
+        claims = AccessToken(tokens['access'])
+        self.assertEqual((claims['role'], claims['department']), ('faculty', 'D01'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/marks/', {'course': 'A1'}).status_code, 200)
+            self.assertEqual(self.client.get('/api/students/', {'course': 'A1'}).status_code, 200)
+            self.assertEqual(self.course_ids(), ['A1'])
+        self.assertFalse([q['sql'] for q in queries if 'FROM "api_user"' in q['sql']])
+
+    def test_user_changes_apply_to_issued_tokens(self):
+        self.login()
+        self.assertEqual(self.course_ids(), ['A1'])
+
+        self.faculty.role = User.Role.ADMIN
+        self.faculty.save()
+        self.assertEqual(self.course_ids(), ['A1', 'A2'])
+
+        self.faculty.is_active = False
+        self.faculty.save()
+        self.assertEqual(self.client.get('/api/courses/').status_code, 401)
+
+    @mock.patch('api.caching.is_shared', return_value=True)
+    def test_principal_cached_during_the_transaction_is_dropped_on_commit(self, _):
+        self.login()
+        self.assertEqual(self.course_ids(), ['A1'])
+        key = f'auth:principal:{self.faculty.id}'
+        before = caching.get(key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.faculty.role = User.Role.ADMIN
+                self.faculty.save()
+                # A concurrent request still reads the old row and caches it again
+                caching.set(key, before)
+        self.assertEqual(self.course_ids(), ['A1', 'A2'])
+
+    def test_revocation_reaches_workers_with_their_own_cache(self):
+        # Each worker process has its own locmem tiers
+        worker_a = settings.CACHES
+        worker_b = {
+            'default': {**settings.CACHES['default'], 'LOCATION': 'worker-b-shared'},
+            'local': {**settings.CACHES['local'], 'LOCATION': 'worker-b-local'},
+        }
+        self.login()
+        self.assertEqual(self.course_ids(), ['A1'])
+
+        with self.settings(CACHES=worker_b):
+            self.faculty.role = User.Role.ADMIN
+            self.faculty.save()
+        with self.settings(CACHES=worker_a):
+            self.assertEqual(self.course_ids(), ['A1', 'A2'])
+
+        with self.settings(CACHES=worker_b):
+            self.faculty.is_active = False
+            self.faculty.save()
+        with self.settings(CACHES=worker_a):
+            self.assertEqual(self.client.get('/api/courses/').status_code, 401)
+
+    def test_refresh_reads_the_claims_again(self):
+        tokens = self.login()
+        # A queryset update sends no signal: only the refreshed token knows
+        User.objects.filter(id=self.faculty.id).update(role=User.Role.ADMIN)
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'admin')
+
+
+class ListQueryCountTests(AttainmentFixtureMixin, TestCase):
+    """List endpoints run a fixed number of queries, however many rows they return."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+        self.rows = 0
+
+    def add_courses(self, n):
+        for _ in range(n):
+            self.rows += 1
+            faculty = User.objects.create(username=f'fac{self.rows}', display_name=f'Faculty {self.rows}',
+                                          department=self.department)
+            scheme = Scheme.objects.create(id=f'S{self.rows}', name=f'Scheme {self.rows}')
+            course = self.make_course(f'L{self.rows}', IA_TOOLS, scheme=scheme)
+            course.assigned_faculty = faculty
+            course.save()
+            student = Student.objects.create(id=f'LS{self.rows}', name='S', usn=f'LUSN{self.rows}')
+            student.courses.add(course, *Course.objects.exclude(id=course.id)[:2])
+            Mark.objects.create(id=f'LM{self.rows}', student=student, course=course, assessment_name='IA 1', scores={'CO1': 4})
+
+    def assert_constant_queries(self, url):
+        self.add_courses(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(len(self.client.get(url).data['results']), 2)
+        self.add_courses(25)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(len(self.client.get(url).data['results']), 27)
+        self.assertEqual(len(large), len(small))
+
+    def test_courses(self):
+        self.assert_constant_queries('/api/courses/')
+        # The list is unordered, so match each course with its own scheme
+        for course in self.client.get('/api/courses/').data['results']:
+            self.assertEqual(course['scheme_details']['id'], course['scheme'])
+
+    def test_students(self):
+        self.assert_constant_queries('/api/students/')
+
+    def test_marks(self):
+        self.assert_constant_queries('/api/marks/')
+
+    def test_articulation_matrices(self):
+        self.assert_constant_queries('/api/articulation-matrix/')
+
+
+class ConditionalGetTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department, display_name='Dr A')
+        self.course = self.make_course('C1', IA_TOOLS, scheme=self.scheme)
+        self.course.assigned_faculty = self.faculty
+        self.course.save()
+        self.make_marks(self.course, 10, seed=1)
+        self.client = APIClient()
+        self.superadmin = User.objects.create(username='root', role=User.Role.SUPER_ADMIN)
+        self.client.force_authenticate(self.superadmin)
+
+    def revalidate(self, url, response, **extra):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **extra)
+
+    def test_lists_return_304_until_their_tables_change(self):
+        first = self.client.get('/api/courses/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertTrue(first.has_header('Last-Modified'))
+        # Only the version lookup runs
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate('/api/courses/', first).status_code, 304)
+
+        self.scheme.name = 'Renamed'
+        self.scheme.save()
+        second = self.revalidate('/api/courses/', first)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['results'][0]['scheme_details']['name'], 'Renamed')
+        self.faculty.display_name = 'Dr B'
+        self.faculty.save()
+        self.assertEqual(self.revalidate('/api/courses/', second).status_code, 200)
+
+        # Other filters and other users get their own tags
+        self.assertNotEqual(self.client.get('/api/courses/?department=D01')['ETag'], second['ETag'])
+        self.client.force_authenticate(self.faculty)
+        self.assertEqual(self.revalidate('/api/courses/', second).status_code, 200)
+
+    @override_settings(ALLOWED_HOSTS=['internal', 'public.example'])
+    def test_cached_pages_keep_the_request_host_in_links(self):
+        for n in (1, 2):
+            ProgramOutcome.objects.create(id=f'PO{n}', description='')
+        with mock.patch.object(PageNumberPagination, 'page_size', 1):
+            internal = self.client.get('/api/pos/', HTTP_HOST='internal')
+            public = self.client.get('/api/pos/', HTTP_HOST='public.example', secure=True)
+        self.assertEqual(internal.data['next'], 'http://internal/api/pos/?page=2')
+        self.assertEqual(public.data['next'], 'https://public.example/api/pos/?page=2')
+        self.assertNotEqual(internal['ETag'], public['ETag'])
+
+    def test_reference_data(self):
+        ProgramOutcome.objects.create(id='PO1', description='')
+        first = self.client.get('/api/pos/')
+        self.assertEqual(self.revalidate('/api/pos/', first).status_code, 304)
+        self.assertEqual(self.revalidate('/api/pos/PO1/', self.client.get('/api/pos/PO1/')).status_code, 304)
+        # A PSO does not touch the PO list
+        ProgramSpecificOutcome.objects.create(id='PSO1', description='', department=self.department)
+        self.assertEqual(self.revalidate('/api/pos/', first).status_code, 304)
+        ProgramOutcome.objects.filter(id='PO1').first().delete()
+        self.assertEqual(self.revalidate('/api/pos/', first).data, {'count': 0, 'next': None, 'previous': None, 'results': []})
+        self.assertEqual(TableVersion.objects.get(table='api.programoutcome').version, 2)
+
+    def test_course_report_revalidates_without_the_engine(self):
+        url = '/api/reports/course-attainment/C1/'
+        computed = self.client.get(url)
+        self.assertFalse(computed.has_header('ETag'))
+        cached = self.client.get(url)
+        self.assertEqual(cached.data['po_attainment'], computed.data['po_attainment'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, cached).status_code, 304)
+
+        mark = Mark.objects.filter(course=self.course).first()
+        mark.scores = {'CO1': 0, 'CO2': 0}
+        mark.save()
+        self.assertEqual(self.revalidate(url, cached).status_code, 200)
+        self.assertEqual(self.client.get('/api/reports/course-attainment/NOPE/').status_code, 404)
+
+
+class CacheLayerTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        caching.metrics.reset()
+        self.course = self.make_course('K1', IA_TOOLS, scheme=self.scheme)
+        self.make_marks(self.course, 10, seed=3)
+
+    def test_tiers(self):
+        caching.set('test:a', {'x': 1})
+        caching.set('test:b', 2, local_timeout=0)
+        local = caching._local()
+        self.assertEqual(local.get('test:a'), {'x': 1})
+        self.assertIsNone(local.get('test:b'))
+        # Another worker: empty local tier, same shared tier
+        local.clear()
+        self.assertEqual(caching.get('test:a'), {'x': 1})
+        self.assertEqual(caching.get('test:a'), {'x': 1})
+        self.assertEqual(caching.get('test:b', local_timeout=0), 2)
+        self.assertIsNone(caching.get('test:missing'))
+        counts = caching.metrics.snapshot()['kinds']['test']
+        self.assertEqual((counts['shared_hit'], counts['local_hit'], counts['miss']), (2, 1, 1))
+
+    @override_settings(CACHE_LOCK_SECONDS=5)
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(caching.get_or_compute('test:slow', compute)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(caching.metrics.snapshot()['kinds']['test']['wait'], 3)
+
+    def test_course_reports_are_shared_between_workers(self):
+        first = get_course_attainment('K1')
+        caching._local().clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_course_attainment('K1'), first)
+        mark = Mark.objects.filter(course=self.course).first()
+        mark.scores = {'CO1': 0, 'CO2': 0}
+        mark.save()
+        self.assertEqual(get_course_attainment('K1'), calculate_course_attainment('K1'))
+
+    def test_global_settings_follow_the_configuration(self):
+        self.assertEqual(get_global_scheme_settings()['pass_criteria'], 50)
+        with self.assertNumQueries(0):
+            get_global_scheme_settings()
+        Configuration.objects.create(key='global_scheme_settings', value={'pass_criteria': 65})
+        self.assertEqual(get_global_scheme_settings(), {'pass_criteria': 65})
+
+    def test_per_process_shared_tier_is_flagged(self):
+        self.assertEqual(caching.check_shared_backend(), [])
+        with override_settings(TESTING=False, DEBUG=False):
+            self.assertEqual([w.id for w in caching.check_shared_backend()], ['api.W001'])
+            with self.settings(CACHES={**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'api_cache'}}):
+                self.assertTrue(caching.is_shared())
+                self.assertEqual(caching.check_shared_backend(), [])
+
+    def test_lists_are_served_from_the_cache_and_stats(self):
+        superadmin = User.objects.create(username='root', role=User.Role.SUPER_ADMIN)
+        client = APIClient()
+        client.force_authenticate(superadmin)
+        first = client.get('/api/schemes/')
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get('/api/schemes/').data, first.data)
+        self.assertEqual(client.get('/api/schemes/missing/').status_code, 404)
+
+        stats = client.get('/api/cache-stats/').data
+        self.assertEqual(stats['kinds']['response']['local_hit'], 1)
+        self.assertEqual(client.delete('/api/cache-stats/').status_code, 204)
+        self.assertEqual(client.get('/api/cache-stats/').data['kinds'], {})
+        client.force_authenticate(User.objects.create(username='fac', role=User.Role.FACULTY))
+        self.assertEqual(client.get('/api/cache-stats/').status_code, 403)
+
+
+class CursorPaginationTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C601', IA_TOOLS)
+        self.make_marks(self.course, 12, seed=6, improvement_rate=0)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+
+    def test_walks_marks_in_primary_key_order_without_count(self):
+        url = '/api/marks/?course=C601&paginate=cursor&page_size=10'
+        ids = []
+        pages = 0
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).data
+            self.assertNotIn('count', data)
+            self.assertFalse(any('COUNT(' in q['sql'].upper() for q in queries.captured_queries))
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+            pages += 1
+        expected = list(Mark.objects.filter(course=self.course).order_by('pk').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, -(-len(expected) // 10))
+
+    def test_page_size_is_capped_and_default_mode_unchanged(self):
+        with mock.patch('api.pagination.KeysetPagination.max_page_size', 5):
+            data = self.client.get('/api/students/?course=C601&paginate=cursor&page_size=1000').data
+        self.assertEqual(len(data['results']), 5)
+        data = self.client.get('/api/students/?course=C601').data
+        self.assertEqual(data['count'], 12)
+
+
+class MarksExportTests(AttainmentFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course('C701', IA_TOOLS)
+        self.other = self.make_course('C702', LAB_TOOLS, cos=('CO1', 'CO2'))
+        self.student = Student.objects.create(id='E1', name='Asha, K', usn='EUSN1')
+        Mark.objects.create(id='E-IA1', student=self.student, course=self.course, assessment_name='IA 1',
+                            scores={'CO1': 12, 'CO2': 'AB'})
+        Mark.objects.create(id='E-IA2', student=self.student, course=self.course, assessment_name='IA 2',
+                            scores={'CO10': '4.5', '_improvementTarget': 'IA 1'})
+        Mark.objects.create(id='E-LAB', student=self.student, course=self.other, assessment_name='SEE', scores={'Q1': 30})
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='root', role=User.Role.SUPER_ADMIN))
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_flattened_score_columns(self):
+        response = self.client.get('/api/marks/export/', {'course': 'C701'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'id,course,course_code,student,usn,student_name,assessment_name,improvement_test_for,CO1,CO2,CO10')
+        self.assertEqual(lines[1:], [
+            'E-IA1,C701,C701,E1,EUSN1,"Asha, K",IA 1,,12,AB,',
+            'E-IA2,C701,C701,E1,EUSN1,"Asha, K",IA 2,,,,4.5',
+        ])
+
+    def test_ndjson_for_a_department(self):
+        response = self.client.get('/api/marks/export/', {'department': 'D01', 'export_format': 'ndjson'})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], ['E-IA1', 'E-IA2', 'E-LAB'])
+        self.assertEqual(rows[1]['scores'], {'CO10': '4.5', '_improvementTarget': 'IA 1'})
+
+    def test_scoping_and_validation(self):
+        faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department)
+        Course.objects.filter(id='C702').update(assigned_faculty=faculty)
+        self.client.force_authenticate(faculty)
+        response = self.client.get('/api/marks/export/', {'department': 'D01', 'export_format': 'ndjson'})
+        self.assertEqual([json.loads(line)['id'] for line in self.read(response).splitlines()], ['E-LAB'])
+        self.assertEqual(self.client.get('/api/marks/export/').status_code, 400)
+        self.assertEqual(self.client.get('/api/marks/export/', {'course': 'C701', 'export_format': 'xml'}).status_code, 400)
+
+
+class CompiledSchemeTests(AttainmentFixtureMixin, TestCase):
+
+    def test_level_lookup(self):
+        scheme = compile_scheme({'attainment_levels': {'level_1': 60, 'level_3': 60, 'x': 10, 'level_2': 40.5}})
+        self.assertEqual(scheme.thresholds, (10.0, 40.5, 60.0, 60.0))
+        # Equal thresholds: the first one listed wins, as in the original linear scan
+        self.assertEqual([scheme.level_for(p) for p in [0, 9.99, 10, 40.5, 59, 60, 100]], [0, 0, 0, 2, 2, 1, 1])
+        self.assertEqual(compile_scheme({}).level_for(65), 2)
+
+    def test_memo_is_cleared_on_scheme_and_configuration_saves(self):
+        course = self.make_course('C801', IA_TOOLS, scheme=self.scheme)
+        compiled = get_course_scheme(course)
+        self.assertIs(get_course_scheme(Course.objects.select_related('scheme').get(id='C801')), compiled)
+        self.assertEqual(compiled.pass_criteria, 40.0)
+
+        self.scheme.settings = {**self.scheme.settings, 'pass_criteria': 45}
+        self.scheme.save()
+        self.assertEqual(get_course_scheme(Course.objects.select_related('scheme').get(id='C801')).pass_criteria, 45.0)
+
+        plain = self.make_course('C802', IA_TOOLS)
+        self.assertEqual(get_course_scheme(plain).pass_criteria, 50.0)
+        Configuration.objects.create(key='global_scheme_settings', value={'pass_criteria': 60})
+        self.assertEqual(get_course_scheme(plain).pass_criteria, 60.0)
+
+
+class AssessmentPlanTests(AttainmentFixtureMixin, TestCase):
+
+    def test_plan_layout_and_caching(self):
+        course = self.make_course('C901', IA_TOOLS)
+        plan = get_assessment_plan(course)
+        self.assertEqual(plan.co_keys, ('CO1', 'CO2', 'CO3', 'CO4', 'CO5'))
+        self.assertEqual([tool.name for tool in plan.tools], ['IA 1', 'IA 2', 'Assignment', 'Quiz'])
+        self.assertEqual(plan.tools[1].columns, (1, 2, 4))
+        self.assertEqual(plan.targets(40.0)[0], (10.0, 10.0))
+        # SEE maps CO5, which only exists through IA 2's distribution
+        self.assertEqual((plan.see_columns, plan.see_late_columns), ((0,), (4,)))
+        self.assertEqual(plan.improvement_tools['ia2'], (1,))
+
+        self.assertIs(get_assessment_plan(Course.objects.get(id='C901')), plan)
+        course.assessment_tools = IA_TOOLS[:2]
+        course.save()
+        self.assertEqual(len(get_assessment_plan(Course.objects.get(id='C901')).tools), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', "query plans are checked on PostgreSQL")
+class QueryPlanTests(AttainmentFixtureMixin, TestCase):
+    """EXPLAIN checks: the hot filters must be served by an index."""
+
+    def seed(self, n_courses, students_per_course, n_students):
+        rng = random.Random(19)
+        self.faculty = User.objects.create(username='fac', role=User.Role.FACULTY, department=self.department)
+        tools = [{'name': f'IA {i}', 'type': 'Internal Assessment', 'maxMarks': 50, 'coDistribution': {'CO1': 25, 'CO2': 25}}
+                 for i in range(1, 11)]
+        courses = Course.objects.bulk_create([
+            Course(id=f'P{i}', code=f'P{i:04d}', name='Course', semester=1 + i % 8, credits=3, department=self.department,
+                   assigned_faculty=self.faculty if i % 40 == 0 else None, cos=['CO1', 'CO2'], assessment_tools=tools)
+            for i in range(n_courses)
+        ])
+        Student.objects.bulk_create([Student(id=f'PS{j}', name='Student', usn=f'PUSN{j}') for j in range(n_students)])
+        marks = []
+        for course in courses:
+            for j in rng.sample(range(n_students), students_per_course):
+                for tool in tools:
+                    marks.append(Mark(
+                        id=f'{course.id}-{j}-{tool["name"]}', student_id=f'PS{j}', course=course,
+                        assessment_name=tool['name'], scores={'CO1': rng.randint(0, 25), 'CO2': rng.randint(0, 25)},
+                        improvement_test_for='IA 1' if rng.random() < 0.02 else None,
+                    ))
+        Mark.objects.bulk_create(marks, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def hot_queries(self):
+        # label -> (queryset, index it must use, or None for "any index")
+        return {
+            'marks of a course': (Mark.objects.filter(course_id='P0').order_by('pk')[:500], None),
+            'mark keyset page': (Mark.objects.filter(course_id='P0', pk__gt='P0-1').order_by('pk')[:500], 'mark_course_pk'),
+            'marks of a faculty': (Mark.objects.filter(course__assigned_faculty=self.faculty).order_by('pk')[:5000], None),
+            'marks of a student': (Mark.objects.filter(student__usn='PUSN1'), None),
+            'improvement rows': (Mark.objects.filter(course_id='P0', improvement_test_for__isnull=False), 'mark_course_improvements'),
+            'scores key': (Mark.objects.filter(scores__has_key='_improvementTarget'), 'mark_scores_gin'),
+            'department courses': (Course.objects.filter(department='D01').order_by('code'), None),
+            'faculty courses': (Course.objects.filter(assigned_faculty=self.faculty), None),
+        }
+
+    def assert_indexed(self):
+        for label, (queryset, index) in self.hot_queries().items():
+            plan = queryset.explain()
+            with self.subTest(label):
+                self.assertNotIn('Seq Scan', plan, plan)
+                if index:
+                    self.assertIn(index, plan, plan)
+
+    def test_hot_filters_have_indexes(self):
+        self.seed(n_courses=40, students_per_course=10, n_students=100)
+        with connection.cursor() as cursor:
+            # Small tables: with sequential scans disabled, one that remains means no usable index
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assert_indexed()
+
+    @skipUnless(os.getenv('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to check the plans on 100k marks")
+    def test_plans_on_100k_marks(self):
+        self.seed(n_courses=200, students_per_course=50, n_students=5000)
+        self.assertEqual(Mark.objects.count(), 100000)
+        self.assert_indexed()
+
+
+BENCHMARK_TOOLS = [
+    {'name': f'IA {i}', 'type': 'Internal Assessment', 'maxMarks': 50,
+     'coDistribution': {f'CO{i % 5 + 1}': 20, f'CO{(i + 1) % 5 + 1}': 30}}
+    for i in range(1, 10)
+] + [
+    {'name': 'Assignment', 'type': 'Assignment', 'maxMarks': 10},
+    {'name': 'Improvement', 'type': 'Improvement Test', 'maxMarks': 50},
+    {'name': 'SEE', 'type': 'SEE', 'maxMarks': 100},
+]
+
+
+@skipUnless(os.getenv('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run the engine benchmarks")
+class AttainmentBenchmarkTests(AttainmentFixtureMixin, TestCase):
+    """1k students x 12 assessments; timings are printed, not asserted."""
+
+    def best_of(self, runs, fn):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    def test_python_engine(self):
+        course = self.make_course('BENCH', BENCHMARK_TOOLS, cos=('CO1', 'CO2', 'CO3', 'CO4', 'CO5'))
+        self.make_marks(course, 1000, seed=13)
+        scheme = get_course_scheme(course)
+        queryset = Mark.objects.filter(course=course)
+
+        rows_time, from_rows = self.best_of(3, lambda: _calculate_co_levels(queryset, course, scheme))
+        load_time, instances = self.best_of(3, lambda: list(queryset.all()))
+        objects_time, from_objects = self.best_of(3, lambda: _calculate_co_levels(instances, course, scheme))
+        self.assertEqual(from_rows, from_objects)
+        print(f"\n{queryset.count()} marks: values() rows incl. query {rows_time * 1000:.1f} ms; "
+              f"Mark instances {load_time * 1000:.1f} ms to load + {objects_time * 1000:.1f} ms to evaluate")
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        caching.clear()
+
+    def seed(self, **options):
+        defaults = {'prefix': 'T', 'departments': 1, 'courses_per_department': 5, 'students': 40, 'students_per_course': 12}
+        call_command('seed_benchmark', stdout=StringIO(), **{**defaults, **options})
+
+    def test_seed_benchmark(self):
+        self.seed()
+        courses = Course.objects.filter(id__startswith='T')
+        self.assertEqual(courses.count(), 5)
+        self.assertEqual(Student.objects.count(), 40)
+        self.assertEqual(Student.courses.through.objects.count(), 60)
+        self.assertFalse(courses.filter(assigned_faculty__isnull=True).exists())
+        # bulk_create skips the signals, so the score rows are written alongside
+        self.assertEqual(MarkScore.objects.count(), sum(len(score_rows_for(m)) for m in Mark.objects.all()))
+        self.assertTrue(Mark.objects.filter(improvement_test_for__isnull=False).exists())
+        for course in courses:
+            self.assertNotIn('error', calculate_course_attainment(course.id))
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_run_benchmarks_saves_and_compares(self):
+        self.seed()
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.json')
+            call_command('run_benchmarks', prefix='T', courses=2, rounds=1, engine=['python'],
+                         only=['attainment.', 'list.', 'bulk'], output=output, stdout=StringIO())
+            with open(output) as fh:
+                results = json.load(fh)
+            self.assertEqual(
+                [b['name'] for b in results['benchmarks']],
+                ['attainment.python', 'attainment.batch', 'list.marks', 'list.students', 'list.courses',
+                 'bulk_upload.students', 'bulk.marks'],
+            )
+            # Writes are rolled back
+            self.assertEqual(Student.objects.count(), 40)
+
+            for bench in results['benchmarks']:
+                bench['stats']['median'] /= 10
+            baseline = os.path.join(tmp, 'baseline.json')
+            with open(baseline, 'w') as fh:
+                json.dump(results, fh)
+            with self.assertRaisesMessage(CommandError, 'regressed'):
+                call_command('run_benchmarks', prefix='T', courses=2, rounds=1, engine=['python'], only=['list.courses'],
+                             output=os.path.join(tmp, 'second.json'), compare=baseline, stdout=StringIO())
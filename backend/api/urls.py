@@ -21,4 +21,10 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('reports/course-attainment/<str:course_id>/', CourseAttainmentReportView.as_view(), name='course-attainment-report'),
+    path('reports/department-attainment/<str:dept_id>/', DepartmentAttainmentReportView.as_view(), name='department-attainment-report'),
+    path('reports/program-attainment/<str:dept_id>/', ProgramAttainmentReportView.as_view(), name='program-attainment-report'),
+    path('reports/student/<str:usn>/', StudentReportView.as_view(), name='student-report'),
+    path('reports/attainment-simulation/', AttainmentSimulationView.as_view(), name='attainment-simulation'),
+    path('profiling/', ProfilingStatsView.as_view(), name='profiling-stats'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
 ]
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+NumPy implementation of the CO level engine.
+
+A course's marks are loaded once and parsed into dense
+(students x tools x COs) arrays. Attempts, passes and levels are then
+computed with array operations instead of per-student Python loops.
+
+The results are identical to calculation_services._calculate_co_levels
+(see the parity tests in api/tests.py). Select it with
+ATTAINMENT_ENGINE = 'vectorized'.
+"""
+import numpy as np
+
+from .assessment_plan import get_assessment_plan, improvement_key
+from .calculation_services import (
+    _co_value,
+    _get_total,
+    _is_absent,
+    _mark_rows,
+    _plan_tool_scores,
+    _see_obtained,
+)
+
+
+class MarkMatrix:
+    """
+    Settings-independent view of a course's marks.
+
+    `values[s, t, c]` holds the numeric score of student `s` for CO `c` in
+    internal tool `t` (after Lab/Activity normalization and improvement-test
+    replacement); `attempted` marks the cells that count as a CIE attempt.
+    `co_max[t, c]` is the CO's maximum marks in that tool (NaN when it cannot
+    be parsed, which makes the pass comparison fail like the Python engine).
+    """
+
+    def __init__(self, plan, co_keys, values, attempted, co_max, see_ok, see_obt):
+        self.plan = plan
+        self.co_keys = co_keys
+        self.values = values
+        self.attempted = attempted
+        self.co_max = co_max
+        self.see_ok = see_ok
+        self.see_obt = see_obt
+
+
+def build_mark_matrix(marks, course):
+    plan = get_assessment_plan(course)
+
+    # 1. Group marks per student (first-appearance order, like the Python engine)
+    student_marks = {}
+    for student_id, name, scores, imp_for in _mark_rows(marks):
+        student_marks.setdefault(student_id, []).append((name, scores, imp_for))
+
+    # 2. CO axis: course COs first, then any extra keys from the tool distributions
+    co_keys = list(plan.output_keys(bool(student_marks)))
+
+    n_s, n_t, n_c = len(student_marks), len(plan.tools), len(co_keys)
+    values = np.full((n_s, n_t, n_c), np.nan)
+    attempted = np.zeros((n_s, n_t, n_c), dtype=bool)
+    see_ok = np.zeros(n_s, dtype=bool)
+    see_obt = np.zeros(n_s)
+
+    co_max = np.full((n_t, n_c), np.nan)
+    for t, tool_plan in enumerate(plan.tools):
+        for c, max_val in zip(tool_plan.columns, tool_plan.max_values):
+            if c < n_c and max_val is not None:
+                co_max[t, c] = max_val
+
+    # 3. Single pass per student: index records, then fill the dense arrays
+    for s, records in enumerate(student_marks.values()):
+        by_name = {}
+        improvements = {}
+        see_record = None
+        for record in records:
+            name, scores, imp_for = record
+            by_name.setdefault(name, record)
+            for key in (improvement_key(imp_for), improvement_key(scores.get('_improvementTarget', ''))):
+                for t in plan.improvement_tools.get(key, ()):
+                    improvements.setdefault(t, record)
+            if see_record is None and name in plan.see_names:
+                see_record = record
+
+        if see_record and see_record[1]:
+            obt = _see_obtained(see_record[1])
+            if obt is not None:
+                see_ok[s] = True
+                see_obt[s] = obt
+
+        for t, tool_plan in enumerate(plan.tools):
+            record = by_name.get(tool_plan.name)
+            scores = _plan_tool_scores(record[1] if record else {}, tool_plan, plan)
+
+            imp_record = improvements.get(t)
+            if imp_record and imp_record[1]:
+                imp_scores = _plan_tool_scores(imp_record[1], tool_plan, plan)
+                if _get_total(imp_scores, tool_plan.co_dist.keys()) > _get_total(scores, tool_plan.co_dist.keys()):
+                    scores = imp_scores
+
+            for co, c in zip(tool_plan.cos, tool_plan.columns):
+                val = _co_value(scores, co)
+                if not _is_absent(val) and val is not None:
+                    try:
+                        num_val = float(val)
+                    except ValueError:
+                        continue
+                    values[s, t, c] = num_val
+                    attempted[s, t, c] = True
+
+    return MarkMatrix(plan, co_keys, values, attempted, co_max, see_ok, see_obt)
+
+
+def _levels_for(percentages, scheme):
+    # Vectorized CompiledScheme.level_for: index 0 is "below every threshold"
+    levels = np.array((0,) + scheme.levels, dtype=np.int64)
+    return levels[np.searchsorted(np.array(scheme.thresholds, dtype=float), percentages, side='right')]
+
+
+def _percentages(passed, attempts):
+    safe = np.where(attempts > 0, attempts, 1)
+    return np.where(attempts > 0, passed / safe * 100, 0)
+
+
+def evaluate_mark_matrix(matrix, scheme):
+    return evaluate_mark_matrix_sweep(matrix, [scheme])[0]
+
+
+def evaluate_mark_matrix_sweep(matrix, schemes):
+    """
+    CO levels of one MarkMatrix under several CompiledSchemes. The pass
+    comparisons for every distinct pass criteria are done in one broadcast
+    over a (criteria x students x tools x COs) array; only the level lookup
+    runs per scheme. Returns one co_stats dict per scheme.
+    """
+    n_c = len(matrix.co_keys)
+    criteria = sorted({scheme.pass_criteria for scheme in schemes})
+    pass_thresholds = np.array(criteria, dtype=float)
+
+    # --- CIE: a cell passes when its score reaches the CO's pass target ---
+    targets = matrix.co_max[np.newaxis, :, :] * pass_thresholds[:, np.newaxis, np.newaxis] / 100.0
+    with np.errstate(invalid='ignore'):
+        passed = matrix.attempted[np.newaxis] & (matrix.values[np.newaxis] >= targets[:, np.newaxis, :, :])
+    cie_attempts = matrix.attempted.sum(axis=(0, 1))
+    cie_passed = passed.sum(axis=(1, 2))
+
+    # --- SEE: one attempt per present student for every mapped CO ---
+    see_attempts = np.zeros(n_c, dtype=np.int64)
+    see_passed = np.zeros((len(criteria), n_c), dtype=np.int64)
+    plan = matrix.plan
+    if plan.see_tool and matrix.see_ok.any():
+        see_targets = np.array([plan.see_target(p) for p in criteria])
+        see_pass = matrix.see_ok[np.newaxis] & (matrix.see_obt[np.newaxis] >= see_targets[:, np.newaxis])
+        for c in plan.see_columns:
+            see_attempts[c] += matrix.see_ok.sum()
+            see_passed[:, c] += see_pass.sum(axis=1)
+        # Distribution-only COs: the Python engine only counts them from the second student on
+        for c in plan.see_late_columns:
+            see_attempts[c] += matrix.see_ok[1:].sum()
+            see_passed[:, c] += see_pass[:, 1:].sum(axis=1)
+
+    results = []
+    for scheme in schemes:
+        k = criteria.index(scheme.pass_criteria)
+        cie_levels = _levels_for(_percentages(cie_passed[k], cie_attempts), scheme).tolist()
+        see_levels = _levels_for(_percentages(see_passed[k], see_attempts), scheme).tolist()
+        results.append({
+            co: {'cie_level': cie_levels[i], 'see_level': see_levels[i]}
+            for i, co in enumerate(matrix.co_keys)
+        })
+    return results
+
+
+def calculate_co_levels_vectorized(marks, course, scheme):
+    return evaluate_mark_matrix(build_mark_matrix(marks, course), scheme)
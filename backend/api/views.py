@@ -1,10 +1,24 @@
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.views import APIView
-from .calculation_services import calculate_course_attainment
+from .attainment_cache import course_attainment_validators, get_course_attainment_with_freshness, get_department_attainment
+from .attainment_simulation import (
+    MAX_SIMULATION_CANDIDATES, MAX_SIMULATION_COURSES, simulate_attainment, validate_candidate,
+)
+from .bulk_marks import MAX_BULK_MARK_ROWS, upsert_marks
+from .caching import metrics as cache_metrics
+from .conditional import ConditionalGetMixin, add_validators, not_modified
+from .marks_export import EXPORT_FORMATS, stream_marks_csv, stream_marks_ndjson
+from .pagination import PageOrCursorPagination
+from .profiling import stats as profiling_stats
+from .program_attainment import get_program_attainment
+from .student_import import import_students_csv
+from .student_report import get_student_report
 import csv
-import io
+import re
 from rest_framework.parsers import MultiPartParser, FormParser
 from .permissions import IsSuperAdmin, IsDepartmentAdmin, IsFacultyForCourse
 from .models import *
@@ -54,8 +68,8 @@ class UserViewSet(viewsets.ModelViewSet):
             
         elif user.role == User.Role.ADMIN or user.role == 'admin':
             # Department Admins MUST ONLY see users in their own department
-            if user.department:
-                queryset = queryset.filter(department=user.department)
+            if user.department_id:
+                queryset = queryset.filter(department_id=user.department_id)
             else:
                 return User.objects.none()
                 
@@ -78,9 +92,10 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
-class SchemeViewSet(viewsets.ModelViewSet):
+class SchemeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Scheme.objects.all()
     serializer_class = SchemeSerializer
+    etag_models = (Scheme,)
     
     def get_permissions(self):
         # ONLY Department Admins (and Super Admins) can create or edit Schemes
@@ -88,13 +103,16 @@ class SchemeViewSet(viewsets.ModelViewSet):
             return [IsDepartmentAdmin()]
         return [permissions.IsAuthenticated()]
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    # Nested scheme and the faculty's display name
+    etag_models = (Course, Scheme, User)
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Course.objects.all()
+        # CourseSerializer reads assigned_faculty.display_name and nests the scheme
+        queryset = Course.objects.select_related('assigned_faculty', 'scheme')
 
         # 1. SECURITY FILTRATION (The Fix for the Data Bleed)
         if not user.is_authenticated:
@@ -102,8 +120,8 @@ class CourseViewSet(viewsets.ModelViewSet):
             
         elif user.role == User.Role.ADMIN or user.role == 'admin':
             # Department Admins MUST ONLY see courses in their own department
-            if user.department:
-                queryset = queryset.filter(department=user.department)
+            if user.department_id:
+                queryset = queryset.filter(department_id=user.department_id)
             else:
                 return Course.objects.none()
                 
@@ -129,9 +147,12 @@ class CourseViewSet(viewsets.ModelViewSet):
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    # ?paginate=cursor&page_size=N walks large courses by primary key
+    pagination_class = PageOrCursorPagination
 
     def get_queryset(self):
-        queryset = Student.objects.all()
+        # StudentSerializer lists the course ids of every student
+        queryset = Student.objects.prefetch_related(Prefetch('courses', queryset=Course.objects.only('id')))
         department = self.request.query_params.get('department')
         course = self.request.query_params.get('course')
         
@@ -155,56 +176,24 @@ class StudentViewSet(viewsets.ModelViewSet):
             return Response({"error": "Course ID is required to map students"}, status=400)
 
         try:
-            # Read the CSV file in memory
-            decoded_file = file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.reader(io_string)
-            
-            headers = next(reader, None) # Skip the header row (USN, Name)
-
-            created_count = 0
-            enrolled_count = 0
-
-            # Get the course object
             course = Course.objects.get(id=course_id)
+        except Course.DoesNotExist:
+            return Response({"error": "Course not found"}, status=404)
 
-            for row in reader:
-                # Safely skip empty rows or rows that don't have at least 2 columns
-                if not row or len(row) < 2: 
-                    continue 
-                
-                usn = str(row[0]).strip().upper()
-                name = str(row[1]).strip()
-
-                if usn and name:
-                    # THE FIX: Explicitly set the 'id' to the 'usn' in the defaults
-                    student, created = Student.objects.get_or_create(
-                        usn=usn,
-                        defaults={
-                            'id': usn,    # <--- This prevents the empty ID error
-                            'name': name
-                        }
-                    )
-                    if created:
-                        created_count += 1
-                    
-                    # 2. Enroll the student in the course
-                    if course not in student.courses.all():
-                        student.courses.add(course)
-                        enrolled_count += 1
-
-            return Response({
-                "message": f"Successfully created {created_count} new students and enrolled {enrolled_count} into the course."
-            }, status=200)
-
-        except Exception as e:
-            return Response({"error": f"Error parsing CSV: {str(e)}"}, status=500)
+        try:
+            # Streamed in chunks in one transaction: a parse error leaves nothing imported
+            result = import_students_csv(file, course)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Error parsing CSV: {str(e)}"}, status=400)
+
+        return Response(result.as_dict(), status=200)
 
 class MarkViewSet(viewsets.ModelViewSet):
     queryset = Mark.objects.all()
     serializer_class = MarkSerializer
     # Faculty can only edit marks for their courses
     permission_classes = [permissions.IsAuthenticated, IsFacultyForCourse]
+    pagination_class = PageOrCursorPagination
 
     def get_queryset(self):
         """
@@ -212,6 +201,9 @@ class MarkViewSet(viewsets.ModelViewSet):
         """
         queryset = Mark.objects.all()
         user = self.request.user
+        if self.action != 'list':
+            # IsFacultyForCourse inspects obj.course on detail routes
+            queryset = queryset.select_related('course')
         
         # Security Filtration
         if user.role == 'faculty':
@@ -219,7 +211,7 @@ class MarkViewSet(viewsets.ModelViewSet):
         elif user.role == 'student':
             queryset = queryset.filter(student__usn=user.username)
         elif user.role == 'admin':
-            queryset = queryset.filter(course__department=user.department)
+            queryset = queryset.filter(course__department_id=user.department_id)
 
         # Performance Filtration (URL Params)
         course_id = self.request.query_params.get('course')
@@ -228,13 +220,64 @@ class MarkViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class ProgramOutcomeViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Creates, updates or deletes many marks in a single transaction.
+        Body: {"rows": [{student, course, assessment_name, scores, improvement_test_for}, ...]}
+        A row with "delete": true removes that student's mark for the assessment.
+        """
+        rows = request.data.get('rows') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Provide a non-empty list of rows"}, status=400)
+        if len(rows) > MAX_BULK_MARK_ROWS:
+            return Response({"error": f"A maximum of {MAX_BULK_MARK_ROWS} rows can be saved at once"}, status=400)
+
+        course_ids = {str(row.get('course')) for row in rows if isinstance(row, dict) and row.get('course')}
+        courses = Course.objects.in_bulk(list(course_ids))
+
+        # IsFacultyForCourse runs once per course instead of once per row
+        for course in courses.values():
+            self.check_object_permissions(request, course)
+
+        return Response(upsert_marks(rows, courses), status=200)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams the marks of a course or department as CSV (one column per
+        score key) or NDJSON: ?course=<id> or ?department=<id>, &export_format=csv|ndjson
+        """
+        course_id = request.query_params.get('course')
+        department_id = request.query_params.get('department')
+        export_format = request.query_params.get('export_format', 'csv')
+        if not course_id and not department_id:
+            return Response({"error": "Provide a course or department to export"}, status=400)
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"export_format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+        # get_queryset applies the role scoping and ?course=
+        queryset = self.get_queryset()
+        if department_id:
+            queryset = queryset.filter(course__department_id=department_id)
+
+        if export_format == 'csv':
+            response = StreamingHttpResponse(stream_marks_csv(queryset), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(stream_marks_ndjson(queryset), content_type='application/x-ndjson')
+        filename = f"marks_{course_id or department_id}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class ProgramOutcomeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ProgramOutcome.objects.all()
     serializer_class = ProgramOutcomeSerializer
+    etag_models = (ProgramOutcome,)
 
-class ProgramSpecificOutcomeViewSet(viewsets.ModelViewSet):
+class ProgramSpecificOutcomeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ProgramSpecificOutcome.objects.all()
     serializer_class = ProgramSpecificOutcomeSerializer
+    etag_models = (ProgramSpecificOutcome,)
 
 class ConfigurationViewSet(viewsets.ModelViewSet):
     queryset = Configuration.objects.all()
@@ -265,11 +308,188 @@ class CourseAttainmentReportView(APIView):
 
     def get(self, request, course_id):
         """
-        Generates and returns the full CO/PO attainment report for a course.
+        Returns the full CO/PO attainment report for a course.
+        Served from the AttainmentResult cache unless marks or settings changed;
+        "freshness" tells when it was computed and whether a recompute is pending.
+        A cached report is validated by its version: If-None-Match gets a 304.
         """
-        report_data = calculate_course_attainment(course_id)
+        etag, last_modified = course_attainment_validators(course_id)
+        if etag:
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+        report_data, freshness = get_course_attainment_with_freshness(course_id)
         
         if "error" in report_data:
             return Response(report_data, status=404)
             
-        return Response(report_data, status=200)
\ No newline at end of file
+        response = Response({**report_data, "freshness": freshness}, status=200)
+        # Only a report that was served from the cache has the version the ETag names
+        return add_validators(response, etag, last_modified) if etag else response
+
+class DepartmentAttainmentReportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsDepartmentAdmin]
+
+    def get(self, request, dept_id):
+        """
+        Returns the attainment report of every course in a department, plus
+        department-wide PO/PSO roll-ups, in a single response.
+        Optional filters: ?scheme=<scheme_id>&semester=<n>
+        """
+        user = request.user
+        if user.role == User.Role.ADMIN and user.department_id != dept_id:
+            return Response({"error": "You can only view reports for your own department"}, status=403)
+
+        if not Department.objects.filter(id=dept_id).exists():
+            return Response({"error": "Department not found"}, status=404)
+
+        semester = request.query_params.get('semester')
+        if semester:
+            try:
+                semester = int(semester)
+            except ValueError:
+                return Response({"error": "Semester must be a number"}, status=400)
+        else:
+            semester = None
+
+        report_data = get_department_attainment(
+            dept_id,
+            scheme_id=request.query_params.get('scheme') or None,
+            semester=semester
+        )
+        return Response(report_data, status=200)
+
+class ProgramAttainmentReportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsDepartmentAdmin]
+
+    def get(self, request, dept_id):
+        """
+        Returns the department's PO/PSO attainment: the course roll-up (direct),
+        the survey average (indirect) and their weighted total, unrounded
+        (see api/program_attainment.py for the arithmetic).
+        Optional: ?academic_year=2025-26 (default: current) &scheme=<scheme_id>
+        (weightage; the global settings without one).
+        Marks carry no academic year, so only the current year is computed (from
+        all current data); a past year returns the snapshot stored while it was
+        current, or 404 when none was.
+        """
+        user = request.user
+        if user.role == User.Role.ADMIN and user.department_id != dept_id:
+            return Response({"error": "You can only view reports for your own department"}, status=403)
+
+        if not Department.objects.filter(id=dept_id).exists():
+            return Response({"error": "Department not found"}, status=404)
+
+        academic_year = request.query_params.get('academic_year') or None
+        if academic_year and not re.fullmatch(r'\d{4}-\d{2}', academic_year):
+            return Response({"error": "academic_year must look like 2025-26"}, status=400)
+
+        scheme = None
+        scheme_id = request.query_params.get('scheme')
+        if scheme_id:
+            scheme = Scheme.objects.filter(id=scheme_id).first()
+            if scheme is None:
+                return Response({"error": "Scheme not found"}, status=404)
+
+        report_data = get_program_attainment(dept_id, academic_year=academic_year, scheme=scheme)
+        if report_data is None:
+            return Response({"error": f"No program attainment stored for {academic_year}"}, status=404)
+        return Response(report_data, status=200)
+
+class AttainmentSimulationView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsDepartmentAdmin]
+
+    def post(self, request):
+        """
+        "What-if" reports for candidate scheme settings; nothing is saved.
+        Body: {"course_ids": [...], "candidates": [{settings}, ...]}
+        ("settings": {...} is accepted for a single candidate). Each candidate
+        overrides the course's current settings key by key, and every course
+        is returned with its "before" report and one "after" per candidate.
+        """
+        course_ids = request.data.get('course_ids')
+        candidates = request.data.get('candidates')
+        if candidates is None and 'settings' in request.data:
+            candidates = [request.data.get('settings')]
+
+        # 1. Validate the request
+        if not isinstance(course_ids, list) or not course_ids:
+            return Response({"error": "course_ids must be a non-empty list"}, status=400)
+        if len(course_ids) > MAX_SIMULATION_COURSES:
+            return Response({"error": f"At most {MAX_SIMULATION_COURSES} courses per simulation"}, status=400)
+        if not isinstance(candidates, list) or not candidates:
+            return Response({"error": "candidates must be a non-empty list of scheme settings"}, status=400)
+        if len(candidates) > MAX_SIMULATION_CANDIDATES:
+            return Response({"error": f"At most {MAX_SIMULATION_CANDIDATES} candidates per simulation"}, status=400)
+        for candidate in candidates:
+            error = validate_candidate(candidate)
+            if error:
+                return Response({"error": error}, status=400)
+
+        # 2. Load the courses the user may see
+        course_ids = list(dict.fromkeys(str(course_id) for course_id in course_ids))
+        courses = Course.objects.filter(id__in=course_ids).select_related('scheme').order_by('code')
+        if request.user.role == User.Role.ADMIN:
+            courses = courses.filter(department_id=request.user.department_id)
+        courses = list(courses)
+        missing = sorted(set(course_ids) - {c.id for c in courses})
+        if missing:
+            return Response({"error": f"Courses not found: {', '.join(missing)}"}, status=404)
+
+        return Response(simulate_attainment(courses, candidates), status=200)
+
+class StudentReportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, usn):
+        """
+        One student's assessment totals and per-course CO performance
+        (optional ?course=<id>). Faculty see their assigned courses, admins
+        their department's, super admins every course.
+        """
+        student = Student.objects.filter(usn=usn).first()
+        if student is None:
+            return Response({"error": "Student not found"}, status=404)
+
+        user = request.user
+        courses = Course.objects.all()
+        if user.role == User.Role.FACULTY:
+            courses = courses.filter(assigned_faculty=user)
+        elif user.role == User.Role.ADMIN:
+            courses = courses.filter(department_id=user.department_id)
+        elif user.role != User.Role.SUPER_ADMIN:
+            return Response({"error": "You do not have permission to view student reports"}, status=403)
+
+        course_id = request.query_params.get('course')
+        if course_id:
+            courses = courses.filter(id=course_id)
+
+        return Response(get_student_report(student, courses), status=200)
+
+class ProfilingStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
+
+    def get(self, request):
+        """
+        Per-endpoint timings of the requests sampled by ProfilingMiddleware in
+        this process (p50/p95 wall time, DB time, queries, phases), slowest first.
+        """
+        return Response(profiling_stats.snapshot(), status=200)
+
+    def delete(self, request):
+        """Clears the rolling window."""
+        profiling_stats.reset()
+        return Response(status=204)
+
+class CacheStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
+
+    def get(self, request):
+        """Local/shared hits, misses and single-flight waits by key kind, in this process."""
+        return Response(cache_metrics.snapshot(), status=200)
+
+    def delete(self, request):
+        """Resets the counters."""
+        cache_metrics.reset()
+        return Response(status=204)
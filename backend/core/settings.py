@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +91,11 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        'OPTIONS': {
+            # The default random_page_cost (4) assumes spinning disks and makes the
+            # planner prefer sequential scans of api_mark over the course indexes
+            'options': f"-c random_page_cost={os.getenv('DB_RANDOM_PAGE_COST', '1.1')}",
+        },
     }
 }
 
@@ -137,11 +144,90 @@ AUTH_USER_MODEL = 'api.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.PrincipalJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
-}
\ No newline at end of file
+}
+
+# Caches (api/caching.py): 'local' is per process, 'default' is shared by all
+# workers. CACHE_BACKEND picks the shared tier: 'db' (the default; run
+# `python manage.py createcachetable`, setup_obes does), 'file', 'redis' (needs
+# the redis package) or 'locmem'; CACHE_LOCATION overrides its table, directory
+# or URL. 'locmem' is not shared, so invalidations only reach the process that
+# made them: it is the test default and only safe with a single worker.
+SHARED_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'obes-shared'),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'api_cache'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+TESTING = sys.argv[1:2] == ['test']
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem' if TESTING else 'db')
+CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', '300'))
+CACHES = {
+    'default': {
+        'BACKEND': SHARED_CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION') or SHARED_CACHE_BACKENDS[CACHE_BACKEND][1],
+        'TIMEOUT': CACHE_TIMEOUT,
+        'KEY_PREFIX': 'obes',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'obes-local',
+        'TIMEOUT': CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+# Seconds a worker may keep serving an unversioned entry (e.g. a resolved
+# user) that another worker changed
+CACHE_LOCAL_SECONDS = int(os.getenv('CACHE_LOCAL_SECONDS', '5'))
+# Longest a recomputation holds its single-flight lock (and others wait for it)
+CACHE_LOCK_SECONDS = int(os.getenv('CACHE_LOCK_SECONDS', '30'))
+
+# Access tokens carry role/department claims, so authenticated requests do
+# not read the users table (see api/authentication.py)
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.PrincipalTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.PrincipalTokenRefreshSerializer',
+}
+# How long a resolved request user is reused before its claims are read again
+AUTH_PRINCIPAL_CACHE_SECONDS = int(os.getenv('AUTH_PRINCIPAL_CACHE_SECONDS', '60'))
+
+# Attainment engine used by calculation_services.calculate_course_attainment:
+# 'python' (reference implementation), 'vectorized' (NumPy), 'sql'
+# (PostgreSQL aggregates) or 'incremental' (per-CO counters updated on every
+# mark write, see api/co_counters.py); all of them give the same results
+ATTAINMENT_ENGINE = os.getenv('ATTAINMENT_ENGINE', 'python')
+
+# Background recomputation: when True, mark/course/matrix writes queue the
+# course for `manage.py attainment_worker` and report endpoints serve the last
+# result (with a "freshness" marker) instead of recomputing on the next read.
+ATTAINMENT_ASYNC_RECOMPUTE = os.getenv('ATTAINMENT_ASYNC_RECOMPUTE', 'False').lower() in ('true', '1', 't')
+# A burst of writes is recomputed once, DEBOUNCE seconds after the last write
+# (but at most MAX_DELAY seconds after the first one)
+ATTAINMENT_RECOMPUTE_DEBOUNCE_SECONDS = int(os.getenv('ATTAINMENT_RECOMPUTE_DEBOUNCE_SECONDS', '5'))
+ATTAINMENT_RECOMPUTE_MAX_DELAY_SECONDS = int(os.getenv('ATTAINMENT_RECOMPUTE_MAX_DELAY_SECONDS', '60'))
+
+# Request profiling (api/profiling.py): when enabled, SAMPLE_RATE of the
+# requests get a Server-Timing header (total, DB, serializer and attainment
+# phases) and feed the rolling stats at /api/profiling/ (super admins only)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() in ('true', '1', 't')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.05'))
+PROFILING_WINDOW = int(os.getenv('PROFILING_WINDOW', '1000')) # sampled requests kept per process
+PROFILING_SLOW_QUERY_MS = int(os.getenv('PROFILING_SLOW_QUERY_MS', '100'))
+PROFILING_SLOW_REQUEST_MS = int(os.getenv('PROFILING_SLOW_REQUEST_MS', '1000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': os.getenv('API_LOG_LEVEL', 'WARNING')},
+    },
+}
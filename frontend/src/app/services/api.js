@@ -86,4 +86,14 @@ export const fetchAllPages = async (endpoint) => {
   return results;
 };
 
+/**
+ * Same as fetchAllPages, for the large marks/students lists: asks the backend
+ * for keyset (cursor) pagination with big pages, so there is no COUNT(*) and
+ * no slow deep OFFSET pages.
+ */
+export const fetchAllRows = (endpoint, pageSize = 5000) => {
+  const separator = endpoint.includes('?') ? '&' : '?';
+  return fetchAllPages(`${endpoint}${separator}paginate=cursor&page_size=${pageSize}`);
+};
+
 export default api;
\ No newline at end of file
@@ -11,192 +11,89 @@ const EvaluationResultPage = () => {
     const [loading, setLoading] = useState(true);
     
     // Data States
-    const [courses, setCourses] = useState([]);
     const [schemes, setSchemes] = useState([]);
-    const [outcomes, setOutcomes] = useState([]);
-    const [matrix, setMatrix] = useState({});
-    const [surveyData, setSurveyData] = useState({ exit_survey: {}, employer_survey: {}, alumni_survey: {} });
-    
-    // Store backend-calculated CO reports for each course
-    const [courseReports, setCourseReports] = useState({});
+    const [schemesLoaded, setSchemesLoaded] = useState(false);
+    // Backend program roll-up: course PO attainment, survey blend and totals in one response
+    const [programReport, setProgramReport] = useState(null);
     
     // UI State
     const [selectedSchemeId, setSelectedSchemeId] = useState('');
 
-    // --- 1. FETCH ALL DATA ---
+    // --- 1. FETCH SCHEMES (Reference Weightage) ---
     useEffect(() => {
-        const fetchData = async () => {
+        const fetchSchemes = async () => {
             if (!user || !user.department) return;
 
             try {
-                setLoading(true);
-                const deptId = user.department;
-
-                const [safeCourses, safeSchemes, safePos, safePsos, safeMatrix, safeSurveys] = await Promise.all([
-                    fetchAllPages(`/courses/?department=${deptId}`),
-                    fetchAllPages('/schemes/'), 
-                    fetchAllPages('/pos/'),
-                    fetchAllPages('/psos/'),
-                    fetchAllPages(`/articulation-matrix/?department=${deptId}`).catch(() => []),
-                    fetchAllPages(`/surveys/?department=${deptId}`).catch(() => []) 
-                ]);
-
-                // Sort Outcomes numerically
-                const sortById = (a, b) => {
-                    const numA = parseInt((a.id || '').match(/\d+/)?.[0] || 0);
-                    const numB = parseInt((b.id || '').match(/\d+/)?.[0] || 0);
-                    return numA - numB;
-                };
-
-                const sortedPos = Array.isArray(safePos) ? [...safePos].sort(sortById) : [];
-                const sortedPsos = Array.isArray(safePsos) ? [...safePsos].sort(sortById) : [];
-
-                setCourses(Array.isArray(safeCourses) ? safeCourses : []);
+                const safeSchemes = await fetchAllPages('/schemes/');
                 setSchemes(Array.isArray(safeSchemes) ? safeSchemes : []);
-                setOutcomes([...sortedPos, ...sortedPsos]);
-
-                if (safeSchemes.length > 0) setSelectedSchemeId(safeSchemes[0].id);
-                if (safeSurveys.length > 0) setSurveyData(safeSurveys[0]);
-
-                // Process Articulation Matrix
-                const mBuilder = {};
-                if (Array.isArray(safeMatrix)) {
-                    safeMatrix.forEach(item => {
-                        if (item.course && item.matrix) mBuilder[item.course] = item.matrix;
-                    });
-                }
-                setMatrix(mBuilder);
+                if (Array.isArray(safeSchemes) && safeSchemes.length > 0) setSelectedSchemeId(safeSchemes[0].id);
+            } catch (error) {
+                console.error("Failed to load evaluation data", error);
+            } finally {
+                setSchemesLoaded(true);
+            }
+        };
+        fetchSchemes();
+    }, [user]);
 
-                // DYNAMICALLY FETCH PRE-CALCULATED REPORTS FOR ALL COURSES
-                const reportsMap = {};
-                const reportPromises = (Array.isArray(safeCourses) ? safeCourses : []).map(course => 
-                    api.get(`/reports/course-attainment/${course.id}/`).catch(() => null)
-                );
-                
-                const reports = await Promise.all(reportPromises);
-                
-                (Array.isArray(safeCourses) ? safeCourses : []).forEach((course, index) => {
-                    const res = reports[index];
-                    if (res && res.data && res.data.co_attainment) {
-                        reportsMap[course.id] = res.data.co_attainment;
-                    } else {
-                        reportsMap[course.id] = [];
-                    }
-                });
-                
-                setCourseReports(reportsMap);
+    // --- 2. FETCH PROGRAM ATTAINMENT (calculated by the backend) ---
+    useEffect(() => {
+        if (!schemesLoaded || !user || !user.department) return;
 
+        const fetchProgramReport = async () => {
+            try {
+                setLoading(true);
+                const params = selectedSchemeId ? `?scheme=${selectedSchemeId}` : '';
+                const response = await api.get(`/reports/program-attainment/${user.department}/${params}`);
+                setProgramReport(response.data);
             } catch (error) {
                 console.error("Failed to load evaluation data", error);
+                setProgramReport(null);
             } finally {
                 setLoading(false);
             }
         };
-        fetchData();
-    }, [user]);
+        fetchProgramReport();
+    }, [user, schemesLoaded, selectedSchemeId]);
 
-    // --- 2. STREAMLINED CALCULATION ENGINE ---
-    const calculateData = useMemo(() => {
-        if (!courses.length || !outcomes.length) return { courseRows: [], summaryRows: [] };
-
-        // 1. Map Course COs to POs using the Backend Report
-        const courseRows = courses.map(course => {
-            const coData = courseReports[course.id] || [];
-            const courseMatrix = matrix[course.id] || {};
-            const poAttainment = {};
-
-            // FIX: Pull normalization factor from the scheme ASSIGNED TO THE COURSE
-            const courseSchemeRules = course.scheme_details?.settings || {};
-            const normFactor = courseSchemeRules.po_calculation?.normalization_factor || 3;
-
-            outcomes.forEach(outcome => {
-                let wSum = 0, wCount = 0;
-                coData.forEach(coItem => {
-                    const mapVal = parseFloat(courseMatrix[coItem.co]?.[outcome.id]);
-                    if (!isNaN(mapVal)) {
-                        // FIX: Apply the course's specific normalization factor
-                        wSum += (mapVal * coItem.score_index) / normFactor;
-                        wCount++;
-                    }
-                });
-                if (wCount > 0) poAttainment[outcome.id] = wSum / wCount;
-            });
+    const outcomes = useMemo(() => (programReport?.outcomes || []).map(id => ({ id })), [programReport]);
 
-            return { course, attainment: poAttainment };
-        }).sort((a, b) => (a.course.code || '').localeCompare(b.course.code || ''));
-
-        // 2. Average PO Attainment across all courses
-        const directAttainment = {};
-        outcomes.forEach(outcome => {
-            let sum = 0, count = 0;
-            courseRows.forEach(row => {
-                if (row.attainment[outcome.id] !== undefined) {
-                    sum += row.attainment[outcome.id];
-                    count++;
-                }
-            });
-            if (count > 0) directAttainment[outcome.id] = sum / count;
-        });
+    const calculateData = useMemo(() => {
+        if (!programReport || !outcomes.length) return { courseRows: [], summaryRows: [] };
 
-        // 3. Extract Survey Data (Indirect)
-        const exitData = surveyData.exit_survey || {};
-        const employerData = surveyData.employer_survey || {};
-        const alumniData = surveyData.alumni_survey || {};
-
-        const indirectAttainment = {};
-        outcomes.forEach(outcome => {
-            const v1 = parseFloat(exitData[outcome.id]) || 0;
-            const v2 = parseFloat(employerData[outcome.id]) || 0;
-            const v3 = parseFloat(alumniData[outcome.id]) || 0;
-            
-            let total = v1 + v2 + v3;
-            let divisor = (v1 ? 1 : 0) + (v2 ? 1 : 0) + (v3 ? 1 : 0);
-            
-            indirectAttainment[outcome.id] = divisor > 0 ? total / divisor : 0;
-        });
+        const courseRows = programReport.courses.map(row => ({
+            course: {
+                id: row.course_id,
+                code: row.code,
+                scheme_details: row.scheme_used && row.scheme_used !== 'Global Default' ? { name: row.scheme_used } : null
+            },
+            attainment: row.attainment
+        }));
 
-        // 4. Final Program Weightage (Based on Selected Reference Scheme)
-        const refScheme = schemes.find(s => String(s.id) === String(selectedSchemeId));
-        const refRules = refScheme?.settings || {};
-        
-        // FIX: Match the exact JSON structure from AdminConfigurationPage
-        const wDirectProgram = (refRules.weightage?.direct ?? 80) / 100;
-        const wIndirectProgram = (refRules.weightage?.indirect ?? 20) / 100;
-
-        const rowC = {}; 
-        const rowD = {};
-        const totalRow = {};
-
-        outcomes.forEach(o => {
-            const id = o.id;
-            const dir = directAttainment[id] || 0;
-            const ind = indirectAttainment[id] || 0;
-            
-            rowC[id] = dir * wDirectProgram;
-            rowD[id] = ind * wIndirectProgram;
-            totalRow[id] = rowC[id] + rowD[id];
-        });
+        const wDirectProgram = programReport.weightage.direct;
+        const wIndirectProgram = programReport.weightage.indirect;
 
         const summaryRows = [
-            { label: 'Direct Attainment (Avg of Courses) [A]', data: directAttainment, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
-            { label: 'Program Exit Survey', data: exitData },
-            { label: 'Employer Survey', data: employerData },
-            { label: 'Alumni Survey', data: alumniData },
-            { label: 'Indirect Attainment (Avg of Surveys) [B]', data: indirectAttainment, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
+            { label: 'Direct Attainment (Avg of Courses) [A]', data: programReport.direct, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
+            { label: 'Program Exit Survey', data: programReport.surveys.exit },
+            { label: 'Employer Survey', data: programReport.surveys.employer },
+            { label: 'Alumni Survey', data: programReport.surveys.alumni },
+            { label: 'Indirect Attainment (Avg of Surveys) [B]', data: programReport.indirect, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
             { 
-                label: `Weighted Direct [C = A * ${(wDirectProgram * 100).toFixed(0)}%]`, 
-                data: rowC 
+                label: `Weighted Direct [C = A * ${wDirectProgram.toFixed(0)}%]`, 
+                data: programReport.weighted_direct 
             },
             { 
-                label: `Weighted Indirect [D = B * ${(wIndirectProgram * 100).toFixed(0)}%]`, 
-                data: rowD 
+                label: `Weighted Indirect [D = B * ${wIndirectProgram.toFixed(0)}%]`, 
+                data: programReport.weighted_indirect 
             },
-            { label: 'Total Attainment [C + D]', data: totalRow, bold: true, bg: 'bg-green-50 dark:bg-green-900/20' },
+            { label: 'Total Attainment [C + D]', data: programReport.total, bold: true, bg: 'bg-green-50 dark:bg-green-900/20' },
         ];
 
         return { courseRows, summaryRows };
 
-    }, [courses, outcomes, matrix, surveyData, schemes, selectedSchemeId, courseReports]);
+    }, [programReport, outcomes]);
 
     // --- 3. EXPORT TO EXCEL ---
     const handleExportToExcel = () => {
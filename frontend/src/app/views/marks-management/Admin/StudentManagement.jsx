@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../shared/Card';
 import { useAuth } from '../../../contexts/AuthContext';
-import api, { fetchAllPages } from '../../../services/api'; 
+import api, { fetchAllPages, fetchAllRows } from '../../../services/api'; 
 import { Icons } from '../shared/icons';
 import { Loader2, Upload, Download, Trash2, Pencil } from 'lucide-react'; 
 import toast from 'react-hot-toast';
@@ -109,7 +109,7 @@ const StudentManagement = () => {
         if (!selectedCourseId) return;
         try {
             setLoading(true);
-            const fetchedStudents = await fetchAllPages(`/students/?course=${selectedCourseId}`);
+            const fetchedStudents = await fetchAllRows(`/students/?course=${selectedCourseId}`);
             setStudents(Array.isArray(fetchedStudents) ? fetchedStudents : []);
         } catch (error) {
             console.error("Failed to fetch students");
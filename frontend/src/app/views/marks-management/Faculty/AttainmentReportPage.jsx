@@ -1,7 +1,7 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../shared/Card';
 import { useAuth } from 'app/contexts/AuthContext';
-import api, { fetchAllPages } from '../../../services/api'; // IMPORT ADDED HERE
+import api, { fetchAllPages, fetchAllRows } from '../../../services/api'; // IMPORT ADDED HERE
 import { Loader2, AlertCircle, Download } from 'lucide-react';
 import {
   Chart as ChartJS, CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend, ArcElement
@@ -64,8 +64,8 @@ const AttainmentReportPage = () => {
               // B. Fetch ONLY filtered marks for the Grade Distribution Pie Chart
               // RECURSIVE FETCH IMPLEMENTED HERE
               const [allStudents, marks] = await Promise.all([
-                  fetchAllPages('/students/'), 
-                  fetchAllPages(`/marks/?course=${selectedCourseId}`)
+                  fetchAllRows('/students/'), 
+                  fetchAllRows(`/marks/?course=${selectedCourseId}`)
               ]);
               
               const courseStudents = Array.isArray(allStudents) 
@@ -1,7 +1,7 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../shared/Card';
 import { useAuth } from 'app/contexts/AuthContext';
-import api, { fetchAllPages } from '../../../services/api'; 
+import api, { fetchAllPages, fetchAllRows } from '../../../services/api'; 
 import { Loader2, AlertCircle, Download } from 'lucide-react';
 import * as XLSX from 'xlsx-js-style'; 
 import { CoPoAttainmentSkeleton } from '../shared/SkeletonLoaders';
@@ -59,8 +59,8 @@ const CoPoAttainmentPage = () => {
             
             try {
                 const [allStudents, fetchedMarks, allMatrices, reportRes] = await Promise.all([
-                    fetchAllPages(`/students/?course=${selectedCourseId}`),
-                    fetchAllPages(`/marks/?course=${selectedCourseId}`),
+                    fetchAllRows(`/students/?course=${selectedCourseId}`),
+                    fetchAllRows(`/marks/?course=${selectedCourseId}`),
                     fetchAllPages('/articulation-matrix/'),
                     api.get(`/reports/course-attainment/${selectedCourseId}/`) 
                 ]);
@@ -1,7 +1,7 @@
 import React, { useState, useMemo, useEffect, useRef } from 'react';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../shared/Card';
 import { useAuth } from 'app/contexts/AuthContext';
-import api, { fetchAllPages } from '../../../services/api'; 
+import api, { fetchAllPages, fetchAllRows } from '../../../services/api'; 
 import { Save, Lock, Unlock, Download, FileSpreadsheet, TrendingUp, Loader2, CheckCircle2, AlertCircle } from 'lucide-react';
 import toast from 'react-hot-toast';
 
@@ -210,10 +210,10 @@ const MarksEntryPage = () => {
     if (!silent) setLoading(true);
     
     try {
-        const allStudents = await fetchAllPages(`/students/?course=${selectedCourseId}`);
+        const allStudents = await fetchAllRows(`/students/?course=${selectedCourseId}`);
         setCurrentStudents(allStudents);
 
-        const allMarks = await fetchAllPages(`/marks/?course=${selectedCourseId}`);
+        const allMarks = await fetchAllRows(`/marks/?course=${selectedCourseId}`);
         const existingMarks = allMarks.filter(m => m.assessment_name === selectedAssessmentName);
 
         if (!currentToolConfig.isImprovement) {
@@ -367,7 +367,9 @@ const MarksEntryPage = () => {
     else setSaveStatus('saving');
 
     try {
-        const promises = currentStudents.map(async (student) => {
+        // Build every row first, then save the whole grid in one request
+        const rows = [];
+        currentStudents.forEach(student => {
             let scores = { ...marks[student.id] };
             let improvementFor = null;
             
@@ -375,7 +377,9 @@ const MarksEntryPage = () => {
                 improvementFor = improvementMap[student.id];
                 const existing = marksMeta[student.id];
                 if (!improvementFor) {
-                    if (existing) await api.delete(`/marks/${existing.id}/`);
+                    if (existing) {
+                        rows.push({ student: student.id, course: selectedCourseId, assessment_name: selectedAssessmentName, delete: true });
+                    }
                     return; 
                 }
             }
@@ -389,25 +393,21 @@ const MarksEntryPage = () => {
 
             if (Object.keys(cleanScores).length === 0 && !currentToolConfig.isImprovement) return; 
 
-            const existingRecord = marksMeta[student.id];
-            const payload = {
+            rows.push({
                 student: student.id,
                 course: selectedCourseId,
                 assessment_name: selectedAssessmentName,
                 scores: cleanScores,
                 improvement_test_for: improvementFor
-            };
-
-            const customId = `M_${selectedCourseId}_${student.id}_${selectedAssessmentName.replace(/[^a-zA-Z0-9]/g, '')}`;
-
-            if (existingRecord) {
-                await api.patch(`/marks/${existingRecord.id}/`, payload);
-            } else {
-                await api.post('/marks/', { ...payload, id: customId });
-            }
+            });
         });
 
-        await Promise.all(promises);
+        if (rows.length > 0) {
+            const response = await api.post('/marks/bulk/', { rows });
+            if (response.data?.error > 0) {
+                throw new Error(`${response.data.error} mark rows could not be saved`);
+            }
+        }
         
         setSaveStatus('saved');
         setHasUnsavedChanges(false);
@@ -1,7 +1,7 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../shared/Card';
 import { useAuth } from 'app/contexts/AuthContext';
-import api, { fetchAllPages } from '../../../services/api'; 
+import api, { fetchAllPages, fetchAllRows } from '../../../services/api'; 
 import { Loader2, User, BookOpen, Download, Trophy, Target, TrendingUp, AlertTriangle } from 'lucide-react'; 
 import { useLocation } from 'react-router-dom'; 
 import { StudentReportSkeleton } from '../shared/SkeletonLoaders';
@@ -33,32 +33,26 @@ const StudentIndividualReportPage = () => {
 
     // Data States
     const [courses, setCourses] = useState([]);
-    const [allStudents, setAllStudents] = useState([]);
-    const [allMarks, setAllMarks] = useState([]);
+    const [courseStudents, setCourseStudents] = useState([]);
+    const [studentReport, setStudentReport] = useState(null);
 
     // Selection States
     const [selectedCourseId, setSelectedCourseId] = useState('');
     const [selectedStudentId, setSelectedStudentId] = useState('');
 
-    // 1. Fetch Data
+    // 1. Fetch the faculty's courses (students and marks are loaded per selection)
     useEffect(() => {
         const fetchData = async () => {
             if (!user) return;
             setLoading(true);
             try {
-                const [fetchedCourses, fetchedStudents, fetchedMarks] = await Promise.all([
-                    fetchAllPages('/courses/'),
-                    fetchAllPages('/students/'),
-                    fetchAllPages('/marks/') 
-                ]);
+                const fetchedCourses = await fetchAllPages('/courses/');
 
                 const myCourses = Array.isArray(fetchedCourses)
                     ? fetchedCourses.filter(c => String(c.assigned_faculty) === String(user.id))
                     : [];
 
                 setCourses(myCourses);
-                setAllStudents(Array.isArray(fetchedStudents) ? fetchedStudents : []);
-                setAllMarks(Array.isArray(fetchedMarks) ? fetchedMarks : []);
 
                 if (myCourses.length > 0 && !selectedCourseId) {
                     setSelectedCourseId(myCourses[0].id);
@@ -73,18 +67,23 @@ const StudentIndividualReportPage = () => {
         fetchData();
     }, [user]);
 
-    // 2. Filter Courses & Students
+    // 2. Filter Courses & load the selected course's students
     const assignedCourses = useMemo(() => {
         if (!user || !courses.length) return [];
         return courses.filter(c => String(c.assigned_faculty) === String(user.id));
     }, [user, courses]);
 
-    const courseStudents = useMemo(() => {
-        if (!selectedCourseId) return [];
-        return allStudents.filter(s => 
-            s.courses && s.courses.map(String).includes(String(selectedCourseId))
-        );
-    }, [selectedCourseId, allStudents]);
+    useEffect(() => {
+        if (!selectedCourseId) {
+            setCourseStudents([]);
+            return;
+        }
+        let cancelled = false;
+        fetchAllRows(`/students/?course=${selectedCourseId}`)
+            .then(rows => { if (!cancelled) setCourseStudents(Array.isArray(rows) ? rows : []); })
+            .catch(error => console.error("Failed to load students", error));
+        return () => { cancelled = true; };
+    }, [selectedCourseId]);
 
     // Auto-select logic
     useEffect(() => {
@@ -112,109 +111,51 @@ const StudentIndividualReportPage = () => {
     const selectedCourse = courses.find(c => String(c.id) === String(selectedCourseId));
     const selectedStudent = courseStudents.find(s => String(s.id) === String(selectedStudentId));
 
-    // --- 3. ADVANCED REPORT DATA CALCULATION ---
-    const reportData = useMemo(() => {
-        if (!selectedCourse || !selectedStudent) return null;
-
-        const tools = selectedCourse.assessment_tools || [];
-        const courseMarksFiltered = allMarks.filter(m => String(m.course) === String(selectedCourseId));
-        const studentMarks = courseMarksFiltered.filter(m => String(m.student) === String(selectedStudent.id));
-
-        let grandTotalMax = 0;
-        let grandTotalObtained = 0;
-        let classGrandTotalObtained = 0;
-        let classGrandTotalAttempts = 0;
-
-        const assessments = tools.map(tool => {
-            const record = studentMarks.find(m => m.assessment_name === tool.name);
-            const scores = record?.scores || {};
-            
-            // Calculate Student Total for this tool
-            const totalObtained = Object.entries(scores).reduce((sum, [key, val]) => {
-                if (key.startsWith('_') || String(val).toUpperCase() === 'AB') return sum;
-                return sum + (parseFloat(val) || 0);
-            }, 0);
-            
-            grandTotalMax += tool.maxMarks || 0;
-            grandTotalObtained += totalObtained;
-
-            // Calculate Class Average for this tool
-            const toolAllMarks = courseMarksFiltered.filter(m => m.assessment_name === tool.name);
-            let classToolTotal = 0;
-            let validStudents = 0;
-            
-            toolAllMarks.forEach(m => {
-                let sTot = 0;
-                let attempted = false; // FIXED TYPO HERE
-                Object.entries(m.scores || {}).forEach(([k, v]) => {
-                    if (!k.startsWith('_') && String(v).toUpperCase() !== 'AB') {
-                        sTot += (parseFloat(v) || 0);
-                        attempted = true; // FIXED TYPO HERE
-                    }
-                });
-                if (attempted) {
-                    classToolTotal += sTot;
-                    validStudents++;
-                    classGrandTotalObtained += sTot;
-                }
-            });
-            classGrandTotalAttempts += validStudents ? 1 : 0; 
-            
-            const classAvg = validStudents > 0 ? (classToolTotal / validStudents) : 0;
-
-            const breakdown = [];
-            if (tool.coDistribution) {
-                Object.entries(tool.coDistribution).forEach(([coId, max]) => {
-                    breakdown.push({
-                        label: coId,
-                        max: parseInt(max),
-                        obtained: parseFloat(scores[coId] || 0)
-                    });
-                });
-            } else {
-                breakdown.push({ label: 'Total', max: tool.maxMarks, obtained: totalObtained });
-            }
-
-            return {
-                name: tool.name,
-                type: tool.type,
-                max: tool.maxMarks,
-                obtained: totalObtained,
-                classAvg: parseFloat(classAvg.toFixed(1)),
-                breakdown
-            };
-        });
-
-        // CO Performance
-        const cos = selectedCourse.cos || [];
-        const coPerformance = cos.map(co => {
-            const coIdString = typeof co === 'string' ? co : co.id;
-            let coTotalMax = 0;
-            let coTotalObtained = 0;
-
-            tools.forEach(tool => {
-                if (tool.coDistribution && tool.coDistribution[coIdString]) {
-                    const record = studentMarks.find(m => m.assessment_name === tool.name);
-                    const max = parseInt(tool.coDistribution[coIdString]);
-                    const rawVal = record?.scores?.[coIdString];
-                    const obtained = String(rawVal).toUpperCase() === 'AB' ? 0 : parseFloat(rawVal || 0);
-                    
-                    coTotalMax += max;
-                    coTotalObtained += obtained;
-                }
+    // The server computes the report (same CO normalization as the attainment engine)
+    useEffect(() => {
+        if (!selectedCourseId || !selectedStudent) {
+            setStudentReport(null);
+            return;
+        }
+        let cancelled = false;
+        api.get(`/reports/student/${encodeURIComponent(selectedStudent.usn)}/`, { params: { course: selectedCourseId } })
+            .then(res => { if (!cancelled) setStudentReport(res.data.courses?.[0] || null); })
+            .catch(error => {
+                console.error("Failed to load student report", error);
+                if (!cancelled) setStudentReport(null);
             });
+        return () => { cancelled = true; };
+    }, [selectedCourseId, selectedStudent]);
 
-            return {
-                co: coIdString.includes('.') ? coIdString.split('.')[1] : coIdString,
-                percentage: coTotalMax > 0 ? (coTotalObtained / coTotalMax) * 100 : 0
-            };
-        });
+    // --- 3. ADVANCED REPORT DATA ---
+    const reportData = useMemo(() => {
+        if (!selectedCourse || !selectedStudent || !studentReport) return null;
+
+        const assessments = studentReport.assessments.map(tool => ({
+            name: tool.name,
+            type: tool.type,
+            max: tool.max,
+            obtained: tool.obtained,
+            classAvg: parseFloat(tool.class_average.toFixed(1)),
+            breakdown: tool.breakdown.length
+                ? tool.breakdown.map(b => ({ label: b.co, max: b.max, obtained: b.obtained }))
+                : [{ label: 'Total', max: tool.max, obtained: tool.obtained }]
+        }));
+
+        const coPerformance = studentReport.co_performance.map(row => ({
+            co: row.co.includes('.') ? row.co.split('.')[1] : row.co,
+            percentage: row.percentage
+        }));
 
         // Metrics calculations
+        const grandTotalMax = assessments.reduce((sum, a) => sum + (a.max || 0), 0);
+        const grandTotalObtained = assessments.reduce((sum, a) => sum + a.obtained, 0);
+        const classTotal = assessments.reduce((sum, a) => sum + a.classAvg, 0);
         const overallPercentage = grandTotalMax > 0 ? ((grandTotalObtained / grandTotalMax) * 100).toFixed(1) : 0;
-        const avgClassPercentage = (classGrandTotalAttempts > 0 && grandTotalMax > 0) ? 
-            (((classGrandTotalObtained / classGrandTotalAttempts) / grandTotalMax) * 100).toFixed(1) : 0;
-            
+        // Class average of the same total: sum of the per-tool class averages (marks with a present
+        // score; AB/Absent/A/NA/- count as absent server-side) over the same maximum as the student's
+        const avgClassPercentage = grandTotalMax > 0 ? ((classTotal / grandTotalMax) * 100).toFixed(1) : 0;
+
         const strongestCO = [...coPerformance].sort((a, b) => b.percentage - a.percentage)[0];
         const weakestCO = [...coPerformance].sort((a, b) => a.percentage - b.percentage)[0];
 
@@ -231,7 +172,7 @@ const StudentIndividualReportPage = () => {
             }
         };
 
-    }, [selectedCourse, selectedStudent, allMarks, selectedCourseId]);
+    }, [selectedCourse, selectedStudent, studentReport]);
 
     // --- 4. CHART CONFIGURATIONS ---
     const comparisonChartData = useMemo(() => {
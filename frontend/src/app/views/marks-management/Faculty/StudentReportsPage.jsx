@@ -1,7 +1,7 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '../shared/Card';
 import { useAuth } from 'app/contexts/AuthContext';
-import api, { fetchAllPages } from '../../../services/api';
+import api, { fetchAllPages, fetchAllRows } from '../../../services/api';
 import { Download, Loader2, Search, Filter, Eye } from 'lucide-react'; 
 import { useNavigate } from 'react-router-dom'; 
 import { TableSkeleton } from '../shared/SkeletonLoaders';
@@ -51,8 +51,8 @@ const StudentReportsPage = () => {
             setLoading(true);
             try {
                 const [fetchedStudents, fetchedMarks] = await Promise.all([
-                    fetchAllPages('/students/'),
-                    fetchAllPages(`/marks/?course=${selectedCourseId}`)
+                    fetchAllRows('/students/'),
+                    fetchAllRows(`/marks/?course=${selectedCourseId}`)
                 ]);
 
                 // Type-Safe Filtering: Convert both sides to Strings to guarantee a match
@@ -14,14 +14,9 @@ const DepartmentAttainmentPage = () => {
     const [selectedSchemeId, setSelectedSchemeId] = useState('');
 
     // Data States
-    const [courses, setCourses] = useState([]);
     const [schemes, setSchemes] = useState([]);
-    const [outcomes, setOutcomes] = useState([]);
-    const [matrix, setMatrix] = useState({});
-    const [surveyData, setSurveyData] = useState({ exit_survey: {}, employer_survey: {}, alumni_survey: {} });
-    
-    // Store backend-calculated CO reports for each course
-    const [courseReports, setCourseReports] = useState({});
+    // Backend program roll-up: course PO attainment, survey blend and totals in one response
+    const [programReport, setProgramReport] = useState(null);
 
     // --- 1. INITIAL LOAD (Departments & Schemes) ---
     useEffect(() => {
@@ -45,181 +40,65 @@ const DepartmentAttainmentPage = () => {
         fetchInitData();
     }, []);
 
-    // --- 2. FETCH DEPARTMENT DATA (On Selection) ---
+    // --- 2. FETCH PROGRAM ATTAINMENT (On Selection) ---
     useEffect(() => {
         if (!selectedDeptId) return;
 
-        const fetchDeptData = async () => {
+        const fetchProgramReport = async () => {
             setLoading(true);
             try {
-                const [fetchedCourses, fetchedPos, fetchedPsos, fetchedMatrix, fetchedSurveys] = await Promise.all([
-                    fetchAllPages(`/courses/?department=${selectedDeptId}`),
-                    fetchAllPages('/pos/'),
-                    fetchAllPages('/psos/'),
-                    fetchAllPages(`/articulation-matrix/?department=${selectedDeptId}`).catch(() => []),
-                    fetchAllPages(`/surveys/?department=${selectedDeptId}`).catch(() => [])
-                ]);
-
-                // Sort Outcomes
-                const sortById = (a, b) => {
-                    const numA = parseInt((a.id || '').match(/\d+/)?.[0] || 0);
-                    const numB = parseInt((b.id || '').match(/\d+/)?.[0] || 0);
-                    return numA - numB;
-                };
-
-                const safePos = Array.isArray(fetchedPos) ? [...fetchedPos].sort(sortById) : [];
-                const safePsos = Array.isArray(fetchedPsos) ? [...fetchedPsos].sort(sortById) : [];
-                const safeCourses = Array.isArray(fetchedCourses) ? fetchedCourses : [];
-
-                setCourses(safeCourses);
-                setOutcomes([...safePos, ...safePsos]);
-
-                if (Array.isArray(fetchedSurveys) && fetchedSurveys.length > 0) {
-                    setSurveyData(fetchedSurveys[0]);
-                } else {
-                    setSurveyData({ exit_survey: {}, employer_survey: {}, alumni_survey: {} });
-                }
-
-                // Process Matrix
-                const mBuilder = {};
-                if (Array.isArray(fetchedMatrix)) {
-                    fetchedMatrix.forEach(item => {
-                        if (item.course && item.matrix) {
-                            mBuilder[item.course] = item.matrix;
-                        }
-                    });
-                }
-                setMatrix(mBuilder);
-
-                // Fetch Pre-calculated Backend Reports for the selected department's courses
-                const reportsMap = {};
-                const reportPromises = safeCourses.map(course => 
-                    api.get(`/reports/course-attainment/${course.id}/`).catch(() => null)
-                );
-                
-                const reports = await Promise.all(reportPromises);
-                
-                safeCourses.forEach((course, index) => {
-                    const res = reports[index];
-                    if (res?.data?.co_attainment) {
-                        reportsMap[course.id] = res.data.co_attainment;
-                    } else {
-                        reportsMap[course.id] = [];
-                    }
-                });
-                
-                setCourseReports(reportsMap);
-
+                const params = selectedSchemeId ? `?scheme=${selectedSchemeId}` : '';
+                const response = await api.get(`/reports/program-attainment/${selectedDeptId}/${params}`);
+                setProgramReport(response.data);
             } catch (error) {
                 console.error("Failed to load department data", error);
+                setProgramReport(null);
             } finally {
                 setLoading(false);
             }
         };
 
-        fetchDeptData();
-    }, [selectedDeptId]);
+        fetchProgramReport();
+    }, [selectedDeptId, selectedSchemeId]);
 
-    // --- 3. STREAMLINED CALCULATION ENGINE ---
-    const calculateData = useMemo(() => {
-        if (!selectedDeptId || !courses.length || !outcomes.length) return { courseRows: [], summaryRows: [] };
-
-        // 1. Map Course COs to POs using the Backend Report
-        const courseRows = courses.map(course => {
-            const coData = courseReports[course.id] || [];
-            const courseMatrix = matrix[course.id] || {};
-            const poAttainment = {};
-
-            const courseSchemeRules = course.scheme_details?.settings || {};
-            const normFactor = courseSchemeRules.po_calculation?.normalization_factor || 3;
-
-            // Multiply Backend Final Score Index by Articulation Matrix Mapping
-            outcomes.forEach(outcome => {
-                let wSum = 0, wCount = 0;
-                coData.forEach(coItem => {
-                    const mapVal = parseFloat(courseMatrix[coItem.co]?.[outcome.id]);
-                    if (!isNaN(mapVal)) {
-                        wSum += (mapVal * coItem.score_index) / normFactor;
-                        wCount++;
-                    }
-                });
-                if (wCount > 0) poAttainment[outcome.id] = wSum / wCount;
-            });
+    // --- 3. TABLE ROWS (calculated by the backend) ---
+    const outcomes = useMemo(() => (programReport?.outcomes || []).map(id => ({ id })), [programReport]);
 
-            return { course, attainment: poAttainment };
-        }).sort((a, b) => (a.course.code || '').localeCompare(b.course.code || ''));
-
-        // 2. Average PO Attainment across all courses
-        const directAttainment = {};
-        outcomes.forEach(outcome => {
-            let sum = 0, count = 0;
-            courseRows.forEach(row => {
-                if (row.attainment[outcome.id] !== undefined) {
-                    sum += row.attainment[outcome.id];
-                    count++;
-                }
-            });
-            if (count > 0) directAttainment[outcome.id] = sum / count;
-        });
+    const calculateData = useMemo(() => {
+        if (!selectedDeptId || !programReport || !outcomes.length) return { courseRows: [], summaryRows: [] };
 
-        // 3. Extract Survey Data (Indirect)
-        const exitData = surveyData.exit_survey || {};
-        const employerData = surveyData.employer_survey || {};
-        const alumniData = surveyData.alumni_survey || {};
-
-        const indirectAttainment = {};
-        outcomes.forEach(outcome => {
-            const v1 = parseFloat(exitData[outcome.id]) || 0;
-            const v2 = parseFloat(employerData[outcome.id]) || 0;
-            const v3 = parseFloat(alumniData[outcome.id]) || 0;
-            
-            let total = v1 + v2 + v3;
-            let divisor = (v1 ? 1 : 0) + (v2 ? 1 : 0) + (v3 ? 1 : 0);
-            
-            indirectAttainment[outcome.id] = divisor > 0 ? total / divisor : 0;
-        });
+        const courseRows = programReport.courses.map(row => ({
+            course: {
+                id: row.course_id,
+                code: row.code,
+                scheme_details: row.scheme_used && row.scheme_used !== 'Global Default' ? { name: row.scheme_used } : null
+            },
+            attainment: row.attainment
+        }));
 
-        // 4. Final Summary based on REFERENCE SCHEME
-        const refScheme = schemes.find(s => String(s.id) === String(selectedSchemeId));
-        const refRules = refScheme?.settings || {};
-        
-        const wDirectProgram = (refRules.weightage?.direct ?? 80) / 100;
-        const wIndirectProgram = (refRules.weightage?.indirect ?? 20) / 100;
-
-        const rowC = {}; 
-        const rowD = {};
-        const totalRow = {};
-
-        outcomes.forEach(o => {
-            const id = o.id;
-            const dir = directAttainment[id] || 0;
-            const ind = indirectAttainment[id] || 0;
-            
-            rowC[id] = dir * wDirectProgram;
-            rowD[id] = ind * wIndirectProgram;
-            totalRow[id] = rowC[id] + rowD[id];
-        });
+        const wDirectProgram = programReport.weightage.direct;
+        const wIndirectProgram = programReport.weightage.indirect;
 
         const summaryRows = [
-            { label: 'Direct Attainment (Avg of Courses) [A]', data: directAttainment, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
-            { label: 'Program Exit Survey', data: exitData },
-            { label: 'Employer Survey', data: employerData },
-            { label: 'Alumni Survey', data: alumniData },
-            { label: 'Indirect Attainment (Avg of Surveys) [B]', data: indirectAttainment, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
+            { label: 'Direct Attainment (Avg of Courses) [A]', data: programReport.direct, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
+            { label: 'Program Exit Survey', data: programReport.surveys.exit },
+            { label: 'Employer Survey', data: programReport.surveys.employer },
+            { label: 'Alumni Survey', data: programReport.surveys.alumni },
+            { label: 'Indirect Attainment (Avg of Surveys) [B]', data: programReport.indirect, bold: true, bg: 'bg-yellow-50 dark:bg-yellow-900/20' },
             { 
-                label: `Weighted Direct [C = A * ${(wDirectProgram * 100).toFixed(0)}%]`, 
-                data: rowC 
+                label: `Weighted Direct [C = A * ${wDirectProgram.toFixed(0)}%]`, 
+                data: programReport.weighted_direct 
             },
             { 
-                label: `Weighted Indirect [D = B * ${(wIndirectProgram * 100).toFixed(0)}%]`, 
-                data: rowD 
+                label: `Weighted Indirect [D = B * ${wIndirectProgram.toFixed(0)}%]`, 
+                data: programReport.weighted_indirect 
             },
-            { label: 'Total Attainment [C + D]', data: totalRow, bold: true, bg: 'bg-green-50 dark:bg-green-900/20' },
+            { label: 'Total Attainment [C + D]', data: programReport.total, bold: true, bg: 'bg-green-50 dark:bg-green-900/20' },
         ];
 
         return { courseRows, summaryRows };
 
-    }, [selectedDeptId, courses, outcomes, matrix, surveyData, schemes, selectedSchemeId, courseReports]);
+    }, [selectedDeptId, programReport, outcomes]);
 
     // --- 4. EXPORT TO EXCEL ---
     const handleExportToExcel = () => {